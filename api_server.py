@@ -0,0 +1,381 @@
+"""
+HTTP Serving Layer
+
+ASGI service around the agentic RAG engine. One process holds one compiled graph and
+one Chroma handle and serves many sessions:
+
+    GET  /healthz                 liveness
+    GET  /readyz                  readiness, true once warm-up has finished
+    GET  /metrics                 Prometheus metrics of requests, graph nodes and LLM usage
+    POST /v1/questions            answer a question, streamed as NDJSON events by default
+    GET  /v1/sessions/{id}        size metrics of a session's chat history
+    DELETE /v1/sessions/{id}      forget a session
+
+Concurrency is bounded by ``SERVER_MAX_CONCURRENCY``; up to ``SERVER_MAX_QUEUE``
+further requests wait for a slot (at most ``SERVER_QUEUE_TIMEOUT`` seconds) and the
+rest are rejected with 429, so overload turns into backpressure instead of latency.
+Requests of one session run one at a time and queue on the session before taking a
+slot, so a chatty session cannot hold slots other sessions could use. Those waits
+count toward the queue and its timeout, and at most ``SESSION_MAX_QUEUE`` requests
+may wait per session.
+
+Run with:
+    uvicorn api_server:app --host 0.0.0.0 --port 8000
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+# Make the project packages importable when run from another directory
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+
+from app_config.open_ai_cred import (
+    SERVER_MAX_CONCURRENCY, SERVER_MAX_QUEUE, SERVER_QUEUE_TIMEOUT, SESSION_TTL, SESSION_MAX,
+    SESSION_MAX_QUEUE
+)
+from document_processing.chat_history import ChatHistoryManager
+from document_processing.doc_qa import agentic_qa_astream, warm_up
+from document_processing.proj_metrics import get_logger, log_event, metrics
+from document_processing.proj_cache import get_llm_cache
+
+logger = get_logger("server")
+
+
+class QuestionRequest(BaseModel):
+    question: str
+    session_id: Optional[str] = None
+    stream: bool = True
+
+
+class QueueFull(Exception):
+    """Raised when no request slot is free and the wait queue is full."""
+
+
+class QueueTimeout(Exception):
+    """Raised when a queued request did not get a slot in time."""
+
+
+class AdmissionController:
+    """
+    Bounds in-flight requests and the number of requests waiting for a slot.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        """
+        Args:
+            max_concurrency (int): Requests running at once.
+            max_queue (int): Requests allowed to wait for a slot.
+            queue_timeout (float): Seconds a request may wait.
+        """
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self):
+        """
+        Waits for a request slot.
+
+        Raises:
+            QueueFull: No slot is free and the wait queue is full.
+            QueueTimeout: No slot became free within ``queue_timeout``.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise QueueFull()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise QueueTimeout()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+
+    async def acquire_session(self, session: "Session", max_waiting: int):
+        """
+        Waits for the previous request of a session to finish and takes its lock.
+
+        The wait counts toward the wait queue and is bounded by ``queue_timeout``.
+
+        Args:
+            session (Session): The request's session.
+            max_waiting (int): Requests allowed to wait for the same session.
+
+        Raises:
+            QueueFull: The session or the wait queue has no room for another waiter.
+            QueueTimeout: The session's previous request did not finish in time.
+        """
+        if session.lock.locked() and (session.waiting >= max_waiting or self.waiting >= self.max_queue):
+            self.rejected += 1
+            raise QueueFull()
+        session.waiting += 1
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(session.lock.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise QueueTimeout()
+        finally:
+            session.waiting -= 1
+            self.waiting -= 1
+
+    def release(self):
+        """Frees a request slot."""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+class GuardedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse calling ``on_close`` once it has been sent, however sending ends.
+
+    The body generator's ``finally`` does not run if the client disconnects before the
+    generator is first iterated, so resources held for the stream are released here.
+    """
+
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+def release_once(*callbacks):
+    """
+    Returns a function running the callbacks on its first call only.
+    """
+    released = []
+
+    def release():
+        if not released:
+            released.append(True)
+            for callback in callbacks:
+                callback()
+
+    return release
+
+
+class Session:
+    def __init__(self):
+        self.history = ChatHistoryManager()
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+        self.last_used = time.time()
+
+
+class SessionStore:
+    """
+    In-memory per-session chat histories with idle expiry and a size bound.
+    """
+
+    def __init__(self, ttl_seconds: float, max_sessions: int):
+        """
+        Args:
+            ttl_seconds (float): Idle time after which a session is dropped.
+            max_sessions (int): Maximum number of sessions; the least recently used go first.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_used <= self.ttl_seconds and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def get(self, session_id: str, create: bool = True) -> Optional[Session]:
+        """
+        Returns a session, creating it if needed.
+
+        Args:
+            session_id (str): Session ID.
+            create (bool): Create the session if it does not exist.
+
+        Returns:
+            Session or None: The session.
+        """
+        now = time.time()
+        self._expire(now)
+        session = self._sessions.get(session_id)
+        if session is None and create:
+            session = self._sessions[session_id] = Session()
+        if session is not None:
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+
+def create_app(engine=None, max_concurrency: int = SERVER_MAX_CONCURRENCY,
+               max_queue: int = SERVER_MAX_QUEUE, queue_timeout: float = SERVER_QUEUE_TIMEOUT,
+               max_session_queue: int = SESSION_MAX_QUEUE) -> FastAPI:
+    """
+    Builds the ASGI app.
+
+    Args:
+        engine (AgenticRAGEngine, optional): Engine to serve, e.g. one built with fake
+            models for local testing. Defaults to the shared engine, built and warmed up
+            in the background at startup.
+        max_concurrency (int): Requests running at once.
+        max_queue (int): Requests allowed to wait for a slot.
+        queue_timeout (float): Seconds a request may wait for its session or a slot.
+        max_session_queue (int): Requests allowed to wait for the same session.
+
+    Returns:
+        FastAPI: The app.
+    """
+    admission = AdmissionController(max_concurrency, max_queue, queue_timeout)
+    sessions = SessionStore(SESSION_TTL, SESSION_MAX)
+    status = {"ready": False, "error": None}
+
+    async def _warm_up():
+        try:
+            if engine is None:
+                await asyncio.to_thread(warm_up)
+            else:
+                from document_processing.proj_lang_graph import set_engine
+                set_engine(engine)
+            status["ready"] = True
+        except Exception as exc:
+            status["error"] = repr(exc)
+            log_event(logger, "warm_up_failed", logging.ERROR, error=repr(exc))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        task = asyncio.create_task(_warm_up())
+        yield
+        task.cancel()
+
+    app = FastAPI(title="RAG-Corrective", lifespan=lifespan)
+    app.state.admission = admission
+    app.state.sessions = sessions
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz():
+        body = {
+            "ready": status["ready"],
+            "error": status["error"],
+            "in_flight": admission.in_flight,
+            "waiting": admission.waiting,
+            "rejected": admission.rejected,
+            "sessions": len(sessions),
+        }
+        return JSONResponse(body, status_code=200 if status["ready"] else 503)
+
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        metrics.set_gauge("rag_server_in_flight", admission.in_flight)
+        metrics.set_gauge("rag_server_waiting", admission.waiting)
+        metrics.set_gauge("rag_server_rejected", admission.rejected)
+        metrics.set_gauge("rag_server_sessions", len(sessions))
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            metrics.set_gauge("rag_llm_cache_entries", llm_cache.stats()["entries"])
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/v1/questions")
+    async def ask(request: QuestionRequest):
+        if not status["ready"]:
+            raise HTTPException(503, "Service is warming up")
+        session_id = request.session_id or uuid.uuid4().hex
+        session = sessions.get(session_id)
+
+        # Queue on the session first, so waiting for an earlier turn holds no slot
+        try:
+            await admission.acquire_session(session, max_session_queue)
+        except QueueFull:
+            raise HTTPException(429, "Too many requests queued", headers={"Retry-After": "1"})
+        except QueueTimeout:
+            raise HTTPException(503, "Timed out waiting for the session's previous request",
+                                headers={"Retry-After": "1"})
+        admitted = False
+        try:
+            await admission.acquire()
+            admitted = True
+        except QueueFull:
+            raise HTTPException(429, "Too many requests queued", headers={"Retry-After": "1"})
+        except QueueTimeout:
+            raise HTTPException(503, "Timed out waiting for a free worker", headers={"Retry-After": "1"})
+        finally:
+            if not admitted:
+                session.lock.release()
+        release = release_once(admission.release, session.lock.release)
+
+        if not request.stream:
+            try:
+                async for event in agentic_qa_astream(request.question, session.history):
+                    final = event
+            finally:
+                release()
+            return {"session_id": session_id, "generation": final["generation"], "trace": final["trace"]}
+
+        async def events():
+            try:
+                async for event in agentic_qa_astream(request.question, session.history):
+                    if event["type"] == "final":
+                        event = {"type": "final", "generation": event["generation"],
+                                 "session_id": session_id, "trace": event["trace"]}
+                    yield json.dumps(event) + "\n"
+            except Exception as exc:
+                yield json.dumps({"type": "error", "message": repr(exc)}) + "\n"
+            finally:
+                release()
+
+        return GuardedStreamingResponse(
+            events(), on_close=release, media_type="application/x-ndjson",
+            headers={"X-Session-Id": session_id}
+        )
+
+    @app.get("/v1/sessions/{session_id}")
+    async def session_metrics(session_id: str):
+        session = sessions.get(session_id, create=False)
+        if session is None:
+            raise HTTPException(404, "Unknown session")
+        return session.history.metrics()
+
+    @app.delete("/v1/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        if not sessions.delete(session_id):
+            raise HTTPException(404, "Unknown session")
+        return {"deleted": session_id}
+
+    return app
+
+
+app = create_app()
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", "8000")))
@@ -8,4 +8,119 @@ OPENAI_KEY = os.getenv("OPENAI_KEY")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
+
+# Default locations are relative to the project root, so every entry point shares them
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.path.join(PROJECT_ROOT, ".cache")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-small")
+
+# Document grading: "batch" (concurrent per-document calls), "single_call"
+# (one structured call for all documents), "sequential" or "rerank" (local
+# scorer, LLM grader only for borderline scores)
+GRADING_MODE = os.getenv("GRADING_MODE", "batch")
+GRADING_MAX_CONCURRENCY = int(os.getenv("GRADING_MAX_CONCURRENCY", "8"))
+RERANKER = os.getenv("RERANKER", "embedding")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_HIGH_THRESHOLD = float(os.getenv("RERANK_HIGH_THRESHOLD", "0.55"))
+RERANK_LOW_THRESHOLD = float(os.getenv("RERANK_LOW_THRESHOLD", "0.3"))
+
+# PDF ingestion
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "4"))
+# Extracted PDF text, cached per file content hash and parser version ("" disables)
+PDF_TEXT_CACHE_DIR = os.getenv("PDF_TEXT_CACHE_DIR", os.path.join(CACHE_DIR, "pdf_text"))
+
+# Embedding cache
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", os.path.join(CACHE_DIR, "embedding_cache.sqlite3"))
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000"))
+
+# Batched index writing
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+
+# Semantic answer cache
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# Secondary retrieval for the corrective branch: "bm25" (local keyword index) or "http"
+SECONDARY_RETRIEVER = os.getenv("SECONDARY_RETRIEVER", "bm25")
+SECONDARY_K = int(os.getenv("SECONDARY_K", "3"))
+SEARCH_API_URL = os.getenv("SEARCH_API_URL", "http://127.0.0.1:8765/search")
+
+# Primary retrieval: "dense" (Chroma similarity threshold) or "hybrid" (dense + BM25 with RRF)
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+
+# Chat history: token budget of verbatim recent turns; older turns are summarized
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1000"))
+
+# HTTP serving
+SERVER_MAX_CONCURRENCY = int(os.getenv("SERVER_MAX_CONCURRENCY", "32"))
+SERVER_MAX_QUEUE = int(os.getenv("SERVER_MAX_QUEUE", "256"))
+SERVER_QUEUE_TIMEOUT = float(os.getenv("SERVER_QUEUE_TIMEOUT", "30"))
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+# Requests of one session waiting for its previous request to finish
+SESSION_MAX_QUEUE = int(os.getenv("SESSION_MAX_QUEUE", "4"))
+RAG_SERVER_URL = os.getenv("RAG_SERVER_URL", "")
+
+# Observability: structured logs ("json" or "text"), optional OpenTelemetry spans
+LOG_ENABLED = os.getenv("LOG_ENABLED", "true").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"
+
+# Corrective loop: generate once this share of the graded chunks is relevant, cap the
+# rewrite-and-search passes and bound each request's seconds and LLM tokens (0 = unlimited)
+RELEVANCE_THRESHOLD = float(os.getenv("RELEVANCE_THRESHOLD", "0.6"))
+MAX_CORRECTIVE_ITERATIONS = int(os.getenv("MAX_CORRECTIVE_ITERATIONS", "1"))
+REQUEST_LATENCY_BUDGET = float(os.getenv("REQUEST_LATENCY_BUDGET", "0"))
+REQUEST_TOKEN_BUDGET = int(os.getenv("REQUEST_TOKEN_BUDGET", "0"))
+
+# Chunking: "structure" (token-sized, heading/paragraph/table aware), "token" (recursive
+# splitter measured in tokens) or "recursive" (the original 1000/200 character splitter)
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "structure")
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "350"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+
+# Near-duplicate suppression: MinHash threshold (estimated Jaccard) at ingestion, and
+# "collapse", "mmr" or "none" over the fused retrieval candidates
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "64"))
+RETRIEVAL_DEDUP = os.getenv("RETRIEVAL_DEDUP", "collapse")
+RETRIEVAL_DEDUP_THRESHOLD = float(os.getenv("RETRIEVAL_DEDUP_THRESHOLD", "0.6"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# LLM response cache: exact-match cache of chat completions shared by all agents,
+# "sqlite", "memory" or "none"; TTL in seconds (0 = no expiry)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "sqlite")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_ITEM_BYTES = int(os.getenv("LLM_CACHE_MAX_ITEM_BYTES", "65536"))
+
+# Request coalescing: identical concurrent questions share one graph run. Questions
+# match "normalized" or "exact", with the "full" chat history or "none"; followers
+# wait at most COALESCE_TIMEOUT seconds for the shared run (0 = no limit)
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+COALESCE_KEY = os.getenv("COALESCE_KEY", "normalized")
+COALESCE_HISTORY = os.getenv("COALESCE_HISTORY", "full")
+COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "120"))
+
+# Dense vector backend: "chroma" (persistent HNSW collection) or "compact" (read-only,
+# memory-mapped export of the collection, refreshed by ingestion). The compact index
+# stores "float32", "float16" or "int8" vectors and is scanned brute force, or with
+# COMPACT_IVF_LISTS inverted lists of which COMPACT_IVF_PROBES are searched per query
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+COMPACT_INDEX_DTYPE = os.getenv("COMPACT_INDEX_DTYPE", "int8")
+COMPACT_IVF_LISTS = int(os.getenv("COMPACT_IVF_LISTS", "0"))
+COMPACT_IVF_PROBES = int(os.getenv("COMPACT_IVF_PROBES", "8"))
+
+# Index snapshots: previous versions kept for rollback, and the checks run before a new
+# version is served (stored vectors searched for themselves, plus ";"-separated sample
+# queries that must return results)
+INDEX_KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "3"))
+INDEX_VALIDATION_SAMPLES = int(os.getenv("INDEX_VALIDATION_SAMPLES", "5"))
+INDEX_VALIDATION_QUERIES = [query for query in os.getenv("INDEX_VALIDATION_QUERIES", "").split(";") if query.strip()]
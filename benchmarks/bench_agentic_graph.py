@@ -0,0 +1,286 @@
+"""
+Offline Agentic Graph Benchmark
+
+Runs ``agentic_qa`` and ``historical_qa_context`` end to end against deterministic
+fake chat and embedding models (``benchmarks/fakes.py``) and a synthetic corpus in an
+in-memory Chroma collection, so no network or API key is needed and runs are
+comparable across commits. Reports
+  - per-node latency of the agentic graph (mean, p50, p99),
+  - end-to-end latency (p50, p99) and LLM calls/tokens per question,
+  - throughput at each concurrency level (``agentic_qa_async`` on one event loop,
+    ``historical_qa_context`` on a thread pool),
+  - peak traced Python allocations and peak RSS.
+
+Usage:
+    python benchmarks/bench_agentic_graph.py [--docs 500] [--questions 50] [--concurrency 1,8,32]
+        [--llm-latency 0.05] [--embed-latency 0.01] [--completion-tokens 20]
+        [--grading-mode batch] [--retrieval hybrid] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_chroma import Chroma
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, synthetic_corpus, synthetic_questions
+from document_processing import doc_qa
+from document_processing.chat_history import ChatHistoryManager
+from document_processing.doc_index_writer import IndexWriter
+from document_processing.hybrid_retrieval import HybridRetriever
+from document_processing.proj_lang_graph import AgenticRAGEngine, set_engine
+from document_processing.proj_metrics import configure_logging
+from document_processing.secondary_retrieval import BM25Index, BM25Retriever, BM25_INDEX_FILE
+
+
+def percentile(values: list, p: float) -> float:
+    """
+    Nearest-rank percentile.
+
+    Args:
+        values (list): Samples.
+        p (float): Percentile in [0, 100].
+
+    Returns:
+        float: The percentile, or 0.0 without samples.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def summarize(latencies: list) -> dict:
+    return {
+        "count": len(latencies),
+        "mean_s": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p99_s": percentile(latencies, 99),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MiB (0.0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def build_engine(args, workdir: str, **engine_kwargs):
+    """
+    Indexes a synthetic corpus and installs an engine running on fake models.
+
+    Args:
+        args (argparse.Namespace): Benchmark settings.
+        workdir (str): Directory for the BM25 index file.
+        **engine_kwargs: Extra ``AgenticRAGEngine`` arguments.
+
+    Returns:
+        tuple: The engine, the fake chat model and the fake embeddings.
+    """
+    llm = FakeChatModel(latency=args.llm_latency, token_latency=args.token_latency,
+                        completion_tokens=args.completion_tokens, relevance_rate=args.relevance_rate)
+    embeddings = FakeEmbeddings(latency=args.embed_latency)
+    docs = synthetic_corpus(args.docs, n_topics=args.topics)
+
+    chroma_db = Chroma(
+        collection_name=f"bench_{uuid.uuid4().hex[:8]}",
+        embedding_function=embeddings,
+        collection_metadata={"hnsw:space": "cosine"},
+    )
+    IndexWriter(chroma_db, embedding=embeddings).write(docs)
+    bm25_index = BM25Index()
+    bm25_index.add(docs, [doc.metadata["chunk_id"] for doc in docs])
+    bm25_path = os.path.join(workdir, BM25_INDEX_FILE)
+    bm25_index.save(bm25_path)
+    keyword_retriever = BM25Retriever(bm25_path)
+
+    if args.retrieval == "hybrid":
+        retriever = HybridRetriever(vectorstore=chroma_db, keyword_retriever=keyword_retriever)
+    else:
+        retriever = chroma_db.as_retriever(search_kwargs={"k": 3})
+
+    engine = AgenticRAGEngine(
+        llm=llm, retriever=retriever, grading_mode=args.grading_mode, embeddings=embeddings,
+        answer_cache=False, secondary_retriever=keyword_retriever, **engine_kwargs
+    )
+    set_engine(engine)
+    return engine, llm, embeddings
+
+
+def bench_nodes(questions: list) -> dict:
+    """
+    Collects the wall time of every graph node from the request traces of ``agentic_qa_stream``.
+
+    Returns:
+        dict: Per-node latency summary and how often each node ran.
+    """
+    per_node = defaultdict(list)
+    for question in questions:
+        for event in doc_qa.agentic_qa_stream(question, ChatHistoryManager()):
+            if event["type"] == "final":
+                for node in event["trace"]["nodes"]:
+                    per_node[node["node"]].append(node["wall_s"])
+    return {node: dict(summarize(latencies), runs=len(latencies)) for node, latencies in per_node.items()}
+
+
+def bench_sequential(fn, questions: list, llm: FakeChatModel) -> dict:
+    """
+    Runs ``fn`` on every question one after another.
+
+    Returns:
+        dict: End-to-end latency summary plus LLM calls and tokens per question.
+    """
+    before = llm.stats.snapshot()
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        fn(question)
+        latencies.append(time.perf_counter() - start)
+    after = llm.stats.snapshot()
+    result = summarize(latencies)
+    for key in after:
+        result[f"llm_{key}_per_question"] = (after[key] - before[key]) / len(questions)
+    return result
+
+
+async def _agentic_concurrent(questions: list, concurrency: int) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(question):
+        async with semaphore:
+            start = time.perf_counter()
+            await doc_qa.agentic_qa_async(question, ChatHistoryManager())
+            return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(question) for question in questions))
+
+
+def _historical_concurrent(questions: list, concurrency: int) -> list:
+    def one(question):
+        start = time.perf_counter()
+        doc_qa.historical_qa_context(question)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, questions))
+
+
+def bench_concurrency(levels: list, questions: list) -> dict:
+    """
+    Measures throughput and latency of both entry points at each concurrency level.
+
+    Returns:
+        dict: Per entry point and level, questions per second and latency summary.
+    """
+    results = {"agentic_qa": {}, "historical_qa_context": {}}
+    for level in levels:
+        start = time.perf_counter()
+        latencies = asyncio.run(_agentic_concurrent(questions, level))
+        elapsed = time.perf_counter() - start
+        results["agentic_qa"][str(level)] = dict(summarize(latencies), throughput_qps=len(questions) / elapsed)
+
+        start = time.perf_counter()
+        latencies = _historical_concurrent(questions, level)
+        elapsed = time.perf_counter() - start
+        results["historical_qa_context"][str(level)] = dict(summarize(latencies), throughput_qps=len(questions) / elapsed)
+    return results
+
+
+def bench_memory(questions: list) -> dict:
+    """
+    Traces Python allocations over one sequential pass of both entry points.
+
+    Kept separate from the timed runs because tracing slows allocation-heavy code.
+
+    Returns:
+        dict: Peak traced MiB per entry point.
+    """
+    results = {}
+    for name, fn in (("agentic_qa", lambda q: doc_qa.agentic_qa(q, ChatHistoryManager())),
+                     ("historical_qa_context", doc_qa.historical_qa_context)):
+        tracemalloc.start()
+        for question in questions:
+            fn(question)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = {"peak_traced_mb": peak / (1024 * 1024)}
+    return results
+
+
+def run(args) -> dict:
+    """
+    Builds the fake engine and runs every benchmark phase.
+
+    Args:
+        args (argparse.Namespace): Benchmark settings.
+
+    Returns:
+        dict: Settings and results, JSON-serializable.
+    """
+    configure_logging(enabled=args.log)
+    questions = synthetic_questions(args.questions, n_topics=args.topics)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        engine, llm, embeddings = build_engine(args, workdir)
+        setup_s = time.perf_counter() - start
+
+        # The entry points and graph nodes print progress; keep it out of the report
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results = {
+                "setup_s": setup_s,
+                "nodes": bench_nodes(questions),
+                "sequential": {
+                    "agentic_qa": bench_sequential(
+                        lambda q: doc_qa.agentic_qa(q, ChatHistoryManager()), questions, llm),
+                    "historical_qa_context": bench_sequential(doc_qa.historical_qa_context, questions, llm),
+                },
+                "concurrency": bench_concurrency(levels, questions),
+                "memory": bench_memory(questions[:args.memory_questions]),
+            }
+    results["memory"]["peak_rss_mb"] = peak_rss_mb()
+    results["embedding_calls"] = embeddings.stats.snapshot()["calls"]
+    return {"settings": vars(args), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=500, help="Chunks in the synthetic corpus")
+    parser.add_argument("--topics", type=int, default=50, help="Topics in the synthetic corpus")
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated concurrency levels")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--completion-tokens", type=int, default=20)
+    parser.add_argument("--relevance-rate", type=float, default=0.7,
+                        help="Share of chunks the fake grader calls relevant")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per embedding call")
+    parser.add_argument("--grading-mode", default="batch", choices=["batch", "single_call", "sequential", "rerank"])
+    parser.add_argument("--retrieval", default="hybrid", choices=["hybrid", "dense"])
+    parser.add_argument("--memory-questions", type=int, default=10,
+                        help="Questions per entry point in the traced memory pass")
+    parser.add_argument("--log", action="store_true", help="Keep the structured request logs on")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
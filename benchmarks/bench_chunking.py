@@ -0,0 +1,166 @@
+"""
+Chunking Strategy Benchmark
+
+Chunks the PDFs in ``project_data`` with every chunking strategy, indexes each result
+into its own temporary Chroma collection and reports per strategy
+  - chunk count and chunk-size statistics in tokens,
+  - index size on disk and tokens embedded,
+  - chunking and indexing time,
+  - retrieval hit rate and MRR: a question hits when one of the top-k chunks
+    contains one of its expected answer phrases.
+
+Embeddings are not cached, so indexing time reflects a cold ingest. Pass
+``--fake-embeddings`` to compare sizes and timings offline (hit rates are then only
+lexical).
+
+Usage:
+    python benchmarks/bench_chunking.py [--strategies structure,token,recursive] [--k 3]
+        [--chunk-tokens 350] [--overlap-tokens 30] [--fake-embeddings] [--out results.json]
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_config.open_ai_cred import EMBED_MODEL, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from document_processing.doc_chunking import STRATEGIES, chunk_documents, chunk_stats
+from document_processing.doc_indexer import data_folder
+from document_processing.doc_index_writer import IndexWriter
+from document_processing.pdf_text import load_pdf_pages
+
+# (question, expected answer phrases) over the papers in project_data
+QUESTIONS = [
+    ("What BLEU score does the Transformer reach on WMT 2014 English-to-German?", ["28.4 BLEU"]),
+    ("How many parallel attention heads does the Transformer employ?", ["8 parallel attention layers"]),
+    ("Which optimizer was used to train the Transformer?", ["Adam optimizer"]),
+    ("How long did it take to train the big Transformer models?", ["3.5 days"]),
+    ("What attention mechanism does Mistral 7B use for faster inference?", ["grouped-query attention"]),
+    ("Which attention does Mistral 7B use to handle long sequences at lower cost?", ["sliding window attention"]),
+    ("Which larger Llama model does Mistral 7B outperform on all benchmarks?", ["Llama 2 13B"]),
+    ("How did GPT-4 score on a simulated bar exam?", ["top 10%"]),
+    ("What kind of model is GPT-4?", ["large-scale, multimodal model", "multimodal model"]),
+    ("Which reinforcement learning algorithm fine-tunes InstructGPT?", ["PPO"]),
+    ("How many labelers did OpenAI hire for InstructGPT?", ["about 40 contractors", "40 contractors"]),
+    ("How many parameters does the InstructGPT model preferred over GPT-3 175B have?", ["1.3B"]),
+]
+
+
+def normalize(text: str) -> str:
+    """Lowercases and drops everything but letters and digits, so PDF spacing does not matter."""
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def directory_size(path: str) -> int:
+    """Total size in bytes of the files below ``path``."""
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names
+    )
+
+
+def load_pages(data_dir: str) -> dict:
+    """
+    Parses every PDF once, or reads its pages from the extracted-text cache.
+
+    Returns:
+        dict: File name to its page documents.
+    """
+    return {
+        name: list(load_pdf_pages(os.path.join(data_dir, name)))
+        for name in sorted(os.listdir(data_dir)) if name.lower().endswith(".pdf")
+    }
+
+
+def make_embeddings(fake: bool):
+    if fake:
+        from benchmarks.fakes import FakeEmbeddings
+        return FakeEmbeddings(latency=0.0)
+    from langchain.embeddings import OpenAIEmbeddings
+    return OpenAIEmbeddings(model=EMBED_MODEL)
+
+
+def evaluate(chroma_db, k: int) -> dict:
+    """
+    Scores retrieval against ``QUESTIONS``.
+
+    Returns:
+        dict: Hit rate and mean reciprocal rank at ``k``.
+    """
+    hits, reciprocal_ranks = 0, []
+    for question, phrases in QUESTIONS:
+        targets = [normalize(phrase) for phrase in phrases]
+        rank = next((
+            i for i, doc in enumerate(chroma_db.similarity_search(question, k=k), 1)
+            if any(target in normalize(doc.page_content) for target in targets)
+        ), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+    return {"hit_rate": hits / len(QUESTIONS), "mrr": sum(reciprocal_ranks) / len(QUESTIONS)}
+
+
+def run_strategy(strategy: str, pages: dict, args) -> dict:
+    """
+    Chunks, indexes and evaluates one strategy.
+
+    Returns:
+        dict: Sizes, timings and retrieval quality of the strategy.
+    """
+    from langchain_chroma import Chroma
+
+    start = time.perf_counter()
+    chunks = []
+    for file_pages in pages.values():
+        chunks.extend(chunk_documents(file_pages, strategy, args.chunk_tokens, args.overlap_tokens))
+    chunk_s = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as persist_directory:
+        chroma_db = Chroma(
+            collection_name=f"bench_{strategy}",
+            embedding_function=make_embeddings(args.fake_embeddings),
+            persist_directory=persist_directory,
+            collection_metadata={"hnsw:space": "cosine"},
+        )
+        start = time.perf_counter()
+        IndexWriter(chroma_db).write(chunks)
+        index_s = time.perf_counter() - start
+        quality = evaluate(chroma_db, args.k)
+        index_bytes = directory_size(persist_directory)
+
+    return dict(
+        chunk_stats(chunks),
+        index_bytes=index_bytes,
+        chunk_s=round(chunk_s, 3),
+        index_s=round(index_s, 3),
+        **quality,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=data_folder)
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--chunk-tokens", type=int, default=CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--k", type=int, default=3, help="Chunks retrieved per question")
+    parser.add_argument("--fake-embeddings", action="store_true", help="Use offline hashed embeddings")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pages = load_pages(args.data_dir)
+    results = {
+        "settings": vars(args),
+        "parse_s": round(time.perf_counter() - start, 3),
+        "strategies": {strategy: run_strategy(strategy, pages, args) for strategy in args.strategies.split(",")},
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
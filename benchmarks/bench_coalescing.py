@@ -0,0 +1,144 @@
+"""
+Request Coalescing Benchmark
+
+Fires the same question from many sessions at once, with request coalescing off and
+on, against the fake models and synthetic corpus of ``bench_agentic_graph.py``. For
+every number of duplicate concurrent requests it reports upstream LLM calls, calls
+per request, wall time and latency percentiles. Three entry points are measured:
+``agentic_qa_async`` and ``agentic_qa_astream`` on one event loop and ``agentic_qa``
+on a thread pool. With coalescing on, LLM calls
+stay flat as duplicates grow; without it they grow linearly.
+
+Usage:
+    python benchmarks/bench_coalescing.py [--duplicates 1,8,32,128] [--llm-latency 0.05]
+        [--token-latency 0.0] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_agentic_graph import build_engine, summarize
+from benchmarks.fakes import synthetic_questions
+from document_processing import doc_qa
+from document_processing.chat_history import ChatHistoryManager
+from document_processing.proj_coalesce import RequestCoalescer
+from document_processing.proj_lang_graph import mark_coalesced
+from document_processing.proj_metrics import configure_logging
+
+
+async def _async_invoke(question: str, duplicates: int):
+    async def one():
+        start = time.perf_counter()
+        generation, _ = await doc_qa.agentic_qa_async(question, ChatHistoryManager())
+        return time.perf_counter() - start, generation
+
+    return await asyncio.gather(*(one() for _ in range(duplicates)))
+
+
+async def _async_stream(question: str, duplicates: int):
+    async def one():
+        start = time.perf_counter()
+        tokens = 0
+        async for event in doc_qa.agentic_qa_astream(question, ChatHistoryManager()):
+            tokens += event["type"] == "token"
+        return time.perf_counter() - start, tokens
+
+    return await asyncio.gather(*(one() for _ in range(duplicates)))
+
+
+def _thread_invoke(question: str, duplicates: int):
+    def one(_):
+        start = time.perf_counter()
+        generation, _ = doc_qa.agentic_qa(question, ChatHistoryManager())
+        return time.perf_counter() - start, generation
+
+    with ThreadPoolExecutor(max_workers=duplicates) as pool:
+        return list(pool.map(one, range(duplicates)))
+
+
+ENTRY_POINTS = {
+    "agentic_qa_async": lambda question, duplicates: asyncio.run(_async_invoke(question, duplicates)),
+    "agentic_qa_astream": lambda question, duplicates: asyncio.run(_async_stream(question, duplicates)),
+    "agentic_qa_threads": _thread_invoke,
+}
+
+
+def bench_level(entry_point: str, question: str, duplicates: int, llm) -> dict:
+    """
+    Sends ``duplicates`` identical concurrent requests through one entry point.
+
+    Returns:
+        dict: LLM calls, calls per request, wall time and latency summary.
+    """
+    before = llm.stats.snapshot()["calls"]
+    start = time.perf_counter()
+    results = ENTRY_POINTS[entry_point](question, duplicates)
+    wall_s = time.perf_counter() - start
+    calls = llm.stats.snapshot()["calls"] - before
+    return dict(
+        summarize([latency for latency, _ in results]),
+        llm_calls=calls,
+        llm_calls_per_request=calls / duplicates,
+        wall_s=wall_s,
+    )
+
+
+def run(args) -> dict:
+    """
+    Builds the fake engine and measures every entry point with coalescing off and on.
+
+    Args:
+        args (argparse.Namespace): Benchmark settings.
+
+    Returns:
+        dict: Settings and results, JSON-serializable.
+    """
+    configure_logging(enabled=False)
+    levels = [int(level) for level in args.duplicates.split(",")]
+    questions = iter(synthetic_questions(2 * len(ENTRY_POINTS) * len(levels), n_topics=args.topics, seed=7))
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        engine, llm, _ = build_engine(args, workdir, coalescer=False)
+        coalescer = RequestCoalescer(timeout=args.timeout, share=mark_coalesced)
+        for mode in ("off", "on"):
+            engine.coalescer = coalescer if mode == "on" else None
+            results[mode] = {
+                entry_point: {
+                    str(level): bench_level(entry_point, next(questions), level, llm) for level in levels
+                }
+                for entry_point in ENTRY_POINTS
+            }
+    return {"settings": vars(args), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duplicates", default="1,8,32,128", help="Comma-separated duplicate request counts")
+    parser.add_argument("--docs", type=int, default=500, help="Chunks in the synthetic corpus")
+    parser.add_argument("--topics", type=int, default=50, help="Topics in the synthetic corpus")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per generated token")
+    parser.add_argument("--completion-tokens", type=int, default=20)
+    parser.add_argument("--relevance-rate", type=float, default=0.7,
+                        help="Share of chunks the fake grader calls relevant")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per embedding call")
+    parser.add_argument("--grading-mode", default="batch", choices=["batch", "single_call", "sequential", "rerank"])
+    parser.add_argument("--retrieval", default="hybrid", choices=["hybrid", "dense"])
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds a coalesced request waits")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,118 @@
+"""
+PDF Parsing Benchmark
+
+Chunks every PDF in ``project_data`` four ways and reports, per file and in total,
+wall time and peak Python memory (``tracemalloc``, measured in a separate pass):
+  - eager: ``PyPDFLoader.load()`` materializes all pages before chunking,
+  - streaming: pages are parsed lazily and chunked as they arrive,
+  - cache_fill: streaming into an empty extracted-text cache,
+  - cache_hit: pages are read back from the cache without parsing.
+All modes must produce the same chunks; the benchmark fails otherwise.
+
+Usage:
+    python benchmarks/bench_pdf_parsing.py [--data-dir project_data] [--strategy structure]
+        [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_config.open_ai_cred import CHUNK_STRATEGY
+from document_processing.doc_chunking import STRATEGIES, chunk_documents
+from document_processing.doc_indexer import data_folder
+from document_processing.pdf_text import PageTextCache, file_sha256, iter_pdf_pages, load_pdf_pages
+from document_processing.proj_metrics import configure_logging
+
+
+def eager_pages(pdf_path: str, file_hash: str, cache_dir: str):
+    from langchain.document_loaders import PyPDFLoader
+
+    return PyPDFLoader(pdf_path).load()
+
+
+MODES = {
+    "eager": eager_pages,
+    "streaming": lambda pdf_path, file_hash, cache_dir: iter_pdf_pages(pdf_path),
+    "cache_fill": lambda pdf_path, file_hash, cache_dir: load_pdf_pages(pdf_path, file_hash, cache_dir),
+    "cache_hit": lambda pdf_path, file_hash, cache_dir: load_pdf_pages(pdf_path, file_hash, cache_dir),
+}
+
+
+def measure(mode: str, pdf_path: str, file_hash: str, cache_dir: str, strategy: str) -> tuple:
+    """
+    Chunks one PDF in one mode, once timed and once under ``tracemalloc``.
+
+    Returns:
+        tuple: ``(chunk_texts, result)`` where ``result`` holds seconds and peak MB.
+    """
+    def run():
+        return chunk_documents(MODES[mode](pdf_path, file_hash, cache_dir), strategy)
+
+    start = time.perf_counter()
+    chunks = run()
+    seconds = time.perf_counter() - start
+    if mode == "cache_fill":
+        # The traced pass must fill the cache again rather than read it
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return [chunk.page_content for chunk in chunks], {"seconds": seconds, "peak_mb": peak / 2**20,
+                                                      "chunks": len(chunks)}
+
+
+def run(args) -> dict:
+    """
+    Measures every mode on every PDF of the data folder.
+
+    Args:
+        args (argparse.Namespace): Benchmark settings.
+
+    Returns:
+        dict: Settings and results, JSON-serializable.
+    """
+    configure_logging(enabled=False)
+    names = sorted(name for name in os.listdir(args.data_dir) if name.lower().endswith(".pdf"))
+    results = {name: {} for name in names}
+    totals = {mode: {"seconds": 0.0, "peak_mb": 0.0} for mode in MODES}
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_dir = os.path.join(workdir, "pdf_text")
+        for name in names:
+            pdf_path = os.path.join(args.data_dir, name)
+            file_hash = file_sha256(pdf_path)
+            reference = None
+            for mode in MODES:
+                chunks, result = measure(mode, pdf_path, file_hash, cache_dir, args.strategy)
+                if reference is None:
+                    reference = chunks
+                elif chunks != reference:
+                    raise AssertionError(f"{mode} produced different chunks for {name}")
+                results[name][mode] = result
+                totals[mode]["seconds"] += result["seconds"]
+                totals[mode]["peak_mb"] = max(totals[mode]["peak_mb"], result["peak_mb"])
+            results[name]["cache_bytes"] = os.path.getsize(PageTextCache(cache_dir).path(file_hash))
+    return {"settings": vars(args), "totals": totals, "files": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=data_folder)
+    parser.add_argument("--strategy", default=CHUNK_STRATEGY, choices=STRATEGIES)
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
@@ -0,0 +1,75 @@
+"""
+Startup Benchmark
+
+Measures, in a fresh interpreter per run, how long a process takes to
+  - import the query entry point (``document_processing.doc_qa``),
+  - warm up (build the engine, open Chroma and the keyword index),
+  - answer its first question.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 3] [--question "..."] [--no-answer] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+timings = {{}}
+start = time.perf_counter()
+from document_processing import doc_qa
+timings["import_s"] = time.perf_counter() - start
+start = time.perf_counter()
+doc_qa.warm_up()
+timings["warm_up_s"] = time.perf_counter() - start
+if {answer!r}:
+    start = time.perf_counter()
+    doc_qa.agentic_qa({question!r}, [])
+    timings["first_answer_s"] = time.perf_counter() - start
+print("TIMINGS" + json.dumps(timings))
+"""
+
+
+def run_once(question: str, answer: bool) -> dict:
+    """
+    Runs the probe in a new interpreter and returns its timings.
+
+    Args:
+        question (str): First question to answer.
+        answer (bool): Whether to answer the question at all.
+
+    Returns:
+        dict: Seconds spent importing, warming up and (optionally) answering.
+    """
+    code = PROBE.format(root=ROOT, question=question, answer=answer)
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    line = next(line for line in output.splitlines() if line.startswith("TIMINGS"))
+    return json.loads(line[len("TIMINGS"):])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--question", default="How does GPT-4 work?")
+    parser.add_argument("--no-answer", action="store_true", help="Skip the first answer (no LLM calls)")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    runs = [run_once(args.question, not args.no_answer) for _ in range(args.runs)]
+    results = {
+        "runs": runs,
+        "median": {key: statistics.median(run[key] for run in runs) for key in runs[0]},
+    }
+    print(json.dumps(results, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
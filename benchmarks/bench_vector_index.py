@@ -0,0 +1,169 @@
+"""
+Compact Vector Index Benchmark
+
+Compares dense search on the Chroma collection with the compact, memory-mapped index
+(``document_processing/compact_index.py``) in every storage type, brute force and IVF.
+The corpus is either a synthetic one embedded with the offline fake embeddings, or the
+real ``capstone_proj`` collection. Queries are stored vectors with Gaussian noise, so
+no embedding calls are made. Exact float32 search is the ground truth. Reports per
+configuration
+  - recall@k against the exact top k,
+  - search latency (mean, p50, p99) and queries per second,
+  - index size on disk and time to build and open it.
+
+Usage:
+    python benchmarks/bench_vector_index.py [--source synthetic|collection] [--docs 20000]
+        [--queries 200] [--k 3] [--ivf-lists 0,128] [--nprobe 4,16] [--out results.json]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+
+import numpy as np
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_agentic_graph import summarize
+from benchmarks.bench_chunking import directory_size
+from document_processing.compact_index import COMPACT_DTYPES, CompactVectorIndex, export_collection
+
+
+def open_source(args, workdir: str):
+    """
+    Opens the collection to benchmark.
+
+    Returns:
+        tuple: The Chroma handle and the directory it persists to.
+    """
+    from langchain_chroma import Chroma
+
+    if args.source == "collection":
+        from app_config.open_ai_cred import MODEL_NAME, EMBED_MODEL
+        from document_processing.doc_indexer import VectorStore
+
+        vector_store = VectorStore(MODEL_NAME, EMBED_MODEL)
+        return vector_store.vectord_db_loader(), vector_store.persist_directory()
+
+    from benchmarks.fakes import FakeEmbeddings, synthetic_corpus
+    from document_processing.doc_index_writer import IndexWriter
+
+    embeddings = FakeEmbeddings(latency=0.0)
+    persist_directory = os.path.join(workdir, "chroma")
+    chroma_db = Chroma(
+        collection_name=f"bench_{uuid.uuid4().hex[:8]}",
+        embedding_function=embeddings,
+        persist_directory=persist_directory,
+        collection_metadata={"hnsw:space": "cosine"},
+    )
+    IndexWriter(chroma_db, embedding=embeddings).write(synthetic_corpus(args.docs, n_topics=args.topics))
+    return chroma_db, persist_directory
+
+
+def make_queries(index: CompactVectorIndex, n_queries: int, noise: float, seed: int = 1) -> np.ndarray:
+    """Samples stored vectors, adds Gaussian noise and renormalizes."""
+    rng = np.random.default_rng(seed)
+    rows = np.asarray(index.vectors[rng.choice(len(index), n_queries)], dtype=np.float32)
+    queries = rows + rng.normal(0.0, noise / np.sqrt(rows.shape[1]), rows.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def time_search(search, queries: np.ndarray, k: int) -> tuple:
+    """
+    Runs every query once.
+
+    Returns:
+        tuple: ``(result_ids, latency_summary)``.
+    """
+    results, latencies = [], []
+    start = time.perf_counter()
+    for query in queries:
+        query_start = time.perf_counter()
+        results.append(search(query.tolist(), k))
+        latencies.append(time.perf_counter() - query_start)
+    elapsed = time.perf_counter() - start
+    return results, dict(summarize(latencies), qps=len(queries) / elapsed)
+
+
+def recall(results: list, truth: list, k: int) -> float:
+    return sum(len(set(found[:k]) & set(expected)) for found, expected in zip(results, truth)) / (k * len(truth))
+
+
+def run(args) -> dict:
+    """
+    Builds every index configuration and measures it against exact search.
+
+    Args:
+        args (argparse.Namespace): Benchmark settings.
+
+    Returns:
+        dict: Settings and results, JSON-serializable.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        chroma_db, chroma_dir = open_source(args, workdir)
+        build_s = time.perf_counter() - start
+
+        exact_path = os.path.join(workdir, "exact")
+        export_collection(chroma_db, exact_path, "float32", 0)
+        exact = CompactVectorIndex(exact_path)
+        queries = make_queries(exact, args.queries, args.noise)
+
+        def exact_search(query, k):
+            return [exact.ids[position] for position, _ in exact.search(query, k)]
+
+        truth, latency = time_search(exact_search, queries, args.k)
+        results["exact_float32"] = dict(latency, recall=1.0)
+
+        def chroma_search(query, k):
+            return [doc.metadata.get("chunk_id") for doc in chroma_db.similarity_search_by_vector(query, k=k)]
+
+        found, latency = time_search(chroma_search, queries, args.k)
+        results["chroma_hnsw"] = dict(latency, recall=recall(found, truth, args.k),
+                                      index_bytes=directory_size(chroma_dir), build_s=build_s)
+
+        for ivf_lists in [int(value) for value in args.ivf_lists.split(",")]:
+            for dtype in COMPACT_DTYPES:
+                path = os.path.join(workdir, f"compact_{dtype}_{ivf_lists}")
+                start = time.perf_counter()
+                export_collection(chroma_db, path, dtype, ivf_lists)
+                export_s = time.perf_counter() - start
+                start = time.perf_counter()
+                index = CompactVectorIndex(path)
+                open_s = time.perf_counter() - start
+                probes = [int(value) for value in args.nprobe.split(",")] if ivf_lists else [0]
+                for nprobe in probes:
+                    def compact_search(query, k):
+                        return [index.ids[position] for position, _ in index.search(query, k, nprobe)]
+
+                    found, latency = time_search(compact_search, queries, args.k)
+                    name = f"compact_{dtype}" + (f"_ivf{ivf_lists}_probe{nprobe}" if ivf_lists else "_brute")
+                    results[name] = dict(latency, recall=recall(found, truth, args.k),
+                                         index_bytes=directory_size(path), export_s=export_s, open_s=open_s)
+    return {"settings": vars(args), "vectors": len(exact), "results": results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="synthetic", choices=["synthetic", "collection"])
+    parser.add_argument("--docs", type=int, default=20000, help="Chunks in the synthetic corpus")
+    parser.add_argument("--topics", type=int, default=200, help="Topics in the synthetic corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.3, help="Query noise relative to the vector norm")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--ivf-lists", default="0,128", help="Comma-separated list counts; 0 is brute force")
+    parser.add_argument("--nprobe", default="4,16", help="Comma-separated lists probed per IVF query")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
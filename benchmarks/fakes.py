@@ -0,0 +1,296 @@
+"""
+Deterministic Stand-ins for Offline Benchmarks
+
+``FakeChatModel`` and ``FakeEmbeddings`` replace ``ChatOpenAI`` and
+``OpenAIEmbeddings`` with deterministic models that sleep for a configurable latency
+and count calls and tokens; ``FakeRetriever`` stands in for the dense retriever. ``synthetic_corpus`` and ``synthetic_questions`` build a
+corpus of any size whose questions share vocabulary with the chunks they target, so
+retrieval and grading behave plausibly without a network.
+"""
+
+import os
+import sys
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, List
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.runnables import RunnableLambda
+
+from document_processing.secondary_retrieval import tokenize
+
+
+class CallStats:
+    """
+    Thread-safe counters of model calls and tokens.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+
+
+def _stable_fraction(text: str) -> float:
+    """Maps text to a deterministic number in [0, 1)."""
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model that answers deterministically after a fixed latency.
+
+    Attributes:
+        latency (float): Seconds per call (time to first token when streaming).
+        token_latency (float): Extra seconds per streamed token.
+        completion_tokens (int): Tokens in every free-text reply.
+        relevance_rate (float): Share of documents the structured grader calls relevant.
+        stats (CallStats): Call and token counters.
+    """
+
+    latency: float = 0.05
+    token_latency: float = 0.0
+    completion_tokens: int = 20
+    relevance_rate: float = 0.7
+    stats: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.stats is None:
+            self.stats = CallStats()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @staticmethod
+    def _prompt_text(messages) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _reply_tokens(self, prompt: str) -> List[str]:
+        words = tokenize(prompt)[-50:] or ["answer"]
+        rng = random.Random(prompt)
+        return [rng.choice(words) for _ in range(self.completion_tokens)]
+
+    def _result(self, prompt: str) -> ChatResult:
+        reply = self._reply_tokens(prompt)
+        usage = self._usage(prompt, reply)
+        message = AIMessage(content=" ".join(reply), usage_metadata=usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _usage(self, prompt: str, reply: List[str]) -> dict:
+        """Records the call and returns its usage in the shape chat models report it."""
+        prompt_tokens = len(prompt.split())
+        self.stats.record(prompt_tokens, len(reply))
+        return {"input_tokens": prompt_tokens, "output_tokens": len(reply),
+                "total_tokens": prompt_tokens + len(reply)}
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency + self.token_latency * self.completion_tokens)
+        return self._result(self._prompt_text(messages))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency + self.token_latency * self.completion_tokens)
+        return self._result(self._prompt_text(messages))
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        time.sleep(self.latency)
+        reply = self._reply_tokens(prompt)
+        for token in reply:
+            time.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, reply)))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        await asyncio.sleep(self.latency)
+        reply = self._reply_tokens(prompt)
+        for token in reply:
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(prompt, reply)))
+
+    def _structured_reply(self, schema, prompt: str):
+        """Builds a schema instance: one deterministic 'yes'/'no' per graded document."""
+        fields = getattr(schema, "__fields__", None) or getattr(schema, "model_fields", {})
+        if "binary_scores" in fields:
+            count = int(prompt.split(" in total)")[0].rsplit("(", 1)[-1])
+            scores = ["yes" if _stable_fraction(f"{prompt}\0{i}") < self.relevance_rate else "no"
+                      for i in range(count)]
+            return schema(binary_scores=scores)
+        return schema(binary_score="yes" if _stable_fraction(prompt) < self.relevance_rate else "no")
+
+    def with_structured_output(self, schema, **kwargs):
+        def grade(prompt_value):
+            prompt = prompt_value.to_string()
+            time.sleep(self.latency)
+            self.stats.record(len(prompt.split()), 5)
+            return self._structured_reply(schema, prompt)
+
+        async def agrade(prompt_value):
+            prompt = prompt_value.to_string()
+            await asyncio.sleep(self.latency)
+            self.stats.record(len(prompt.split()), 5)
+            return self._structured_reply(schema, prompt)
+
+        return RunnableLambda(grade, afunc=agrade)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Hashed bag-of-words embeddings with a fixed latency per call.
+
+    Texts sharing words get similar vectors, so dense retrieval over a synthetic
+    corpus returns sensible neighbours.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.01):
+        """
+        Args:
+            dim (int): Vector size.
+            latency (float): Seconds per embedding call.
+        """
+        self.dim = dim
+        self.latency = latency
+        self.stats = CallStats()
+
+    def _vector(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in tokenize(text):
+            vector[int(hashlib.md5(token.encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1.0
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        time.sleep(self.latency)
+        self.stats.record(sum(len(text.split()) for text in texts), 0)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        await asyncio.sleep(self.latency)
+        self.stats.record(sum(len(text.split()) for text in texts), 0)
+        return [self._vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeRetriever(BaseRetriever):
+    """
+    Keyword retriever over a ``BM25Index`` with a fixed latency per query.
+
+    Attributes:
+        index (BM25Index): Index searched.
+        k (int): Documents per query.
+        latency (float): Seconds per query.
+        stats (CallStats): Query counters.
+    """
+
+    index: Any
+    k: int = 3
+    latency: float = 0.0
+    stats: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.stats is None:
+            self.stats = CallStats()
+
+    def _search(self, query: str) -> List[Document]:
+        self.stats.record(len(query.split()), 0)
+        return [doc for doc, _ in self.index.search(query, self.k)]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        time.sleep(self.latency)
+        return self._search(query)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self._search(query)
+
+
+def synthetic_corpus(n_docs: int, words_per_doc: int = 150, n_topics: int = 50,
+                     seed: int = 0) -> List[Document]:
+    """
+    Builds a corpus of chunks, each mixing common words with words of one topic.
+
+    Args:
+        n_docs (int): Number of chunks.
+        words_per_doc (int): Words per chunk.
+        n_topics (int): Number of topics.
+        seed (int): Random seed.
+
+    Returns:
+        List[Document]: Chunks with ``source``, ``page``, ``topic`` and ``chunk_id`` metadata.
+    """
+    rng = random.Random(seed)
+    common = [f"word{i}" for i in range(500)]
+    topics = [[f"topic{t}term{i}" for i in range(20)] for t in range(n_topics)]
+    docs = []
+    for i in range(n_docs):
+        topic = i % n_topics
+        words = [rng.choice(topics[topic]) if rng.random() < 0.3 else rng.choice(common)
+                 for _ in range(words_per_doc)]
+        docs.append(Document(
+            page_content=" ".join(words),
+            metadata={"source": f"synthetic_{topic}.pdf", "page": i // n_topics,
+                      "topic": topic, "chunk_id": f"synthetic-{i}"},
+        ))
+    return docs
+
+
+def synthetic_questions(n_questions: int, n_topics: int = 50, seed: int = 1) -> List[str]:
+    """
+    Builds questions that each target one topic of :func:`synthetic_corpus`.
+
+    Args:
+        n_questions (int): Number of questions.
+        n_topics (int): Number of topics in the corpus.
+        seed (int): Random seed.
+
+    Returns:
+        List[str]: Questions.
+    """
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(n_questions):
+        topic = rng.randrange(n_topics)
+        terms = rng.sample([f"topic{topic}term{i}" for i in range(20)], 3)
+        questions.append(f"What does the corpus say about {' and '.join(terms)}?")
+    return questions
@@ -0,0 +1,183 @@
+"""
+Bounded Chat History
+
+``ChatHistoryManager`` replaces the ever-growing message list of a chat session. It
+stores each turn's source documents by chunk ID instead of by value, keeps only as
+many recent turns verbatim as fit in a token budget, and folds older turns into a
+running summary that is updated incrementally by an LLM. The prompt sees the summary
+plus the recent window, so prompt size stays bounded however long the session runs.
+"""
+
+import os
+import sys
+import threading
+from typing import List
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, BaseMessage
+from app_config.open_ai_cred import MODEL_NAME, HISTORY_TOKEN_BUDGET
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with ``tiktoken`` when it is installed, else estimates 4 characters per token.
+
+    Args:
+        text (str): Text to count.
+
+    Returns:
+        int: Token count.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(MODEL_NAME)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def count_message_tokens(messages: List[BaseMessage]) -> int:
+    """
+    Counts the tokens of a message list, including a small per-message overhead.
+
+    Args:
+        messages (List[BaseMessage]): Messages to count.
+
+    Returns:
+        int: Token count.
+    """
+    return sum(count_tokens(str(message.content)) + 4 for message in messages)
+
+
+class ChatHistoryManager:
+    """
+    Token-budgeted chat history with an incrementally updated summary of older turns.
+    """
+
+    def __init__(self, token_budget: int = HISTORY_TOKEN_BUDGET, summarizer=None):
+        """
+        Args:
+            token_budget (int): Maximum tokens of verbatim recent turns sent to the prompt.
+            summarizer (Runnable, optional): Takes ``summary`` and ``turns`` and returns the
+                updated summary. Without one, turns leaving the window are dropped.
+        """
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.summary = ""
+        self.turns: List[dict] = []
+        self.summarized_turns = 0
+        self.last_prompt_tokens = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.summarized_turns + len(self.turns)
+
+    @staticmethod
+    def _turn_tokens(turn: dict) -> int:
+        return count_tokens(turn["question"]) + count_tokens(turn["answer"]) + 8
+
+    @staticmethod
+    def _format_turns(turns: List[dict]) -> str:
+        return "\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns)
+
+    def messages(self) -> List[BaseMessage]:
+        """
+        Returns the history as sent to the prompts: the summary, then the recent turns.
+
+        Returns:
+            List[BaseMessage]: Prompt-ready messages.
+        """
+        with self._lock:
+            messages = []
+            if self.summary:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+            for turn in self.turns:
+                messages.append(HumanMessage(content=turn["question"]))
+                messages.append(AIMessage(content=turn["answer"]))
+            self.last_prompt_tokens = count_message_tokens(messages)
+            return messages
+
+    def _append(self, question: str, answer: str, documents: list) -> List[dict]:
+        """
+        Appends a turn and pops the oldest turns that no longer fit the budget.
+
+        Returns:
+            List[dict]: Turns leaving the window, oldest first.
+        """
+        with self._lock:
+            self.turns.append({
+                "question": question,
+                "answer": answer,
+                "chunk_ids": [doc.metadata["chunk_id"] for doc in documents if doc.metadata.get("chunk_id")],
+            })
+            evicted = []
+            while len(self.turns) > 1 and sum(map(self._turn_tokens, self.turns)) > self.token_budget:
+                evicted.append(self.turns.pop(0))
+            return evicted
+
+    def _fold(self, evicted: List[dict], summary: str):
+        """Records the new summary after ``evicted`` turns were summarized."""
+        with self._lock:
+            self.summary = summary
+            self.summarized_turns += len(evicted)
+
+    def add_turn(self, question: str, answer: str, documents: list):
+        """
+        Records a turn, summarizing the turns that fall out of the token window.
+
+        Args:
+            question (str): User question.
+            answer (str): Generated answer.
+            documents (list): Source documents; only their chunk IDs are kept.
+        """
+        evicted = self._append(question, answer, documents)
+        if not evicted:
+            return
+        summary = self.summary
+        if self.summarizer is not None:
+            summary = self.summarizer.invoke({"summary": summary or "(none)", "turns": self._format_turns(evicted)})
+        self._fold(evicted, summary)
+
+    async def aadd_turn(self, question: str, answer: str, documents: list):
+        """Async counterpart of :meth:`add_turn`."""
+        evicted = self._append(question, answer, documents)
+        if not evicted:
+            return
+        summary = self.summary
+        if self.summarizer is not None:
+            summary = await self.summarizer.ainvoke({"summary": summary or "(none)", "turns": self._format_turns(evicted)})
+        self._fold(evicted, summary)
+
+    def metrics(self) -> dict:
+        """
+        Returns size metrics for this session.
+
+        Returns:
+            dict: Turn counts, stored bytes and prompt tokens of the current history.
+        """
+        with self._lock:
+            stored_bytes = len(self.summary.encode("utf-8")) + sum(
+                len(turn["question"].encode("utf-8")) + len(turn["answer"].encode("utf-8"))
+                + sum(len(chunk_id) for chunk_id in turn["chunk_ids"])
+                for turn in self.turns
+            )
+            return {
+                "turns": self.summarized_turns + len(self.turns),
+                "window_turns": len(self.turns),
+                "summarized_turns": self.summarized_turns,
+                "memory_bytes": stored_bytes,
+                "window_tokens": sum(map(self._turn_tokens, self.turns)),
+                "summary_tokens": count_tokens(self.summary) if self.summary else 0,
+                "last_prompt_tokens": self.last_prompt_tokens,
+            }
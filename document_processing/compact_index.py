@@ -0,0 +1,352 @@
+"""
+Compact Vector Index
+
+A read-only, in-process alternative to the Chroma collection for read-heavy serving.
+``export_collection`` copies the ids, documents, metadata and embeddings of a Chroma
+collection into a directory of NumPy files. The vectors are L2-normalized and stored
+as float32, float16 or int8 (one scale per row). ``CompactVectorIndex`` opens them
+memory-mapped, so worker processes share one page-cached copy instead of each holding
+a Chroma client. Search is by cosine similarity, either a vectorized brute-force scan
+or an inverted file (IVF): rows are grouped by their nearest k-means centroid, and a
+query scans only the lists of its ``nprobe`` nearest centroids.
+
+``CompactVectorStore`` wraps an index as a LangChain vector store. It offers the
+``similarity_search`` / ``as_retriever`` interface of the Chroma handle, so the
+retrievers built by ``retriever_call`` work on either backend. The index is a
+snapshot: it is exported again after ingestion changes the collection.
+
+Usage:
+    python document_processing/compact_index.py [--dtype int8] [--ivf-lists 0]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+from typing import Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangChainVectorStore
+from app_config.open_ai_cred import COMPACT_INDEX_DTYPE, COMPACT_IVF_LISTS, COMPACT_IVF_PROBES
+
+COMPACT_DTYPES = ("float32", "float16", "int8")
+COMPACT_MANIFEST_FILE = "manifest.json"
+_VECTORS_FILE = "vectors.npy"
+_SCALES_FILE = "scales.npy"
+_CENTROIDS_FILE = "centroids.npy"
+_OFFSETS_FILE = "offsets.npy"
+_CHUNKS_FILE = "chunks.json"
+
+# Rows scored per matrix product, bounding the float32 temporaries of a scan
+_BLOCK_ROWS = 65536
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Converts normalized float32 vectors to the storage type.
+
+    Args:
+        matrix (np.ndarray): Vectors, one per row.
+        dtype (str): 'float32', 'float16' or 'int8'.
+
+    Returns:
+        tuple: ``(stored, scales)``; for int8 every row is scaled so its largest
+        component maps to 127, and ``scales`` holds the factors to undo it.
+    """
+    if dtype == "float32":
+        return matrix.astype(np.float32), None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(matrix / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+    raise ValueError(f"Unknown compact index dtype: {dtype}")
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid of every row, computed in blocks."""
+    return np.concatenate([
+        np.argmax(matrix[start:start + _BLOCK_ROWS] @ centroids.T, axis=1)
+        for start in range(0, len(matrix), _BLOCK_ROWS)
+    ]) if len(matrix) else np.zeros(0, dtype=np.int64)
+
+
+def spherical_kmeans(matrix: np.ndarray, n_lists: int, iterations: int = 10,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clusters normalized vectors by cosine similarity.
+
+    Args:
+        matrix (np.ndarray): Normalized vectors.
+        n_lists (int): Number of clusters; capped at the number of vectors.
+        iterations (int): Lloyd iterations.
+        seed (int): Seed of the initial centroid sample.
+
+    Returns:
+        tuple: ``(centroids, assignment)``.
+    """
+    n_lists = min(n_lists, len(matrix))
+    rng = np.random.default_rng(seed)
+    centroids = matrix[rng.choice(len(matrix), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _assign(matrix, centroids)
+        for cluster in range(n_lists):
+            members = matrix[assignment == cluster]
+            if len(members):
+                centroids[cluster] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids, _assign(matrix, centroids)
+
+
+def write_compact_index(path: str, ids: List[str], embeddings, texts: List[str], metadatas: List[dict],
+                        dtype: str = COMPACT_INDEX_DTYPE, ivf_lists: int = COMPACT_IVF_LISTS,
+                        **manifest_fields) -> dict:
+    """
+    Writes a compact index, replacing any index at ``path`` only once it is complete.
+
+    Args:
+        path (str): Index directory.
+        ids (List[str]): Chunk IDs.
+        embeddings: Vectors of the chunks, one per row.
+        texts (List[str]): Chunk texts.
+        metadatas (List[dict]): Chunk metadata.
+        dtype (str): Storage type of the vectors.
+        ivf_lists (int): Number of inverted lists; 0 for brute-force search.
+        **manifest_fields: Extra values recorded in the manifest.
+
+    Returns:
+        dict: The manifest.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    matrix = _normalize(matrix.reshape(len(ids), -1)) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+    order = np.arange(len(ids))
+    centroids = offsets = None
+    if ivf_lists and len(ids):
+        centroids, assignment = spherical_kmeans(matrix, ivf_lists)
+        order = np.argsort(assignment, kind="stable")
+        counts = np.bincount(assignment, minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        matrix = matrix[order]
+    stored, scales = quantize(matrix, dtype)
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, _VECTORS_FILE), stored)
+    if scales is not None:
+        np.save(os.path.join(tmp_path, _SCALES_FILE), scales)
+    if centroids is not None:
+        np.save(os.path.join(tmp_path, _CENTROIDS_FILE), centroids.astype(np.float32))
+        np.save(os.path.join(tmp_path, _OFFSETS_FILE), offsets)
+    with open(os.path.join(tmp_path, _CHUNKS_FILE), "w") as f:
+        json.dump({
+            "ids": [ids[i] for i in order],
+            "texts": [texts[i] for i in order],
+            "metadatas": [metadatas[i] or {} for i in order],
+        }, f)
+    manifest = dict(
+        manifest_fields,
+        count=len(ids),
+        dim=int(matrix.shape[1]) if len(ids) else 0,
+        dtype=dtype,
+        ivf_lists=0 if centroids is None else len(centroids),
+        metric="cosine",
+        created_at=time.time(),
+    )
+    with open(os.path.join(tmp_path, COMPACT_MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    old_path = path + ".old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return manifest
+
+
+def export_collection(chroma_db, path: str, dtype: str = COMPACT_INDEX_DTYPE,
+                      ivf_lists: int = COMPACT_IVF_LISTS, page_size: int = 5000,
+                      **manifest_fields) -> dict:
+    """
+    Exports a Chroma collection into a compact index.
+
+    Args:
+        chroma_db (Chroma): Source collection.
+        path (str): Index directory.
+        dtype (str): Storage type of the vectors.
+        ivf_lists (int): Number of inverted lists; 0 for brute-force search.
+        page_size (int): Rows read from Chroma per request.
+        **manifest_fields: Extra values recorded in the manifest.
+
+    Returns:
+        dict: The manifest.
+    """
+    collection = chroma_db._collection
+    ids, embeddings, texts, metadatas = [], [], [], []
+    for offset in range(0, collection.count(), page_size):
+        page = collection.get(limit=page_size, offset=offset,
+                              include=["embeddings", "documents", "metadatas"])
+        ids.extend(page["ids"])
+        embeddings.extend(page["embeddings"])
+        texts.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+    return write_compact_index(path, ids, embeddings, texts, metadatas, dtype, ivf_lists,
+                               collection=collection.name, **manifest_fields)
+
+
+class CompactVectorIndex:
+    """
+    Memory-mapped vectors with brute-force or IVF cosine search.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens an index written by :func:`write_compact_index`.
+
+        Args:
+            path (str): Index directory.
+        """
+        self.path = path
+        with open(os.path.join(path, COMPACT_MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(path, _CHUNKS_FILE)) as f:
+            chunks = json.load(f)
+        self.ids = chunks["ids"]
+        self.texts = chunks["texts"]
+        self.metadatas = chunks["metadatas"]
+        self.vectors = np.load(os.path.join(path, _VECTORS_FILE), mmap_mode="r")
+        self.scales = self._optional(_SCALES_FILE)
+        self.centroids = self._optional(_CENTROIDS_FILE)
+        self.offsets = self._optional(_OFFSETS_FILE)
+
+    def _optional(self, name: str):
+        file_path = os.path.join(self.path, name)
+        return np.load(file_path, mmap_mode="r") if os.path.exists(file_path) else None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _ranges(self, query: np.ndarray, nprobe: int) -> List[Tuple[int, int]]:
+        """Row ranges to scan: everything, or the lists of the nearest centroids."""
+        if self.centroids is None:
+            return [(0, len(self.ids))]
+        lists = np.argsort(-(self.centroids @ query))[:nprobe]
+        return [(int(self.offsets[i]), int(self.offsets[i + 1])) for i in sorted(lists)]
+
+    def search(self, embedding: List[float], k: int = 4, nprobe: int = COMPACT_IVF_PROBES) -> List[Tuple[int, float]]:
+        """
+        Finds the rows most similar to a query vector.
+
+        Args:
+            embedding (List[float]): Query vector.
+            k (int): Number of results.
+            nprobe (int): Inverted lists scanned per query (IVF indexes only).
+
+        Returns:
+            List[Tuple[int, float]]: Row positions and cosine similarities, best first.
+        """
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        positions, scores = [], []
+        for start, end in self._ranges(query, nprobe):
+            for block_start in range(start, end, _BLOCK_ROWS):
+                block_end = min(end, block_start + _BLOCK_ROWS)
+                block = np.asarray(self.vectors[block_start:block_end], dtype=np.float32) @ query
+                if self.scales is not None:
+                    block *= self.scales[block_start:block_end]
+                top = np.argpartition(-block, k - 1)[:k] if len(block) > k else np.arange(len(block))
+                positions.append(top + block_start)
+                scores.append(block[top])
+        if not positions:
+            return []
+        positions, scores = np.concatenate(positions), np.concatenate(scores)
+        best = np.argsort(-scores)[:k]
+        return [(int(positions[i]), float(scores[i])) for i in best]
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.texts[position], metadata=dict(self.metadatas[position]))
+
+
+class CompactVectorStore(LangChainVectorStore):
+    """
+    Read-only LangChain vector store over a :class:`CompactVectorIndex`.
+
+    Scores follow the cosine Chroma collection: ``similarity_search_with_score``
+    returns cosine distances and relevance scores are ``1 - distance``.
+    """
+
+    def __init__(self, index: CompactVectorIndex, embedding: Embeddings, nprobe: int = COMPACT_IVF_PROBES):
+        """
+        Args:
+            index (CompactVectorIndex): The opened index.
+            embedding (Embeddings): Embeds queries; must be the model the collection was built with.
+            nprobe (int): Inverted lists scanned per query.
+        """
+        self.index = index
+        self.embedding = embedding
+        self.nprobe = nprobe
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("The compact index is read-only; export the collection again instead")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "CompactVectorStore":
+        raise NotImplementedError("Build a compact index with write_compact_index or export_collection")
+
+    def _select_relevance_score_fn(self):
+        return lambda distance: 1.0 - distance
+
+    def similarity_search_by_vector_with_score(self, embedding: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        return [
+            (self.index.document(position), 1.0 - score)
+            for position, score in self.index.search(embedding, k, self.nprobe)
+        ]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    async def asimilarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        embedding = await self.embedding.aembed_query(query)
+        return await asyncio.to_thread(self.similarity_search_by_vector, embedding, k)
+
+
+if __name__ == "__main__":
+    from app_config.open_ai_cred import MODEL_NAME, EMBED_MODEL
+    from document_processing.doc_indexer import VectorStore
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dtype", default=COMPACT_INDEX_DTYPE, choices=COMPACT_DTYPES)
+    parser.add_argument("--ivf-lists", type=int, default=COMPACT_IVF_LISTS,
+                        help="Inverted lists; 0 for brute-force search")
+    args = parser.parse_args()
+    print(VectorStore(MODEL_NAME, EMBED_MODEL).export_compact_index(args.dtype, args.ivf_lists))
@@ -0,0 +1,311 @@
+"""
+Structure-Aware Chunking
+
+Turns the page documents produced by ``PyPDFLoader`` into chunks sized in tokens, the
+unit the prompts are budgeted in. The 'structure' strategy reads each page as a
+sequence of headings, paragraphs and tables, starts a new chunk at every heading,
+never cuts inside a paragraph or table unless it alone exceeds the budget, and only
+overlaps chunks by a few trailing sentences within the same section. Every chunk
+keeps its page range and section title as metadata. The 'token' and 'recursive'
+strategies wrap LangChain's recursive splitter for comparison.
+"""
+
+import os
+import re
+import sys
+from typing import Iterable, List, Tuple
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from app_config.open_ai_cred import CHUNK_STRATEGY, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+from document_processing.chat_history import count_tokens
+
+STRATEGIES = ("structure", "token", "recursive")
+
+_NUMBERED_HEADING_RE = re.compile(r"^(?:\d+(?:\.\d+)*\.?|[A-Z]\.|[IVX]+\.)\s+[A-Z][^.!?]{0,80}$")
+_KNOWN_HEADINGS = {
+    "abstract", "introduction", "related work", "background", "method", "methods",
+    "approach", "experiments", "results", "evaluation", "discussion", "conclusion",
+    "conclusions", "limitations", "references", "acknowledgements", "acknowledgments",
+    "appendix",
+}
+_NUMERIC_RE = re.compile(r"^[\d.,:%±+\-–()x×/]+$")
+_COLUMNS_RE = re.compile(r"\S {2,}\S.* {2,}\S")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def classify_line(line: str) -> str:
+    """
+    Classifies one line of extracted page text.
+
+    Args:
+        line (str): The line.
+
+    Returns:
+        str: 'blank', 'heading', 'table' or 'text'.
+    """
+    stripped = line.strip()
+    words = stripped.split()
+    if not words:
+        return "blank"
+    if len(words) <= 12 and (_NUMBERED_HEADING_RE.match(stripped)
+                             or stripped.lower().rstrip(":") in _KNOWN_HEADINGS):
+        return "heading"
+    numeric = sum(1 for word in words if _NUMERIC_RE.match(word))
+    if (len(words) >= 3 and numeric / len(words) >= 0.5) or _COLUMNS_RE.search(line):
+        return "table"
+    return "text"
+
+
+def parse_blocks(text: str) -> List[Tuple[str, str]]:
+    """
+    Groups the lines of a page into heading, paragraph and table blocks.
+
+    A paragraph ends at a blank line, at a change of line kind, or at a line that
+    ends a sentence while being clearly shorter than the page's full lines.
+    Hyphenated line breaks inside paragraphs are joined.
+
+    Args:
+        text (str): Page text.
+
+    Returns:
+        List[Tuple[str, str]]: ``(kind, text)`` blocks in page order.
+    """
+    lines = text.splitlines()
+    full_width = max((len(line.strip()) for line in lines), default=0)
+    blocks, current, kind = [], [], None
+
+    def flush():
+        if not current:
+            return
+        if kind == "table":
+            blocks.append(("table", "\n".join(current)))
+        else:
+            joined = current[0]
+            for line in current[1:]:
+                if joined.endswith("-") and line[:1].islower():
+                    joined = joined[:-1] + line
+                else:
+                    joined += " " + line
+            blocks.append(("text", joined))
+        current.clear()
+
+    for line in lines:
+        line_kind = classify_line(line)
+        if line_kind == "blank":
+            flush()
+            continue
+        if line_kind == "heading":
+            flush()
+            blocks.append(("heading", line.strip()))
+            kind = None
+            continue
+        if line_kind != kind:
+            flush()
+            kind = line_kind
+        current.append(line.strip())
+        if (line_kind == "text" and line.rstrip().endswith((".", "!", "?", ":"))
+                and len(line.strip()) < 0.8 * full_width):
+            flush()
+    flush()
+    return blocks
+
+
+def _split_oversized(text: str, kind: str, chunk_tokens: int) -> List[str]:
+    """
+    Splits a block larger than the budget: tables by rows, text by sentences, and
+    sentences that alone exceed the budget by words.
+    """
+    units = text.split("\n") if kind == "table" else _SENTENCE_RE.split(text)
+    separator = "\n" if kind == "table" else " "
+    pieces, current, current_tokens = [], [], 0
+    for unit in units:
+        tokens = count_tokens(unit)
+        if tokens > chunk_tokens:
+            words = unit.split()
+            step = max(1, int(len(words) * chunk_tokens / tokens))
+            subunits = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            subunits = [unit]
+        for subunit in subunits:
+            tokens = count_tokens(subunit)
+            if current and current_tokens + tokens > chunk_tokens:
+                pieces.append(separator.join(current))
+                current, current_tokens = [], 0
+            current.append(subunit)
+            current_tokens += tokens
+    if current:
+        pieces.append(separator.join(current))
+    return pieces
+
+
+def _overlap_tail(text: str, overlap_tokens: int) -> str:
+    """Returns the trailing whole sentences of ``text`` that fit in ``overlap_tokens``."""
+    tail, tokens = [], 0
+    for sentence in reversed(_SENTENCE_RE.split(text)):
+        sentence_tokens = count_tokens(sentence)
+        if tokens + sentence_tokens > overlap_tokens:
+            break
+        tail.insert(0, sentence)
+        tokens += sentence_tokens
+    return " ".join(tail)
+
+
+class StructureChunker:
+    """
+    Token-budgeted chunker that follows headings, paragraphs and tables.
+    """
+
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        """
+        Args:
+            chunk_tokens (int): Maximum tokens per chunk.
+            overlap_tokens (int): Maximum tokens of trailing sentences repeated at the
+                start of the next chunk of the same section.
+        """
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def split_documents(self, pages: Iterable[Document]) -> List[Document]:
+        """
+        Chunks the pages of one document, consuming them one at a time.
+
+        Args:
+            pages (Iterable[Document]): Pages in order, with ``source`` and ``page`` metadata.
+
+        Returns:
+            List[Document]: Chunks with ``page``, ``page_end``, ``section``, ``block_types``
+            and ``token_count`` metadata.
+        """
+        chunks: List[Document] = []
+        pieces: List[Tuple[str, int, str]] = []
+        state = {"tokens": 0, "section": ""}
+        base_metadata = {}
+
+        def flush(overlap: bool):
+            if not pieces:
+                return
+            content = "\n\n".join(text for text, _, _ in pieces)
+            chunks.append(Document(page_content=content, metadata=dict(
+                base_metadata,
+                page=pieces[0][1],
+                page_end=pieces[-1][1],
+                section=state["section"],
+                block_types=",".join(sorted({block for _, _, block in pieces})),
+                token_count=count_tokens(content),
+            )))
+            last_text, last_page, last_kind = pieces[-1]
+            pieces.clear()
+            state["tokens"] = 0
+            if overlap and self.overlap_tokens and last_kind == "text":
+                tail = _overlap_tail(last_text, self.overlap_tokens)
+                if tail:
+                    pieces.append((tail, last_page, "text"))
+                    state["tokens"] = count_tokens(tail)
+
+        for page in pages:
+            if not base_metadata:
+                base_metadata.update(page.metadata)
+            page_number = page.metadata.get("page", 0)
+            for kind, text in parse_blocks(page.page_content):
+                if kind == "heading":
+                    flush(overlap=False)
+                    state["section"] = text
+                    pieces.append((text, page_number, "heading"))
+                    state["tokens"] = count_tokens(text)
+                    continue
+                tokens = count_tokens(text)
+                # Oversized blocks are cut to leave room for the overlap carried into each part
+                parts = [text] if tokens <= self.chunk_tokens else _split_oversized(
+                    text, kind, max(1, self.chunk_tokens - self.overlap_tokens)
+                )
+                for part in parts:
+                    part_tokens = count_tokens(part)
+                    # A heading always stays with the first block of its section
+                    if (pieces and state["tokens"] + part_tokens > self.chunk_tokens
+                            and any(block != "heading" for _, _, block in pieces)):
+                        flush(overlap=True)
+                        if state["tokens"] + part_tokens > self.chunk_tokens:
+                            pieces.clear()
+                            state["tokens"] = 0
+                    pieces.append((part, page_number, kind))
+                    state["tokens"] += part_tokens
+        flush(overlap=False)
+        return chunks
+
+
+def chunker_signature(strategy: str = CHUNK_STRATEGY, chunk_tokens: int = CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> str:
+    """
+    Identifies a chunking configuration, so ingestion can re-chunk files when it changes.
+
+    Returns:
+        str: e.g. 'structure/350/30'.
+    """
+    if strategy == "recursive":
+        return "recursive/1000c/200c"
+    return f"{strategy}/{chunk_tokens}/{overlap_tokens}"
+
+
+def chunk_documents(pages: Iterable[Document], strategy: str = CHUNK_STRATEGY,
+                    chunk_tokens: int = CHUNK_TOKENS,
+                    overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Document]:
+    """
+    Chunks the pages of one document with the selected strategy.
+
+    Pages are split as they arrive, so a lazy page iterator is never materialized.
+
+    Args:
+        pages (Iterable[Document]): Pages in order.
+        strategy (str): 'structure', 'token' or 'recursive'.
+        chunk_tokens (int): Maximum tokens per chunk ('structure' and 'token').
+        overlap_tokens (int): Overlap in tokens ('structure' and 'token').
+
+    Returns:
+        List[Document]: Chunks, each with ``chunk_index``, ``strategy`` and ``token_count`` metadata.
+    """
+    if strategy == "structure":
+        chunks = StructureChunker(chunk_tokens, overlap_tokens).split_documents(pages)
+    elif strategy in ("token", "recursive"):
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        if strategy == "token":
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=chunk_tokens, chunk_overlap=overlap_tokens, length_function=count_tokens
+            )
+        else:
+            splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        chunks = [chunk for page in pages for chunk in splitter.split_documents([page])]
+    else:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+
+    for i, chunk in enumerate(chunks):
+        chunk.metadata.setdefault("token_count", count_tokens(chunk.page_content))
+        chunk.metadata.update(chunk_index=i, strategy=strategy)
+    return chunks
+
+
+def chunk_stats(chunks: List[Document]) -> dict:
+    """
+    Summarizes chunk sizes in tokens.
+
+    Args:
+        chunks (List[Document]): Chunks with ``token_count`` metadata.
+
+    Returns:
+        dict: Chunk count and total, mean, median, p95, min and max tokens.
+    """
+    sizes = sorted(chunk.metadata.get("token_count") or count_tokens(chunk.page_content) for chunk in chunks)
+    if not sizes:
+        return {"chunks": 0, "tokens_total": 0}
+    return {
+        "chunks": len(sizes),
+        "tokens_total": sum(sizes),
+        "tokens_mean": round(sum(sizes) / len(sizes), 1),
+        "tokens_p50": sizes[len(sizes) // 2],
+        "tokens_p95": sizes[min(len(sizes) - 1, int(len(sizes) * 0.95))],
+        "tokens_min": sizes[0],
+        "tokens_max": sizes[-1],
+    }
@@ -0,0 +1,292 @@
+"""
+Near-Duplicate Detection
+
+Keeps redundant text out of the index and out of the graded context. At ingestion,
+every chunk gets a MinHash signature of its word shingles; ``MinHashLSH`` finds
+already indexed chunks whose estimated Jaccard similarity passes a threshold, and such
+chunks are not indexed again. The LSH index is persisted next to the vector store so
+duplicates are found across files and runs.
+
+At retrieval time the few fused candidates are compared exactly:
+``collapse_duplicates`` drops candidates that repeat a better-ranked one, and
+``mmr_select`` trades rank for novelty with maximal marginal relevance.
+"""
+
+import os
+import sys
+import json
+import random
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from app_config.open_ai_cred import DEDUP_THRESHOLD, DEDUP_NUM_PERM
+from document_processing.secondary_retrieval import tokenize
+
+DEDUP_INDEX_FILE = "dedup_index.json"
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def word_shingles(text: str, size: int = 5) -> Set[str]:
+    """
+    Returns the set of ``size``-word shingles of a text; short texts yield one shingle.
+
+    Args:
+        text (str): Text to shingle.
+        size (int): Words per shingle.
+
+    Returns:
+        Set[str]: Shingles.
+    """
+    tokens = tokenize(text)
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    """Exact Jaccard similarity of two sets (0.0 when both are empty)."""
+    if not a and not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles with ``num_perm`` universal hash permutations.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = 5, seed: int = 1):
+        """
+        Args:
+            num_perm (int): Signature length.
+            shingle_size (int): Words per shingle.
+            seed (int): Seed of the permutations; signatures are only comparable for equal seeds.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)
+        ]
+
+    def signature(self, text: str) -> List[int]:
+        """
+        Computes the MinHash signature of a text.
+
+        Args:
+            text (str): Text to sign.
+
+        Returns:
+            List[int]: ``num_perm`` minimum hash values.
+        """
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+            for shingle in word_shingles(text, self.shingle_size)
+        ]
+        if not hashes:
+            return [_MAX_HASH] * self.num_perm
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        ]
+
+
+def estimated_jaccard(a: Sequence[int], b: Sequence[int]) -> float:
+    """Share of equal positions of two MinHash signatures, an estimate of their Jaccard similarity."""
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def _band_layout(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Picks ``(bands, rows)`` whose S-curve midpoint ``(1/bands)^(1/rows)`` is the highest
+    one not above the threshold, so true duplicates are rarely missed; candidates are
+    verified against the threshold afterwards.
+    """
+    layouts = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [layout for layout in layouts if (1 / layout[0]) ** (1 / layout[1]) <= threshold]
+    return max(below, key=lambda layout: (1 / layout[0]) ** (1 / layout[1]))
+
+
+class MinHashLSH:
+    """
+    Locality-sensitive index of MinHash signatures keyed by chunk ID.
+    """
+
+    def __init__(self, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM):
+        """
+        Args:
+            threshold (float): Estimated Jaccard similarity from which chunks are duplicates.
+            num_perm (int): Signature length.
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _band_layout(num_perm, threshold)
+        self.signatures: Dict[str, List[int]] = {}
+        self._buckets: Dict[Tuple[int, tuple], Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: Sequence[int]):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def insert(self, key: str, signature: Sequence[int]):
+        self.remove([key])
+        self.signatures[key] = list(signature)
+        for band_key in self._band_keys(signature):
+            self._buckets[band_key].add(key)
+
+    def remove(self, keys: List[str]):
+        """Removes signatures by key; unknown keys are ignored."""
+        for key in keys:
+            signature = self.signatures.pop(key, None)
+            if signature is None:
+                continue
+            for band_key in self._band_keys(signature):
+                self._buckets[band_key].discard(key)
+                if not self._buckets[band_key]:
+                    del self._buckets[band_key]
+
+    def query(self, signature: Sequence[int]) -> Optional[str]:
+        """
+        Finds an indexed near duplicate of a signature.
+
+        Args:
+            signature (Sequence[int]): Signature to look up.
+
+        Returns:
+            str or None: Key of the most similar indexed signature at or above the threshold.
+        """
+        candidates = set()
+        for band_key in self._band_keys(signature):
+            candidates |= self._buckets.get(band_key, set())
+        best, best_similarity = None, self.threshold
+        for key in sorted(candidates):
+            similarity = estimated_jaccard(signature, self.signatures[key])
+            if similarity >= best_similarity:
+                best, best_similarity = key, similarity
+        return best
+
+    def save(self, path: str):
+        """Persists the signatures as JSON, replacing the file atomically."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {"threshold": self.threshold, "num_perm": self.num_perm, "signatures": self.signatures}
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str, threshold: float = DEDUP_THRESHOLD, num_perm: int = DEDUP_NUM_PERM) -> "MinHashLSH":
+        """
+        Loads persisted signatures; a missing file, or one written with another
+        signature length, yields an empty index.
+        """
+        index = cls(threshold, num_perm)
+        if not os.path.exists(path):
+            return index
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("num_perm") != num_perm:
+            return index
+        for key, signature in data["signatures"].items():
+            index.insert(key, signature)
+        return index
+
+
+def filter_near_duplicates(documents: List[Document], ids: List[str], lsh: MinHashLSH,
+                           hasher: MinHasher, signatures: Optional[List[List[int]]] = None):
+    """
+    Drops chunks that nearly duplicate an indexed chunk or an earlier chunk of the same batch.
+
+    Kept chunks are inserted into ``lsh``; chunks already indexed under their own ID are kept.
+
+    Args:
+        documents (List[Document]): Candidate chunks.
+        ids (List[str]): Their chunk IDs.
+        lsh (MinHashLSH): Index of already indexed chunks.
+        hasher (MinHasher): Signature function matching ``lsh``.
+        signatures (List[List[int]], optional): Precomputed signatures of ``documents``.
+
+    Returns:
+        tuple: ``(kept_documents, kept_ids, duplicates)`` where ``duplicates`` maps each
+        dropped chunk ID to the ID of the chunk it duplicates.
+    """
+    kept_documents, kept_ids, duplicates = [], [], {}
+    for i, (doc, doc_id) in enumerate(zip(documents, ids)):
+        signature = signatures[i] if signatures is not None else hasher.signature(doc.page_content)
+        original = None if doc_id in lsh.signatures else lsh.query(signature)
+        if original is not None:
+            duplicates[doc_id] = original
+            continue
+        lsh.insert(doc_id, signature)
+        kept_documents.append(doc)
+        kept_ids.append(doc_id)
+    return kept_documents, kept_ids, duplicates
+
+
+def collapse_duplicates(documents: List[Document], k: int, threshold: float = 0.6,
+                        shingle_size: int = 3) -> List[Document]:
+    """
+    Returns the first ``k`` documents that do not repeat a better-ranked document.
+
+    Args:
+        documents (List[Document]): Candidates, best first.
+        k (int): Number of documents to return.
+        threshold (float): Shingle Jaccard similarity from which a candidate is a duplicate.
+        shingle_size (int): Words per shingle.
+
+    Returns:
+        List[Document]: Up to ``k`` distinct documents in rank order.
+    """
+    kept, kept_shingles = [], []
+    for doc in documents:
+        shingles = word_shingles(doc.page_content, shingle_size)
+        if any(jaccard(shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+        if len(kept) == k:
+            break
+    return kept
+
+
+def mmr_select(documents: List[Document], scores: List[float], k: int, lambda_mult: float = 0.7,
+               shingle_size: int = 3) -> List[Document]:
+    """
+    Selects ``k`` documents by maximal marginal relevance.
+
+    Relevance is the retrieval score scaled to the best candidate; redundancy is the
+    highest shingle Jaccard similarity to an already selected document.
+
+    Args:
+        documents (List[Document]): Candidates.
+        scores (List[float]): Their retrieval scores, higher is better.
+        k (int): Number of documents to select.
+        lambda_mult (float): 1.0 ranks by relevance only, 0.0 by novelty only.
+        shingle_size (int): Words per shingle.
+
+    Returns:
+        List[Document]: Selected documents in selection order.
+    """
+    if not documents:
+        return []
+    top = max(scores) or 1.0
+    relevance = [score / top for score in scores]
+    shingles = [word_shingles(doc.page_content, shingle_size) for doc in documents]
+    selected: List[int] = []
+    remaining = list(range(len(documents)))
+    while remaining and len(selected) < k:
+        best = max(remaining, key=lambda i: lambda_mult * relevance[i] - (1 - lambda_mult) * max(
+            (jaccard(shingles[i], shingles[j]) for j in selected), default=0.0
+        ))
+        selected.append(best)
+        remaining.remove(best)
+    return [documents[i] for i in selected]
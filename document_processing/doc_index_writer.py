@@ -0,0 +1,179 @@
+"""
+Batched Index Writer
+
+Embeds chunks in fixed-size batches with a bounded number of concurrent embedding
+requests, backs off on rate-limit (HTTP 429) errors and upserts every batch into
+the Chroma collection under deterministic IDs. Batches whose IDs are already in the
+collection are skipped, so an interrupted run resumes where it stopped.
+"""
+
+import os
+import sys
+import time
+import random
+import logging
+import hashlib
+import threading
+from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from app_config.open_ai_cred import INGEST_BATCH_SIZE, EMBED_MAX_CONCURRENCY, EMBED_MAX_RETRIES
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("index_writer")
+
+
+def chunk_id(doc: Document) -> str:
+    """
+    Returns a deterministic ID for a chunk.
+
+    An explicit ``chunk_id`` in the metadata wins; otherwise the ID is derived from
+    the source file name, page and content, so re-running ingestion yields the same
+    IDs wherever the data folder lives. Ingestion and ``VectorStore.document_indexer``
+    both use it, so the same chunk gets the same ID on either path.
+
+    Args:
+        doc (Document): The chunk.
+
+    Returns:
+        str: The chunk ID.
+    """
+    if doc.metadata.get("chunk_id"):
+        return doc.metadata["chunk_id"]
+    source = os.path.basename(str(doc.metadata.get("source", "")))
+    key = f"{source}\0{doc.metadata.get('page', '')}\0{doc.page_content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def unique_positions(ids: List[str]) -> List[int]:
+    """
+    Returns the position of the first occurrence of every ID, in order; a collection
+    rejects an upsert that names the same ID twice.
+
+    Args:
+        ids (List[str]): Chunk IDs, possibly repeated.
+
+    Returns:
+        List[int]: Positions to keep.
+    """
+    first = {}
+    for position, doc_id in enumerate(ids):
+        first.setdefault(doc_id, position)
+    return sorted(first.values())
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """
+    Tells whether an embedding error is a rate-limit response.
+
+    Args:
+        exc (Exception): Raised error.
+
+    Returns:
+        bool: True for HTTP 429 / ``RateLimitError``.
+    """
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+class IndexWriter:
+    def __init__(self, chroma_db, embedding=None, batch_size: int = INGEST_BATCH_SIZE,
+                 max_concurrency: int = EMBED_MAX_CONCURRENCY, max_retries: int = EMBED_MAX_RETRIES,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Initializes the writer.
+
+        Args:
+            chroma_db (Chroma): Target collection.
+            embedding (Embeddings, optional): Embedding model. Defaults to the collection's own.
+            batch_size (int): Number of chunks per embedding request and upsert.
+            max_concurrency (int): Maximum number of embedding requests in flight.
+            max_retries (int): Retries per batch on rate-limit errors.
+            base_delay (float): First backoff delay in seconds, doubled on every retry.
+            max_delay (float): Upper bound on a single backoff delay in seconds.
+        """
+        self.chroma_db = chroma_db
+        self.embedding = embedding or chroma_db.embeddings
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._upsert_lock = threading.Lock()
+
+    def _embed_with_backoff(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embeds a batch, retrying with jittered exponential backoff on rate-limit errors.
+
+        Args:
+            texts (List[str]): Texts of one batch.
+
+        Returns:
+            List[List[float]]: One vector per text.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embedding.embed_documents(texts)
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt == self.max_retries:
+                    raise
+                delay = min(self.max_delay, self.base_delay * 2 ** attempt) * (0.5 + random.random() / 2)
+                log_event(logger, "embed_rate_limited", logging.WARNING,
+                          attempt=attempt + 1, delay_s=round(delay, 2), texts=len(texts))
+                time.sleep(delay)
+
+    def _existing_ids(self, ids: List[str]) -> set:
+        """Returns which of the IDs are already stored in the collection."""
+        return set(self.chroma_db.get(ids=ids, include=[])["ids"])
+
+    def _write_batch(self, docs: List[Document], ids: List[str]) -> int:
+        """
+        Embeds and upserts the chunks of one batch that are not stored yet.
+
+        Returns:
+            int: Number of chunks written.
+        """
+        existing = self._existing_ids(ids)
+        pending = [(doc, doc_id) for doc, doc_id in zip(docs, ids) if doc_id not in existing]
+        if not pending:
+            return 0
+        vectors = self._embed_with_backoff([doc.page_content for doc, _ in pending])
+        # The vectors were computed here with backoff; the public add_texts would embed again
+        with self._upsert_lock:
+            self.chroma_db._collection.upsert(
+                ids=[doc_id for _, doc_id in pending],
+                embeddings=vectors,
+                metadatas=[doc.metadata for doc, _ in pending],
+                documents=[doc.page_content for doc, _ in pending],
+            )
+        return len(pending)
+
+    def write(self, docs: List[Document], ids: Optional[List[str]] = None) -> dict:
+        """
+        Writes chunks in batches, skipping those already present.
+
+        Args:
+            docs (List[Document]): Chunks to write.
+            ids (List[str], optional): Chunk IDs. Defaults to :func:`chunk_id` of each chunk.
+
+        Returns:
+            dict: Counts of ``written`` and ``skipped`` chunks and ``batches``.
+        """
+        ids = ids or [chunk_id(doc) for doc in docs]
+        keep = unique_positions(ids)
+        docs, ids = [docs[i] for i in keep], [ids[i] for i in keep]
+        for doc, doc_id in zip(docs, ids):
+            doc.metadata["chunk_id"] = doc_id
+        batches = [
+            (docs[start:start + self.batch_size], ids[start:start + self.batch_size])
+            for start in range(0, len(docs), self.batch_size)
+        ]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            written = sum(pool.map(lambda batch: self._write_batch(*batch), batches))
+        stats = {"written": written, "skipped": len(docs) - written, "batches": len(batches)}
+        log_event(logger, "index_written", **stats)
+        return stats
@@ -1,80 +1,244 @@
 import os
 import sys
+import json
+import uuid
+import logging
 
 # Append the parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-# Import required modules
-from operator import itemgetter
-from langchain.docstore.document import Document
-from langchain.document_loaders import PyPDFLoader
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.text_splitter import (
-    CharacterTextSplitter,
-    RecursiveCharacterTextSplitter,
-    NLTKTextSplitter,
-    TokenTextSplitter,
-    MarkdownTextSplitter,
-)
-from langchain_chroma import Chroma
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
+# Heavy imports (PDF loader, text splitters, Chroma, OpenAI embeddings, the
+# embedding cache) are done inside the methods that need them, so importing
+# this module stays cheap for processes that only query.
 
 # Import API keys
-from app_config.open_ai_cred import OPENAI_KEY, TAVILY_API_KEY, WEATHER_API_KEY
+from app_config.open_ai_cred import OPENAI_KEY, TAVILY_API_KEY, WEATHER_API_KEY, CHUNK_STRATEGY, DEDUP_ENABLED
+from app_config.open_ai_cred import COMPACT_INDEX_DTYPE, COMPACT_IVF_LISTS, COMPACT_IVF_PROBES, VECTOR_BACKEND
+from document_processing.doc_index_writer import IndexWriter, chunk_id
+from document_processing.secondary_retrieval import BM25Index, BM25_INDEX_FILE
+from document_processing.doc_chunking import chunk_documents, chunk_stats
+from document_processing.pdf_text import load_pdf_pages
+from document_processing.doc_dedup import MinHasher, MinHashLSH, DEDUP_INDEX_FILE, filter_near_duplicates
+from document_processing.index_snapshots import SnapshotStore, SnapshotValidationError, validate_snapshot
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("indexer")
 
 # Set environment variables
 os.environ['OPENAI_API_KEY'] = OPENAI_KEY
 os.environ['TAVILY_API_KEY'] = TAVILY_API_KEY
 
+# Paths are relative to the project root, so every entry point uses the same store
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
 # Define data folder
-data_folder = 'project_data'
+data_folder = os.path.join(ROOT_DIR, 'project_data')
+
+# Vector store root; the served snapshot below it is named by snapshots.current()
+PERSIST_DIRECTORY = os.path.join(ROOT_DIR, "proj_db")
+COLLECTION_NAME = 'capstone_proj'
+INDEX_VERSION_FILE = "index_version"
+COMPACT_INDEX_DIR = "compact_index"
+
+snapshots = SnapshotStore(PERSIST_DIRECTORY)
 
 class VectorStore:
-    def __init__(self, model_name: str, embed_model_name: str):
+    def __init__(self, model_name: str, embed_model_name: str, directory: str = None):
         """
         Initializes the VectorStore class.
 
         Args:
             model_name (str): Name of the model.
             embed_model_name (str): Name of the embedding model.
+            directory (str, optional): Snapshot directory to bind to. By default the store
+                follows the served snapshot and writes build a new one.
         """
         self.model_name = model_name
         self.embed_model_name = embed_model_name
+        self.directory = directory
+
+    def persist_directory(self) -> str:
+        """
+        Returns the directory holding the collection and its side indexes.
+
+        Returns:
+            str: The bound directory, else the served snapshot.
+        """
+        return self.directory or snapshots.current_path()
+
+    def embedding_model(self):
+        """
+        Returns the embedding model wrapped in the persistent embedding cache.
 
-    def document_splitter(self, pdf_path: str):
+        Used by both indexing and loading, so chunks and repeated queries are
+        embedded at most once per model.
+
+        Returns:
+            CachedEmbeddings: Cache-backed OpenAI embeddings.
+        """
+        from langchain.embeddings import OpenAIEmbeddings
+        from document_processing.proj_cache import CachedEmbeddings, get_embedding_store
+
+        return CachedEmbeddings(
+            OpenAIEmbeddings(model=self.embed_model_name),
+            self.embed_model_name,
+            get_embedding_store()
+        )
+
+    def document_splitter(self, pdf_path: str, strategy: str = CHUNK_STRATEGY, file_hash: str = None):
         """
         Splits a PDF document into chunks.
 
+        Pages are streamed into the chunker one at a time, from the extracted-text
+        cache when the file was parsed before.
+
         Args:
             pdf_path (str): Path to the PDF file.
+            strategy (str): Chunking strategy, see ``doc_chunking.chunk_documents``.
+            file_hash (str, optional): SHA-256 of the file, if already known.
 
         Returns:
             list: List of chunked documents.
         """
-        loader = PyPDFLoader(pdf_path)
-        documents = loader.load()
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunked_docs = text_splitter.split_documents(documents)
-        print("...Splitting Done")  
+        page_count = 0
+
+        def counted_pages():
+            nonlocal page_count
+            for page in load_pdf_pages(pdf_path, file_hash):
+                page_count += 1
+                yield page
+
+        chunked_docs = chunk_documents(counted_pages(), strategy)
+        log_event(logger, "document_split", source=os.path.basename(pdf_path), strategy=strategy,
+                  pages=page_count, **chunk_stats(chunked_docs))
         return chunked_docs
 
     def document_indexer(self, chunked_docs: list):    
         """
         Indexes the chunked documents using Chroma and OpenAI embeddings.
 
+        Chunks are embedded in batches and upserted under deterministic IDs, so an
+        interrupted run can simply be started again. Chunks that nearly duplicate an
+        indexed chunk are skipped. The chunks are also added to the BM25 keyword index
+        kept next to the collection, which is built over the whole collection if the
+        collection has none yet. A compact export in the snapshot is re-exported. Unless the store is bound to a directory, the
+        chunks go into a new snapshot that is served once it passes validation.
+
         Args:
             chunked_docs (list): List of chunked documents.
+
+        Returns:
+            dict: Counts of written, skipped and near-duplicate chunks.
         """
-        openai_embed_model = OpenAIEmbeddings(model=self.embed_model_name)
-        Chroma.from_documents(
-            documents=chunked_docs,
-            collection_name='capstone_proj',
-            embedding=openai_embed_model,
-            collection_metadata={"hnsw:space": "cosine"},
-            persist_directory="./proj_db"
-        )
+        if self.directory is None:
+            with snapshots.building() as (version, path):
+                target = VectorStore(self.model_name, self.embed_model_name, path)
+                # Every snapshot gets its own version, even a resumed one with nothing left to write
+                target.bump_index_version()
+                stats = target.document_indexer(chunked_docs)
+                target.check_snapshot()
+            snapshots.activate(version)
+            log_event(logger, "index_activated", version=version)
+            return stats
+
+        chroma_db = self.vectord_db_loader()
+        ids = [chunk_id(doc) for doc in chunked_docs]
+        duplicates = {}
+        if DEDUP_ENABLED:
+            lsh = MinHashLSH.load(self.dedup_index_path())
+            chunked_docs, ids, duplicates = filter_near_duplicates(chunked_docs, ids, lsh, MinHasher())
+            lsh.save(self.dedup_index_path())
+        stats = IndexWriter(chroma_db).write(chunked_docs, ids=ids)
+        stats["duplicates"] = len(duplicates)
+        if os.path.exists(self.keyword_index_path()):
+            keyword_index = BM25Index.load(self.keyword_index_path())
+            keyword_index.add(chunked_docs, ids)
+        else:
+            # Collections indexed before the keyword index existed are indexed whole
+            keyword_index = self.collection_keyword_index(chroma_db)
+        keyword_index.save(self.keyword_index_path())
+        if stats["written"]:
+            self.bump_index_version()
+        self.sync_compact_index()
         print(".....Indexing done.....")
+        return stats
+
+    def check_snapshot(self, min_chunks: int = 1):
+        """
+        Validates the snapshot the store is bound to and raises if it must not be served.
+
+        Args:
+            min_chunks (int): Chunks the snapshot must contain.
+
+        Raises:
+            SnapshotValidationError: The snapshot failed a check of :func:`validate_snapshot`.
+        """
+        report = validate_snapshot(self, min_chunks)
+        log_event(logger, "index_validated", count=report["count"], errors=len(report["errors"]))
+        if report["errors"]:
+            raise SnapshotValidationError("Index snapshot failed validation: " + "; ".join(report["errors"]))
+
+    def keyword_index_path(self) -> str:
+        """
+        Returns the path of the BM25 keyword index built over the same chunks.
+
+        Returns:
+            str: Index file path.
+        """
+        return os.path.join(self.persist_directory(), BM25_INDEX_FILE)
+
+    def collection_keyword_index(self, chroma_db) -> BM25Index:
+        """
+        Builds the BM25 keyword index over every chunk in the collection.
+
+        Args:
+            chroma_db (Chroma): The collection.
+
+        Returns:
+            BM25Index: Index keyed by the collection's IDs.
+        """
+        from langchain.docstore.document import Document
+
+        records = chroma_db.get(include=["documents", "metadatas"])
+        documents = [Document(page_content=text, metadata=metadata or {})
+                     for text, metadata in zip(records["documents"], records["metadatas"])]
+        keyword_index = BM25Index()
+        keyword_index.add(documents, records["ids"])
+        return keyword_index
+
+    def dedup_index_path(self) -> str:
+        """
+        Returns the path of the MinHash index of the indexed chunks.
+
+        Returns:
+            str: Index file path.
+        """
+        return os.path.join(self.persist_directory(), DEDUP_INDEX_FILE)
+
+    def index_version(self) -> str:
+        """
+        Returns the current version of the indexed collection.
+
+        Answer caches compare it between lookups and drop their entries when it changes.
+
+        Returns:
+            str: Version token, or an empty string if the collection was never versioned.
+        """
+        try:
+            with open(os.path.join(self.persist_directory(), INDEX_VERSION_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return ""
+
+    def bump_index_version(self):
+        """
+        Records that the collection content changed.
+        """
+        os.makedirs(self.persist_directory(), exist_ok=True)
+        path = os.path.join(self.persist_directory(), INDEX_VERSION_FILE)
+        with open(path + ".tmp", "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(path + ".tmp", path)
 
     def vectord_db_loader(self):
         """
@@ -83,14 +247,89 @@ class VectorStore:
         Returns:
             Chroma: Loaded Chroma vector database.
         """
-        openai_embed_model = OpenAIEmbeddings(model=self.embed_model_name)
+        from langchain_chroma import Chroma
+
+        openai_embed_model = self.embedding_model()
         chroma_db = Chroma(
-            persist_directory="./proj_db",
-            collection_name='capstone_proj',
-            embedding_function=openai_embed_model
+            persist_directory=self.persist_directory(),
+            collection_name=COLLECTION_NAME,
+            embedding_function=openai_embed_model,
+            collection_metadata={"hnsw:space": "cosine"}
         )
         print(".....Loading vector DB....")
         return chroma_db
+
+    def compact_index_path(self) -> str:
+        """
+        Returns the directory of the compact, memory-mapped export of the collection.
+
+        Returns:
+            str: Index directory path.
+        """
+        return os.path.join(self.persist_directory(), COMPACT_INDEX_DIR)
+
+    def export_compact_index(self, dtype: str = COMPACT_INDEX_DTYPE, ivf_lists: int = COMPACT_IVF_LISTS) -> dict:
+        """
+        Exports the Chroma collection into the compact index, replacing the previous export.
+
+        Args:
+            dtype (str): Storage type of the vectors: 'float32', 'float16' or 'int8'.
+            ivf_lists (int): Number of inverted lists; 0 for brute-force search.
+
+        Returns:
+            dict: Manifest of the written index.
+        """
+        from document_processing.compact_index import export_collection
+
+        manifest = export_collection(
+            self.vectord_db_loader(), self.compact_index_path(), dtype, ivf_lists,
+            embed_model=self.embed_model_name, index_version=self.index_version()
+        )
+        log_event(logger, "compact_index_exported", **{key: manifest[key] for key in ("count", "dtype", "ivf_lists")})
+        return manifest
+
+    def sync_compact_index(self) -> bool:
+        """
+        Re-exports the compact index if it was exported from an older index version.
+
+        A snapshot that has an export keeps it current, and so does every snapshot on
+        the compact backend; otherwise nothing is exported.
+
+        Returns:
+            bool: Whether the index was exported.
+        """
+        manifest_path = os.path.join(self.compact_index_path(), "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                exported = json.load(f).get("index_version")
+        elif VECTOR_BACKEND == "compact":
+            exported = None
+        else:
+            return False
+        if exported == self.index_version():
+            return False
+        self.export_compact_index()
+        return True
+
+    def compact_db_loader(self, nprobe: int = COMPACT_IVF_PROBES):
+        """
+        Opens the compact index as a read-only vector store.
+
+        Returns:
+            CompactVectorStore: Store with the Chroma handle's search interface.
+        """
+        from document_processing.compact_index import CompactVectorIndex, CompactVectorStore
+
+        index = CompactVectorIndex(self.compact_index_path())
+        if index.manifest.get("embed_model") != self.embed_model_name:
+            raise ValueError(
+                f"Compact index was built with {index.manifest.get('embed_model')}, not {self.embed_model_name}"
+            )
+        if index.manifest.get("index_version") != self.index_version():
+            log_event(logger, "compact_index_stale", logging.WARNING,
+                      exported=index.manifest.get("index_version"), current=self.index_version())
+        print(".....Loading compact vector index....")
+        return CompactVectorStore(index, self.embedding_model(), nprobe)
          
 
 
@@ -0,0 +1,346 @@
+"""
+Incremental PDF Ingestion
+
+Parses and splits the PDFs in ``project_data`` in a process pool and streams the
+resulting chunks into the Chroma collection in bounded batches and into the BM25
+keyword index. A manifest of file
+content hashes kept next to the vector store lets re-runs skip unchanged PDFs,
+re-index changed ones and delete the chunks of PDFs that were removed. The first run
+replaces any chunks indexed before the manifest existed. Files are
+also re-chunked when the chunking configuration changes, and the manifest keeps each
+file's chunk-size statistics. Pages are streamed into the chunker and their extracted
+text is cached by file hash (see ``pdf_text.py``), so re-chunking an unchanged file
+does not parse the PDF again.
+
+Chunks that nearly duplicate an already indexed chunk, such as repeated boilerplate or
+the same passage in two versions of a paper, are not indexed. The manifest records
+which chunk each skipped one duplicates, so a file is re-indexed when the chunks it
+relied on go away.
+
+Every run that changes something builds a new index snapshot (see
+``index_snapshots.py``) from a copy of the served one, validates it and then switches
+serving processes over to it; a failed run leaves the served index untouched.
+"""
+
+import os
+import sys
+import json
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_config.open_ai_cred import (
+    MODEL_NAME, EMBED_MODEL, INGEST_BATCH_SIZE, INGEST_MAX_WORKERS, CHUNK_STRATEGY, DEDUP_ENABLED
+)
+from document_processing.doc_indexer import VectorStore, data_folder, snapshots
+from document_processing.doc_index_writer import IndexWriter, chunk_id, unique_positions
+from document_processing.secondary_retrieval import BM25Index
+from document_processing.doc_chunking import chunk_stats, chunker_signature
+from document_processing.doc_dedup import MinHasher, MinHashLSH, filter_near_duplicates
+from document_processing.pdf_text import file_sha256
+
+MANIFEST_FILE = "ingest_manifest.json"
+# Files indexed under an older chunk ID scheme are re-indexed
+CHUNK_ID_SCHEME = "content-v1"
+
+
+def _split_pdf(pdf_path: str, model_name: str, embed_model_name: str, strategy: str = CHUNK_STRATEGY,
+               dedup: bool = DEDUP_ENABLED, file_hash: str = None):
+    """
+    Worker entry point: splits one PDF into chunks in a child process.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        model_name (str): Name of the model.
+        embed_model_name (str): Name of the embedding model.
+        strategy (str): Chunking strategy.
+        dedup (bool): Whether to also compute the chunks' MinHash signatures.
+        file_hash (str, optional): SHA-256 of the file, keying its extracted-text cache entry.
+
+    Returns:
+        tuple: ``(pdf_path, chunked_docs, signatures)``; ``signatures`` is None without dedup.
+    """
+    chunked_docs = VectorStore(model_name, embed_model_name).document_splitter(pdf_path, strategy, file_hash)
+    signatures = None
+    if dedup:
+        hasher = MinHasher()
+        signatures = [hasher.signature(doc.page_content) for doc in chunked_docs]
+    return pdf_path, chunked_docs, signatures
+
+
+class IngestionPipeline:
+    def __init__(self, vector_store: VectorStore, data_dir: str = data_folder,
+                 manifest_path: str = None, batch_size: int = INGEST_BATCH_SIZE,
+                 max_workers: int = INGEST_MAX_WORKERS, chunk_strategy: str = CHUNK_STRATEGY,
+                 dedup: bool = DEDUP_ENABLED):
+        """
+        Initializes the ingestion pipeline.
+
+        Args:
+            vector_store (VectorStore): Vector store the chunks are written to.
+            data_dir (str): Folder holding the PDFs to ingest.
+            manifest_path (str, optional): Manifest location. Defaults to a file in the snapshot directory.
+            batch_size (int): Number of chunks sent to the embedder per write.
+            max_workers (int): Number of PDF parsing processes.
+            chunk_strategy (str): Chunking strategy, see ``doc_chunking.chunk_documents``.
+            dedup (bool): Whether to skip chunks that nearly duplicate indexed ones.
+        """
+        self.vector_store = vector_store
+        self.data_dir = data_dir
+        self._manifest_path = manifest_path
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.chunk_strategy = chunk_strategy
+        self.chunker = chunker_signature(chunk_strategy)
+        self.dedup = dedup
+
+    @property
+    def manifest_path(self) -> str:
+        return self._manifest_path or os.path.join(self.vector_store.persist_directory(), MANIFEST_FILE)
+
+    def load_manifest(self) -> dict:
+        """
+        Loads the manifest of already ingested files.
+
+        Returns:
+            dict: Mapping of file name to ``{"sha256": ..., "chunker": ..., "id_scheme": ..., "chunk_ids": [...],
+            "duplicate_of": {...}, "chunk_stats": {...}}``.
+        """
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def save_manifest(self, manifest: dict):
+        """
+        Writes the manifest atomically so a crash never leaves a truncated file.
+
+        Args:
+            manifest (dict): Mapping of file name to hash and chunk IDs.
+        """
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def plan(self, manifest: dict):
+        """
+        Compares the data folder with the manifest.
+
+        Args:
+            manifest (dict): Current manifest.
+
+        Returns:
+            tuple: ``(to_index, removed)`` where ``to_index`` maps new or changed file
+            names, and files chunked with another configuration, to their hashes and
+            ``removed`` lists file names no longer on disk.
+        """
+        current = {
+            name: file_sha256(os.path.join(self.data_dir, name))
+            for name in sorted(os.listdir(self.data_dir))
+            if name.lower().endswith(".pdf")
+        }
+        to_index = {
+            name: sha for name, sha in current.items()
+            if manifest.get(name, {}).get("sha256") != sha
+            or manifest[name].get("chunker") != self.chunker
+            or manifest[name].get("id_scheme") != CHUNK_ID_SCHEME
+        }
+        removed = [name for name in manifest if name not in current]
+
+        # Files whose skipped chunks duplicate chunks that are about to disappear
+        stale = {name for name in list(to_index) + removed if name in manifest}
+        while stale:
+            stale_ids = {chunk for name in stale for chunk in manifest[name]["chunk_ids"]}
+            stale = {
+                name for name, entry in manifest.items()
+                if name in current and name not in to_index
+                and stale_ids & set(entry.get("duplicate_of", {}).values())
+            }
+            to_index.update({name: current[name] for name in stale})
+        return to_index, removed
+
+    @staticmethod
+    def _unlisted_chunks(chroma_db, manifest: dict) -> list:
+        """
+        Lists the IDs of collection chunks that no manifest entry lists.
+
+        Args:
+            chroma_db (Chroma): Collection to scan.
+            manifest (dict): Current manifest.
+
+        Returns:
+            list: Chunk IDs.
+        """
+        listed = {chunk for entry in manifest.values() for chunk in entry["chunk_ids"]}
+        return [chunk for chunk in chroma_db.get(include=[])["ids"] if chunk not in listed]
+
+    def _write_chunks(self, chroma_db, chunked_docs: list, lsh: MinHashLSH = None, signatures: list = None):
+        """
+        Assigns the content-derived :func:`chunk_id` of every chunk, drops near duplicates
+        and writes the remaining chunks through :class:`IndexWriter`.
+
+        Args:
+            chroma_db (Chroma): Target collection.
+            chunked_docs (list): Chunks of one PDF.
+            lsh (MinHashLSH, optional): Index of the indexed chunks; None disables dedup.
+            signatures (list, optional): Precomputed MinHash signatures of the chunks.
+
+        Returns:
+            tuple: ``(written_docs, chunk_ids, duplicate_of)`` where ``duplicate_of`` maps
+            each skipped chunk ID to the chunk it duplicates.
+        """
+        chunk_ids = [chunk_id(doc) for doc in chunked_docs]
+        keep = unique_positions(chunk_ids)
+        chunked_docs, chunk_ids = [chunked_docs[i] for i in keep], [chunk_ids[i] for i in keep]
+        if signatures is not None:
+            signatures = [signatures[i] for i in keep]
+        duplicate_of = {}
+        if lsh is not None:
+            chunked_docs, chunk_ids, duplicate_of = filter_near_duplicates(
+                chunked_docs, chunk_ids, lsh, MinHasher(lsh.num_perm), signatures
+            )
+        IndexWriter(chroma_db, batch_size=self.batch_size).write(chunked_docs, ids=chunk_ids)
+        return chunked_docs, chunk_ids, duplicate_of
+
+    def run(self, validate: bool = True) -> dict:
+        """
+        Ingests new and changed PDFs and drops chunks of removed ones.
+
+        Unless the vector store is bound to a directory, the changes are written to a
+        new snapshot, which is activated once it holds at least the chunks listed in
+        its manifest and passes :func:`validate_snapshot`.
+
+        Args:
+            validate (bool): Whether to validate the snapshot before activating it.
+
+        Returns:
+            dict: Counts of indexed, removed and unchanged files, written chunks and
+            skipped near-duplicate chunks, and the index ``version`` served afterwards.
+        """
+        if self.vector_store.directory is not None:
+            return self._ingest()
+        to_index, removed = self.plan(self.load_manifest())
+        if not to_index and not removed:
+            return dict(self._ingest(), version=snapshots.current())
+
+        with snapshots.building() as (version, path):
+            target = VectorStore(self.vector_store.model_name, self.vector_store.embed_model_name, path)
+            # Every snapshot gets its own version, even a resumed one with nothing left to write
+            target.bump_index_version()
+            pipeline = IngestionPipeline(target, self.data_dir, self._manifest_path, self.batch_size,
+                                         self.max_workers, self.chunk_strategy, self.dedup)
+            stats = pipeline._ingest()
+            # A resumed build may have had nothing left to ingest, and so nothing exported
+            target.sync_compact_index()
+            if validate:
+                manifest = pipeline.load_manifest()
+                target.check_snapshot(sum(len(entry["chunk_ids"]) for entry in manifest.values()))
+        snapshots.activate(version)
+        print(f"...Serving index version {version}")
+        return dict(stats, version=version)
+
+    def _ingest(self) -> dict:
+        """
+        Applies the changes to the directory the vector store currently points to.
+
+        Returns:
+            dict: Counts of indexed, removed and unchanged files, written chunks,
+            skipped near-duplicate chunks and removed chunks no manifest entry listed.
+        """
+        manifest = self.load_manifest()
+        to_index, removed = self.plan(manifest)
+        chroma_db = self.vector_store.vectord_db_loader()
+        keyword_index_path = self.vector_store.keyword_index_path()
+        keyword_index = BM25Index.load(keyword_index_path)
+        dedup_index_path = self.vector_store.dedup_index_path()
+        lsh = MinHashLSH.load(dedup_index_path) if self.dedup else None
+
+        # Chunks of files about to be re-indexed must not be matched as originals
+        if lsh is not None:
+            for name in to_index:
+                if name in manifest:
+                    lsh.remove(manifest[name]["chunk_ids"])
+
+        # A first run replaces chunks written before there was a manifest, e.g. by
+        # Chroma.from_documents under random IDs, instead of indexing the corpus twice
+        unlisted = []
+        if to_index and not os.path.exists(self.manifest_path):
+            unlisted = self._unlisted_chunks(chroma_db, manifest)
+            for start in range(0, len(unlisted), self.batch_size):
+                chroma_db.delete(ids=unlisted[start:start + self.batch_size])
+            keyword_index.remove(unlisted)
+            if lsh is not None:
+                lsh.remove(unlisted)
+            if unlisted:
+                print(f"...Removed {len(unlisted)} chunks missing from the manifest")
+
+        for name in removed:
+            chroma_db.delete(ids=manifest[name]["chunk_ids"])
+            keyword_index.remove(manifest[name]["chunk_ids"])
+            if lsh is not None:
+                lsh.remove(manifest[name]["chunk_ids"])
+            del manifest[name]
+            print(f"...Removed {name}")
+        if removed:
+            keyword_index.save(keyword_index_path)
+            if lsh is not None:
+                lsh.save(dedup_index_path)
+            self.save_manifest(manifest)
+
+        written = duplicates = 0
+        if to_index:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [
+                    pool.submit(_split_pdf, os.path.join(self.data_dir, name),
+                                self.vector_store.model_name, self.vector_store.embed_model_name,
+                                self.chunk_strategy, self.dedup, to_index[name])
+                    for name in to_index
+                ]
+                for future in as_completed(futures):
+                    pdf_path, chunked_docs, signatures = future.result()
+                    name = os.path.basename(pdf_path)
+                    if name in manifest:
+                        chroma_db.delete(ids=manifest[name]["chunk_ids"])
+                        keyword_index.remove(manifest[name]["chunk_ids"])
+                    stats = chunk_stats(chunked_docs)
+                    chunked_docs, chunk_ids, duplicate_of = self._write_chunks(
+                        chroma_db, chunked_docs, lsh, signatures
+                    )
+                    keyword_index.add(chunked_docs, chunk_ids)
+                    keyword_index.save(keyword_index_path)
+                    if lsh is not None:
+                        lsh.save(dedup_index_path)
+                    manifest[name] = {
+                        "sha256": to_index[name],
+                        "chunker": self.chunker,
+                        "id_scheme": CHUNK_ID_SCHEME,
+                        "chunk_ids": chunk_ids,
+                        "duplicate_of": duplicate_of,
+                        "chunk_stats": stats,
+                    }
+                    self.save_manifest(manifest)
+                    written += len(chunk_ids)
+                    duplicates += len(duplicate_of)
+                    print(f"...Indexed {name}: {len(chunk_ids)} chunks, {len(duplicate_of)} near duplicates skipped")
+
+        if removed or to_index:
+            self.vector_store.bump_index_version()
+            # Servers on the compact backend read an export of the collection
+            if self.vector_store.sync_compact_index():
+                print("...Exported compact index")
+        print(".....Ingestion done.....")
+        return {
+            "indexed": len(to_index),
+            "removed": len(removed),
+            "unchanged": len(manifest) - len(to_index),
+            "chunks_written": written,
+            "duplicates_skipped": duplicates,
+            "unlisted_removed": len(unlisted),
+        }
+
+
+if __name__ == "__main__":
+    print(IngestionPipeline(VectorStore(MODEL_NAME, EMBED_MODEL)).run())
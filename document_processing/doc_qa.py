@@ -1,68 +1,160 @@
 import os
 import sys
-from operator import itemgetter
+import logging
 
 # Add parent directory to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # LangChain and AI-related imports
-from langchain_chroma import Chroma
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.docstore.document import Document
-from langchain.text_splitter import (
-    CharacterTextSplitter,
-    RecursiveCharacterTextSplitter,
-    NLTKTextSplitter,
-    TokenTextSplitter,
-    MarkdownTextSplitter
-)
-from langchain_openai import ChatOpenAI
-from langchain.document_loaders import PyPDFLoader
-from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import HumanMessage
 
 # Project-specific imports
 from app_config.open_ai_cred import (
     OPENAI_KEY, TAVILY_API_KEY, WEATHER_API_KEY, MODEL_NAME, EMBED_MODEL
 )
-from document_processing.doc_indexer import VectorStore
-from document_processing.proj_chains import (
-    context_qa_chain, query_re_writer_agent, document_grader_agent
-)
-from document_processing.proj_lang_graph import agentic_rag_flow, retriever_call
+from document_processing.chat_history import ChatHistoryManager
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("qa")
 
 # Set environment variables
 os.environ['OPENAI_API_KEY'] = OPENAI_KEY
 os.environ['TAVILY_API_KEY'] = TAVILY_API_KEY
 
 
+def get_engine():
+    """
+    Returns the shared agentic RAG engine.
+    The graph module (LangChain chains, Chroma, OpenAI clients) is imported on first
+    use, so importing this module stays cheap for Streamlit reruns and tests.
+    :return: The process-wide AgenticRAGEngine
+    """
+    from document_processing.proj_lang_graph import get_engine as _get_engine
+    return _get_engine()
+
+
+def warm_up(sample_question: str = None):
+    """
+    Explicit warm-up entry point for servers: builds the engine and opens the indexes
+    before the first request arrives.
+    :param sample_question: Optional question used to exercise retrieval once
+    :return: The ready AgenticRAGEngine
+    """
+    from document_processing.proj_lang_graph import warm_up as _warm_up
+    return _warm_up(sample_question)
+
+
 def historical_qa_context(question: str):
     """
     Retrieves context-aware answers using a retrieval-augmented generation (RAG) approach.
     :param question: User's query
     """
-    chatgpt = ChatOpenAI(model_name=MODEL_NAME, temperature=0)
-    final_retriever = retriever_call()
-    rag_chain = context_qa_chain(chatgpt, final_retriever)
+    rag_chain = get_engine().rag_chain
     result = rag_chain.invoke({"input": question, "chat_history": []})
     print(result)
 
 
-def agentic_qa(question: str, chat_history: list):
+def agentic_qa(question: str, chat_history):
     """
     Uses an agentic RAG approach to answer queries while maintaining chat history.
     :param question: User's query
-    :param chat_history: List of previous interactions
+    :param chat_history: ChatHistoryManager of the session, or a plain list of previous interactions
     :return: Generated response and updated chat history
     """
-    agentic_rag = agentic_rag_flow()
-    print(len(chat_history), "length of chat history")
-    response = agentic_rag.invoke({"question": question, "chat_history": chat_history})
-    
+    engine = get_engine()
+    log_event(logger, "question_received", logging.DEBUG, history_turns=len(chat_history))
+    response = engine.invoke(_graph_inputs(question, chat_history, engine))
+    return _record_turn(question, response, chat_history)
+
+
+async def agentic_qa_async(question: str, chat_history):
+    """
+    Async version of agentic_qa; many questions can be in flight on one event loop.
+    :param question: User's query
+    :param chat_history: ChatHistoryManager of the session, or a plain list of previous interactions
+    :return: Generated response and updated chat history
+    """
+    engine = get_engine()
+    log_event(logger, "question_received", logging.DEBUG, history_turns=len(chat_history))
+    response = await engine.ainvoke(_graph_inputs(question, chat_history, engine))
+    return await _arecord_turn(question, response, chat_history)
+
+
+def agentic_qa_stream(question: str, chat_history):
+    """
+    Streaming version of agentic_qa.
+    Yields progress events as graph nodes finish and token events while the answer is
+    generated, then a final event carrying the generation, the updated chat history and
+    the request trace.
+    :param question: User's query
+    :param chat_history: ChatHistoryManager of the session, or a plain list of previous interactions
+    """
+    engine = get_engine()
+    for event in engine.stream(_graph_inputs(question, chat_history, engine)):
+        if event["type"] == "final":
+            generation, chat_history = _record_turn(question, event["state"], chat_history)
+            yield {"type": "final", "generation": generation, "chat_history": chat_history,
+                   "trace": event["state"].get("trace")}
+        else:
+            yield event
+
+
+async def agentic_qa_astream(question: str, chat_history):
+    """
+    Async version of agentic_qa_stream.
+    :param question: User's query
+    :param chat_history: ChatHistoryManager of the session, or a plain list of previous interactions
+    """
+    engine = get_engine()
+    async for event in engine.astream(_graph_inputs(question, chat_history, engine)):
+        if event["type"] == "final":
+            generation, chat_history = await _arecord_turn(question, event["state"], chat_history)
+            yield {"type": "final", "generation": generation, "chat_history": chat_history,
+                   "trace": event["state"].get("trace")}
+        else:
+            yield event
+
+
+def _graph_inputs(question: str, chat_history, engine) -> dict:
+    """
+    Builds the initial graph state; a ChatHistoryManager contributes its bounded message window.
+    :param question: User's query
+    :param chat_history: ChatHistoryManager or list of previous interactions
+    :param engine: The shared engine, whose summarizer a manager without one adopts
+    :return: Initial graph state
+    """
+    if isinstance(chat_history, ChatHistoryManager):
+        if chat_history.summarizer is None:
+            chat_history.summarizer = engine.history_summarizer
+        return {"question": question, "chat_history": chat_history.messages()}
+    return {"question": question, "chat_history": chat_history}
+
+
+def _chunk_ids(documents: list) -> list:
+    """
+    Returns the chunk IDs of documents, which the history stores instead of the documents.
+    :param documents: Source documents
+    :return: Chunk IDs of the documents that have one
+    """
+    return [doc.metadata["chunk_id"] for doc in documents if doc.metadata.get("chunk_id")]
+
+
+def _record_turn(question: str, response: dict, chat_history):
+    """
+    Appends the answered question and its generation to the chat history.
+    :param question: User's query
+    :param response: Final graph state
+    :param chat_history: ChatHistoryManager or list of previous interactions
+    :return: Generated response and updated chat history
+    """
+    if isinstance(chat_history, ChatHistoryManager):
+        chat_history.add_turn(question, response["generation"], response["documents"])
+        return response["generation"], chat_history
+
     chat_history.extend([
         HumanMessage(
             content=response["question"],
-            response_metadata={"source_document": response["documents"]}
+            response_metadata={"source_chunk_ids": _chunk_ids(response["documents"])}
         ),
         response["generation"]
     ])
@@ -70,6 +162,16 @@ def agentic_qa(question: str, chat_history: list):
     return response["generation"], chat_history
 
 
+async def _arecord_turn(question: str, response: dict, chat_history):
+    """
+    Async version of _record_turn; summarizing evicted turns does not block the event loop.
+    """
+    if isinstance(chat_history, ChatHistoryManager):
+        await chat_history.aadd_turn(question, response["generation"], response["documents"])
+        return response["generation"], chat_history
+    return _record_turn(question, response, chat_history)
+
+
 # Example usage
 if __name__ == "__main__":
     agentic_qa("How does GPT-4 work?", [])
@@ -0,0 +1,116 @@
+"""
+Hybrid Retrieval
+
+Runs the dense Chroma search and the BM25 keyword index side by side and merges the
+two rankings with reciprocal rank fusion (RRF). Exact-term queries such as model
+names or table numbers, which often fall below the dense similarity threshold, are
+still found through the keyword ranking. Before the top ``k`` are taken, the fused
+candidates are freed of near duplicates, either by collapsing repeats of better-ranked
+chunks or by maximal marginal relevance, so the grader and the prompt do not spend
+tokens on the same passage twice.
+"""
+
+import os
+import sys
+import asyncio
+from typing import Any, Dict, List, Tuple
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun, AsyncCallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+from app_config.open_ai_cred import RETRIEVAL_DEDUP, RETRIEVAL_DEDUP_THRESHOLD, MMR_LAMBDA
+from document_processing.doc_dedup import collapse_duplicates, mmr_select
+
+
+def rrf_scores(rankings: List[List[Document]], rrf_k: int = 60) -> List[Tuple[Document, float]]:
+    """
+    Scores ranked document lists by summing ``1 / (rrf_k + rank)`` per document.
+
+    Documents are matched across lists by chunk ID, falling back to their content.
+
+    Args:
+        rankings (List[List[Document]]): Ranked lists, best first.
+        rrf_k (int): RRF damping constant.
+
+    Returns:
+        List[Tuple[Document, float]]: Every document with its fused score, best first.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.metadata.get("chunk_id") or doc.page_content.strip()
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    return [(docs[key], scores[key]) for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merges ranked document lists with reciprocal rank fusion.
+
+    Args:
+        rankings (List[List[Document]]): Ranked lists, best first.
+        k (int): Number of fused results.
+        rrf_k (int): RRF damping constant.
+
+    Returns:
+        List[Document]: Top ``k`` documents by fused score.
+    """
+    return [doc for doc, _ in rrf_scores(rankings, rrf_k)[:k]]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Dense + BM25 retriever fused with reciprocal rank fusion.
+
+    Attributes:
+        vectorstore: Chroma collection used for the dense ranking.
+        keyword_retriever: ``BM25Retriever`` used for the sparse ranking.
+        k (int): Number of documents returned.
+        candidate_k (int): Number of candidates taken from each ranking.
+        rrf_k (int): RRF damping constant.
+        dedup (str): Near-duplicate suppression over the fused candidates: 'collapse',
+            'mmr' or 'none'.
+        dedup_threshold (float): Shingle Jaccard similarity from which 'collapse' drops a candidate.
+        mmr_lambda (float): Relevance weight of 'mmr'; 1.0 disables the novelty term.
+    """
+
+    vectorstore: Any
+    keyword_retriever: Any
+    k: int = 3
+    candidate_k: int = 10
+    rrf_k: int = 60
+    dedup: str = RETRIEVAL_DEDUP
+    dedup_threshold: float = RETRIEVAL_DEDUP_THRESHOLD
+    mmr_lambda: float = MMR_LAMBDA
+
+    def _fuse(self, dense: List[Document], sparse: List[Document]) -> List[Document]:
+        fused = rrf_scores([dense, sparse], self.rrf_k)
+        docs = [doc for doc, _ in fused]
+        if self.dedup == "collapse":
+            return collapse_duplicates(docs, self.k, self.dedup_threshold)
+        if self.dedup == "mmr":
+            return mmr_select(docs, [score for _, score in fused], self.k, self.mmr_lambda)
+        return docs[:self.k]
+
+    def _sparse(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.keyword_retriever.index.search(query, self.candidate_k)]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense = self.vectorstore.similarity_search(query, k=self.candidate_k)
+        return self._fuse(dense, self._sparse(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        dense, sparse = await asyncio.gather(
+            self.vectorstore.asimilarity_search(query, k=self.candidate_k),
+            asyncio.to_thread(self._sparse, query),
+        )
+        return self._fuse(dense, sparse)
@@ -0,0 +1,313 @@
+"""
+Versioned Index Snapshots
+
+Keeps every build of the index (Chroma collection, BM25 and MinHash indexes,
+ingestion manifest, compact export) in its own directory under
+``<store root>/versions`` and names the one being served in a ``CURRENT`` file.
+Writers never touch the served snapshot. A build starts from a copy of the current
+snapshot, is validated once complete, and is then activated by atomically replacing
+``CURRENT``. Serving processes notice the new version on their next request and
+switch to it without a restart; answer caches keyed on the index version drop their
+entries at the same time. The newest previous snapshots are kept for rollback.
+
+A build left unfinished by an exception or a crash while writing stays on disk
+under its temporary name and is resumed by the next build started from the same
+served snapshot, so chunks it already embedded are skipped rather than embedded
+again. A build that fails validation is deleted, and so are unfinished builds that
+cannot be resumed. One writer per store root is assumed.
+
+A store root without a ``CURRENT`` file is the legacy layout and is served as is;
+the first build copies it into a snapshot.
+
+Usage:
+    python document_processing/index_snapshots.py list
+    python document_processing/index_snapshots.py activate <version>
+    python document_processing/index_snapshots.py rollback
+"""
+
+import os
+import sys
+import json
+import uuid
+import shutil
+import argparse
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from typing import List, Optional
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_config.open_ai_cred import INDEX_KEEP_VERSIONS, INDEX_VALIDATION_SAMPLES, INDEX_VALIDATION_QUERIES
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("snapshots")
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+# Written into an unfinished build once the copy of its source is complete
+BUILD_SOURCE_FILE = "BUILD_SOURCE"
+TMP_SUFFIX = ".tmp"
+
+
+class SnapshotValidationError(ValueError):
+    """Raised when a built snapshot must not be served."""
+
+
+class SnapshotStore:
+    """
+    Versioned snapshot directories below one store root.
+    """
+
+    def __init__(self, root: str, keep: int = INDEX_KEEP_VERSIONS):
+        """
+        Args:
+            root (str): Store root, e.g. ``proj_db``.
+            keep (int): Previous versions kept for rollback besides the current one.
+        """
+        self.root = root
+        self.keep = keep
+        self._cached = (None, "")
+        self._lock = threading.Lock()
+
+    def version_path(self, version: str) -> str:
+        return os.path.join(self.root, VERSIONS_DIR, version)
+
+    def current(self) -> str:
+        """
+        Returns the served version, re-reading ``CURRENT`` only when the file changed.
+
+        Returns:
+            str: Version name, or an empty string for the legacy layout.
+        """
+        path = os.path.join(self.root, CURRENT_FILE)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return ""
+        stamp = stat.st_mtime_ns, stat.st_ino
+        with self._lock:
+            if self._cached[0] != stamp:
+                with open(path) as f:
+                    self._cached = (stamp, f.read().strip())
+            return self._cached[1]
+
+    def current_path(self) -> str:
+        """
+        Returns the directory of the served snapshot.
+
+        Returns:
+            str: Snapshot directory, or the store root for the legacy layout.
+        """
+        version = self.current()
+        return self.version_path(version) if version else self.root
+
+    def versions(self) -> List[str]:
+        """
+        Lists the snapshots on disk, oldest first (names sort by creation time).
+
+        Returns:
+            List[str]: Version names.
+        """
+        versions_dir = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(versions_dir):
+            return []
+        return sorted(name for name in os.listdir(versions_dir)
+                      if os.path.isdir(os.path.join(versions_dir, name)) and not name.endswith(TMP_SUFFIX))
+
+    def unfinished_builds(self) -> List[str]:
+        """
+        Lists the builds left under their temporary name, oldest first.
+
+        Returns:
+            List[str]: Version names of the unfinished builds.
+        """
+        versions_dir = os.path.join(self.root, VERSIONS_DIR)
+        if not os.path.isdir(versions_dir):
+            return []
+        return sorted(name[:-len(TMP_SUFFIX)] for name in os.listdir(versions_dir)
+                      if os.path.isdir(os.path.join(versions_dir, name)) and name.endswith(TMP_SUFFIX))
+
+    def _build_source(self, version: str) -> Optional[str]:
+        """Version an unfinished build was copied from, or None if the copy never completed."""
+        try:
+            with open(os.path.join(self.version_path(version) + TMP_SUFFIX, BUILD_SOURCE_FILE)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _resumable_build(self) -> Optional[str]:
+        """Newest unfinished build copied from the served snapshot, if any."""
+        current = self.current()
+        resumable = [version for version in self.unfinished_builds() if self._build_source(version) == current]
+        return resumable[-1] if resumable else None
+
+    def _discard_builds(self, keep: Optional[str] = None):
+        """Deletes every unfinished build except ``keep``."""
+        for version in self.unfinished_builds():
+            if version != keep:
+                shutil.rmtree(self.version_path(version) + TMP_SUFFIX, ignore_errors=True)
+
+    @contextmanager
+    def building(self, resume: bool = True):
+        """
+        Creates a new snapshot from a copy of the served one.
+
+        The snapshot is built under a temporary name and moved to its final name when
+        the block completes. If the block raises, or the process dies, the build stays
+        on disk and the next call resumes it, provided the served snapshot is still the
+        one it was copied from; every other unfinished build is deleted. A build whose
+        block raises :class:`SnapshotValidationError` is deleted instead, since resuming
+        it would only fail validation again.
+
+        Args:
+            resume (bool): Resume an unfinished build. If False, unfinished builds are
+                deleted and the snapshot is copied afresh.
+
+        Yields:
+            tuple: ``(version, path)`` of the snapshot being built.
+        """
+        version = self._resumable_build() if resume else None
+        self._discard_builds(keep=version)
+        if version is not None:
+            tmp_path = self.version_path(version) + TMP_SUFFIX
+            log_event(logger, "index_build_resumed", version=version)
+        else:
+            version = datetime.now().strftime("%Y%m%dT%H%M%S%f") + "-" + uuid.uuid4().hex[:6]
+            tmp_path = self.version_path(version) + TMP_SUFFIX
+            source = self.current_path()
+            ignore = shutil.ignore_patterns(VERSIONS_DIR, CURRENT_FILE, CURRENT_FILE + TMP_SUFFIX,
+                                            BUILD_SOURCE_FILE, ".DS_Store")
+            if os.path.isdir(source):
+                shutil.copytree(source, tmp_path, ignore=ignore)
+            else:
+                os.makedirs(tmp_path)
+            with open(os.path.join(tmp_path, BUILD_SOURCE_FILE), "w") as f:
+                f.write(self.current())
+        try:
+            yield version, tmp_path
+        except SnapshotValidationError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        os.remove(os.path.join(tmp_path, BUILD_SOURCE_FILE))
+        os.replace(tmp_path, self.version_path(version))
+
+    def activate(self, version: str):
+        """
+        Makes a snapshot the served one by atomically replacing ``CURRENT``, then prunes
+        versions beyond the retention.
+
+        Args:
+            version (str): Version to serve.
+        """
+        if not os.path.isdir(self.version_path(version)):
+            raise ValueError(f"Unknown index version: {version}")
+        path = os.path.join(self.root, CURRENT_FILE)
+        with open(path + TMP_SUFFIX, "w") as f:
+            f.write(version)
+        os.replace(path + TMP_SUFFIX, path)
+        self.prune()
+
+    def prune(self):
+        """
+        Deletes snapshots older than the ``keep`` versions preceding the current one and
+        unfinished builds that can no longer be resumed.
+        """
+        self._discard_builds(keep=self._resumable_build())
+        versions = self.versions()
+        current = self.current()
+        if current not in versions:
+            return
+        older = versions[:versions.index(current)]
+        for version in older[:max(0, len(older) - self.keep)]:
+            shutil.rmtree(self.version_path(version), ignore_errors=True)
+
+    def rollback(self, version: Optional[str] = None) -> str:
+        """
+        Serves an earlier snapshot again.
+
+        Args:
+            version (str, optional): Version to serve. Defaults to the one before the current.
+
+        Returns:
+            str: The version now served.
+        """
+        if version is None:
+            versions = self.versions()
+            current = self.current()
+            older = versions[:versions.index(current)] if current in versions else []
+            if not older:
+                raise ValueError("No earlier index version to roll back to")
+            version = older[-1]
+        self.activate(version)
+        return version
+
+
+def validate_snapshot(vector_store, min_chunks: int = 1,
+                      samples: int = INDEX_VALIDATION_SAMPLES,
+                      queries: List[str] = INDEX_VALIDATION_QUERIES) -> dict:
+    """
+    Checks a built snapshot before it is served.
+
+    - the collection holds at least ``min_chunks`` chunks;
+    - the BM25 index and the compact export, where present, hold the same chunks;
+    - ``samples`` stored vectors find their own chunk among the top 3 results;
+    - every sample query returns at least one chunk.
+
+    Args:
+        vector_store (VectorStore): Vector store bound to the snapshot directory.
+        min_chunks (int): Chunks the build must contain, e.g. those listed in its manifest.
+        samples (int): Stored vectors searched for themselves.
+        queries (List[str]): Text queries that must return results.
+
+    Returns:
+        dict: ``count`` and the list of ``errors``; the snapshot is valid if it is empty.
+    """
+    from document_processing.secondary_retrieval import BM25Index
+
+    errors = []
+    chroma_db = vector_store.vectord_db_loader()
+    count = chroma_db._collection.count()
+    if count < min_chunks:
+        errors.append(f"collection holds {count} chunks, expected at least {min_chunks}")
+
+    if os.path.exists(vector_store.keyword_index_path()):
+        keyword_count = len(BM25Index.load(vector_store.keyword_index_path()))
+        if keyword_count != count:
+            errors.append(f"BM25 index holds {keyword_count} chunks, collection {count}")
+    manifest_path = os.path.join(vector_store.compact_index_path(), "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            compact_count = json.load(f)["count"]
+        if compact_count != count:
+            errors.append(f"compact index holds {compact_count} chunks, collection {count}")
+
+    if count and samples:
+        sample = chroma_db._collection.get(limit=samples, include=["embeddings"])
+        for chunk_id, embedding in zip(sample["ids"], sample["embeddings"]):
+            # Compare collection IDs: chunks indexed before chunk_id metadata have UUID IDs
+            found = chroma_db._collection.query(query_embeddings=[list(embedding)], n_results=3, include=[])
+            if chunk_id not in found["ids"][0]:
+                errors.append(f"chunk {chunk_id} is not found by its own vector")
+    for query in queries:
+        if not chroma_db.similarity_search(query, k=1):
+            errors.append(f"no results for sample query {query!r}")
+    return {"count": count, "errors": errors}
+
+
+if __name__ == "__main__":
+    from document_processing.doc_indexer import snapshots
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "activate", "rollback"])
+    parser.add_argument("version", nargs="?")
+    args = parser.parse_args()
+
+    if args.command == "activate":
+        snapshots.activate(args.version)
+    elif args.command == "rollback":
+        snapshots.rollback(args.version)
+    current = snapshots.current()
+    for version in snapshots.versions():
+        print(("* " if version == current else "  ") + version)
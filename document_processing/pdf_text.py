@@ -0,0 +1,166 @@
+"""
+PDF Text Extraction
+
+Streams the pages of a PDF one at a time with ``PyPDFLoader.lazy_load`` instead of
+materializing the whole document, and keeps the extracted text in a persistent cache
+keyed by the file's content hash and the parser version. Re-ingesting a file, or
+re-chunking it with another configuration, reads the cached pages instead of parsing
+the PDF again. The cache is read one page at a time as well, so only a few pages are
+held in memory either way.
+
+A cache entry is a gzipped JSON-lines file with one page per line. It is written
+while the pages are handed to the caller and renamed into place only once the whole
+document was extracted, so a partial entry is never read.
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import uuid
+import hashlib
+from functools import lru_cache
+from typing import Iterator
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from app_config.open_ai_cred import PDF_TEXT_CACHE_DIR
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("pdf_text")
+
+# Bump when the way pages are extracted or stored changes, to ignore older entries
+EXTRACTION_REVISION = 1
+
+
+def file_sha256(path: str) -> str:
+    """
+    Computes the SHA-256 hash of a file's content.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def parser_version() -> str:
+    """
+    Identifies the text extractor, so cached text is not reused across parser upgrades.
+
+    Returns:
+        str: e.g. 'pypdf-4.2.0-r1'.
+    """
+    from importlib.metadata import version, PackageNotFoundError
+
+    try:
+        pypdf_version = version("pypdf")
+    except PackageNotFoundError:
+        pypdf_version = "unknown"
+    return f"pypdf-{pypdf_version}-r{EXTRACTION_REVISION}"
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Document]:
+    """
+    Parses a PDF lazily, one page document at a time.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+
+    Returns:
+        Iterator[Document]: Pages in order, with ``source`` and ``page`` metadata.
+    """
+    from langchain.document_loaders import PyPDFLoader
+
+    return PyPDFLoader(pdf_path).lazy_load()
+
+
+class PageTextCache:
+    """
+    Directory of extracted page text, one entry per file content and parser version.
+    """
+
+    def __init__(self, directory: str = PDF_TEXT_CACHE_DIR, version: str = None):
+        """
+        Args:
+            directory (str): Cache directory.
+            version (str, optional): Parser version the entries belong to. Defaults to
+                ``parser_version()``.
+        """
+        self.directory = directory
+        self.version = version or parser_version()
+
+    def path(self, file_hash: str) -> str:
+        """
+        Returns the entry path of a file content hash.
+
+        Args:
+            file_hash (str): SHA-256 of the PDF.
+
+        Returns:
+            str: Entry file path.
+        """
+        tag = re.sub(r"[^A-Za-z0-9._-]", "_", self.version)
+        return os.path.join(self.directory, file_hash[:2], f"{file_hash}.{tag}.jsonl.gz")
+
+    def pages(self, pdf_path: str, file_hash: str = None) -> Iterator[Document]:
+        """
+        Yields the pages of a PDF from the cache, or parses it and fills the cache.
+
+        Args:
+            pdf_path (str): Path to the PDF file.
+            file_hash (str, optional): SHA-256 of the file, if already known.
+
+        Yields:
+            Document: Pages in order, with ``source`` set to ``pdf_path``.
+        """
+        path = self.path(file_hash or file_sha256(pdf_path))
+        if os.path.exists(path):
+            log_event(logger, "pdf_text_cache_hit", source=os.path.basename(pdf_path))
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    page = json.loads(line)
+                    yield Document(page_content=page["text"], metadata=dict(page["metadata"], source=pdf_path))
+            return
+
+        log_event(logger, "pdf_text_cache_miss", source=os.path.basename(pdf_path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=1) as f:
+                for page in iter_pdf_pages(pdf_path):
+                    # The source path is not part of the content; it is set again on read
+                    metadata = {key: value for key, value in page.metadata.items() if key != "source"}
+                    f.write(json.dumps({"text": page.page_content, "metadata": metadata}, default=str) + "\n")
+                    yield page
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def load_pdf_pages(pdf_path: str, file_hash: str = None, cache_dir: str = PDF_TEXT_CACHE_DIR) -> Iterator[Document]:
+    """
+    Streams the pages of a PDF, through the extracted-text cache unless it is disabled.
+
+    Args:
+        pdf_path (str): Path to the PDF file.
+        file_hash (str, optional): SHA-256 of the file, if already known.
+        cache_dir (str): Cache directory; empty to always parse.
+
+    Returns:
+        Iterator[Document]: Pages in order.
+    """
+    if not cache_dir:
+        return iter_pdf_pages(pdf_path)
+    return PageTextCache(cache_dir).pages(pdf_path, file_hash)
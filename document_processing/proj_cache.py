@@ -0,0 +1,621 @@
+"""
+Caching Layer
+
+Caches shared by the ingestion and query paths. ``SQLiteLRUStore`` is a small
+disk-backed key/value store with LRU eviction and hit/miss counters;
+``CachedEmbeddings`` puts it in front of an embedding model so identical texts are
+embedded only once per model. ``SemanticAnswerCache`` returns earlier answers to
+near-identical questions by cosine similarity of their embeddings. ``LLMResponseCache``
+is a LangChain cache that serves repeated chat completions (the same rendered prompt
+to the same model with the same parameters) from a SQLite or in-memory LRU store.
+"""
+
+import os
+import sys
+import copy
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from app_config.open_ai_cred import EMBED_CACHE_PATH, EMBED_CACHE_MAX_ENTRIES
+from app_config.open_ai_cred import (
+    LLM_CACHE_BACKEND, LLM_CACHE_PATH, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_ITEM_BYTES
+)
+from document_processing.proj_metrics import CACHED_RESPONSE_KEY, metrics
+
+
+class SQLiteLRUStore:
+    """
+    SQLite-backed key/value store with LRU eviction, optional TTL and hit/miss counters.
+
+    Reads only select: the access times of the entries they hit are buffered in memory
+    and written in one batch every ``access_flush_size`` hits or ``access_flush_seconds``,
+    and before evicting. The store keeps a running row count and, once it exceeds
+    ``max_entries``, deletes the least recently used rows down to ``max_entries`` minus
+    ``evict_batch``, so writes at capacity do not evict row by row. The connection is
+    shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str, table: str, max_entries: int, ttl_seconds: Optional[float] = None,
+                 access_flush_size: int = 256, access_flush_seconds: float = 5.0, evict_batch: Optional[int] = None):
+        """
+        Opens (or creates) the store.
+
+        Args:
+            path (str): SQLite file path, or ':memory:'.
+            table (str): Table holding this store's entries.
+            max_entries (int): Maximum number of entries kept.
+            ttl_seconds (float, optional): Entries older than this are treated as missing.
+            access_flush_size (int): Buffered access times that trigger a write.
+            access_flush_seconds (float): Longest time an access time stays buffered.
+            evict_batch (int, optional): Extra rows freed by each eviction. Defaults to
+                1% of ``max_entries``.
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.access_flush_size = access_flush_size
+        self.access_flush_seconds = access_flush_seconds
+        self.evict_batch = max(1, max_entries // 100) if evict_batch is None else evict_batch
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed: Dict[str, float] = {}
+        self._last_flush = time.time()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value BLOB, created_at REAL, last_access REAL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table}(last_access)"
+            )
+            (self._count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+
+    def _flush_access(self):
+        """Writes the buffered access times. Caller holds the lock."""
+        if self._accessed:
+            with self._conn:
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?",
+                    [(accessed, key) for key, accessed in self._accessed.items()],
+                )
+            self._accessed.clear()
+        self._last_flush = time.time()
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Looks up several keys at once and records their access time.
+
+        Args:
+            keys (List[str]): Keys to look up.
+
+        Returns:
+            Dict[str, bytes]: Values of the keys that were found and not expired.
+        """
+        if not keys:
+            return {}
+        now = time.time()
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self.ttl_seconds is None or now - created_at <= self.ttl_seconds:
+                        found[key] = value
+            for key in found:
+                self._accessed[key] = now
+            if len(self._accessed) >= self.access_flush_size or now - self._last_flush >= self.access_flush_seconds:
+                self._flush_access()
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Looks up a single key.
+
+        Args:
+            key (str): Key to look up.
+
+        Returns:
+            bytes or None: Stored value, or None on a miss.
+        """
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, bytes]):
+        """
+        Stores several entries and evicts the least recently used ones above ``max_entries``.
+
+        Args:
+            items (Dict[str, bytes]): Keys and values to store.
+        """
+        if not items:
+            return
+        now = time.time()
+        keys = list(items)
+        with self._lock, self._conn:
+            existing = 0
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                (found,) = self._conn.execute(
+                    f"SELECT COUNT(*) FROM {self.table} WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchone()
+                existing += found
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, last_access) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, value, now, now) for key, value in items.items()],
+            )
+            self._count += len(keys) - existing
+            if self._count > self.max_entries:
+                # Other processes may share the file, so the count is re-read before evicting
+                (self._count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+            if self._count > self.max_entries:
+                self._flush_access()
+                evicted = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY last_access LIMIT ?)",
+                    (min(self._count, self._count - self.max_entries + self.evict_batch),),
+                ).rowcount
+                self._count -= evicted
+
+    def put(self, key: str, value: bytes):
+        """
+        Stores a single entry.
+
+        Args:
+            key (str): Key to store.
+            value (bytes): Value to store.
+        """
+        self.put_many({key: value})
+
+    def clear(self):
+        """Deletes every entry and resets the counters."""
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._accessed.clear()
+            self._count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the current size.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``hit_rate`` and ``entries``.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": self._count,
+            }
+
+
+class MemoryLRUStore:
+    """
+    In-process counterpart of ``SQLiteLRUStore`` with the same interface, for caches
+    that need not survive a restart.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: Optional[float] = None):
+        """
+        Args:
+            max_entries (int): Maximum number of entries kept.
+            ttl_seconds (float, optional): Entries older than this are treated as missing.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Looks up a key and marks it as recently used.
+
+        Args:
+            key (str): Key to look up.
+
+        Returns:
+            bytes or None: Stored value, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl_seconds is not None and time.time() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, value: bytes):
+        """
+        Stores an entry and evicts the least recently used ones above ``max_entries``.
+
+        Args:
+            key (str): Key to store.
+            value (bytes): Value to store.
+        """
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Deletes every entry and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the current size.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``hit_rate`` and ``entries``.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding model wrapper that serves repeated texts from a ``SQLiteLRUStore``.
+
+    Entries are keyed by (model name, text hash) and stored as float32 arrays, so a
+    cache can be shared by several models without collisions.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, store: SQLiteLRUStore):
+        """
+        Args:
+            underlying (Embeddings): Embedding model called on cache misses.
+            model_name (str): Name of the embedding model, part of every cache key.
+            store (SQLiteLRUStore): Backing store.
+        """
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = store
+
+    def _key(self, text: str) -> str:
+        """Builds the cache key for one text."""
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return array("f", vector).tobytes()
+
+    @staticmethod
+    def _decode(blob: bytes) -> List[float]:
+        vector = array("f")
+        vector.frombytes(blob)
+        return vector.tolist()
+
+    def _lookup(self, texts: List[str]):
+        """
+        Splits texts into cached vectors and the unique texts still to embed.
+
+        Returns:
+            tuple: ``(keys, cached, missing)`` where ``cached`` maps keys to vectors and
+            ``missing`` maps keys of uncached texts to the text.
+        """
+        keys = [self._key(text) for text in texts]
+        cached = {key: self._decode(blob) for key, blob in self.store.get_many(keys).items()}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        return keys, cached, missing
+
+    def _merge(self, keys: List[str], cached: dict, missing: dict, vectors: List[List[float]]):
+        """Stores freshly computed vectors and returns all vectors in input order."""
+        fresh = dict(zip(missing, vectors))
+        self.store.put_many({key: self._encode(vector) for key, vector in fresh.items()})
+        cached.update(fresh)
+        return [cached[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._lookup(texts)
+        vectors = self.underlying.embed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, cached, missing, vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, cached, missing = self._lookup([text])
+        vectors = [self.underlying.embed_query(text)] if missing else []
+        return self._merge(keys, cached, missing, vectors)[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, cached, missing = self._lookup(texts)
+        vectors = await self.underlying.aembed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, cached, missing, vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys, cached, missing = self._lookup([text])
+        vectors = [await self.underlying.aembed_query(text)] if missing else []
+        return self._merge(keys, cached, missing, vectors)[0]
+
+
+class SemanticAnswerCache:
+    """
+    In-memory cache of answered questions, looked up by embedding similarity.
+
+    A lookup returns the most similar cached question if its cosine similarity is at
+    least ``threshold``. Entries expire after ``ttl_seconds`` and the least recently
+    used entry is evicted beyond ``max_entries``. When ``version_fn`` reports a new
+    index version (the collection was re-indexed) the whole cache is dropped.
+    Documents are copied in and out, so callers never share them with the cache.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: float, max_entries: int,
+                 version_fn: Optional[Callable[[], str]] = None):
+        """
+        Args:
+            threshold (float): Minimum cosine similarity for a hit.
+            ttl_seconds (float): Lifetime of an entry.
+            max_entries (int): Maximum number of cached answers.
+            version_fn (callable, optional): Returns the current index version.
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._matrix = None
+        self._keys = []
+        self._next_key = 0
+        self._version = version_fn() if version_fn else None
+        self._lock = threading.Lock()
+
+    def _check_version(self):
+        """Drops every entry if the index version changed. Caller holds the lock."""
+        if self.version_fn is None:
+            return
+        version = self.version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._matrix = None
+            self._version = version
+
+    def _expire(self, now: float):
+        """Drops expired entries. Caller holds the lock."""
+        expired = [key for key, entry in self._entries.items()
+                   if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, embedding: List[float]) -> Optional[dict]:
+        """
+        Finds the cached answer closest to the embedding.
+
+        Args:
+            embedding (List[float]): Embedding of the standalone question.
+
+        Returns:
+            dict or None: ``question``, ``generation``, ``documents`` and ``similarity``
+            of the best match above the threshold, else None.
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        with self._lock:
+            self._check_version()
+            self._expire(time.time())
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[key]["vector"] for key in self._keys])
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            entry = self._entries[key]
+            self.hits += 1
+            return {
+                "question": entry["question"],
+                "generation": entry["generation"],
+                "documents": copy.deepcopy(entry["documents"]),
+                "similarity": float(scores[best]),
+            }
+
+    def store(self, embedding: List[float], question: str, generation: str, documents: list):
+        """
+        Caches an answer.
+
+        Args:
+            embedding (List[float]): Embedding of the standalone question.
+            question (str): The standalone question.
+            generation (str): The generated answer.
+            documents (list): Source documents of the answer.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        documents = copy.deepcopy(list(documents))
+        with self._lock:
+            self._check_version()
+            self._entries[self._next_key] = {
+                "vector": vector,
+                "question": question,
+                "generation": generation,
+                "documents": documents,
+                "created_at": time.time(),
+            }
+            self._next_key += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrix = None
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the current size.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``hit_rate`` and ``entries``.
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+class LLMResponseCache(BaseCache):
+    """
+    Exact-match cache of chat model responses, plugged into a model with ``cache=``.
+
+    LangChain looks responses up by the rendered prompt and the model's parameter
+    string (model name, temperature, bound tools or structured-output schema), so a
+    hit requires the same template, the same inputs and the same model settings.
+    Responses are serialized with ``langchain_core.load``; those larger than
+    ``max_item_bytes`` are not cached. Hits are returned without token usage, since
+    they cost no tokens, are marked with ``CACHED_RESPONSE_KEY`` in the message's
+    response metadata and are counted in the ``rag_llm_cache_*`` metrics.
+    """
+
+    def __init__(self, store, max_item_bytes: int = LLM_CACHE_MAX_ITEM_BYTES):
+        """
+        Args:
+            store (SQLiteLRUStore or MemoryLRUStore): Backing store; it enforces the
+                entry cap and TTL.
+            max_item_bytes (int): Largest serialized response that is cached.
+        """
+        self.store = store
+        self.max_item_bytes = max_item_bytes
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        """Builds the cache key for one prompt and model configuration."""
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        blob = self.store.get(self._key(prompt, llm_string))
+        if blob is None:
+            metrics.inc("rag_llm_cache_misses_total")
+            return None
+        metrics.inc("rag_llm_cache_hits_total")
+        generations = loads(blob.decode("utf-8"))
+        for generation in generations:
+            message = getattr(generation, "message", None)
+            if message is not None:
+                if getattr(message, "usage_metadata", None):
+                    message.usage_metadata = None
+                # Lets request traces tell hits from LLM calls
+                message.response_metadata = dict(message.response_metadata or {}, **{CACHED_RESPONSE_KEY: True})
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        blob = dumps(list(return_val)).encode("utf-8")
+        if len(blob) > self.max_item_bytes:
+            return
+        self.store.put(self._key(prompt, llm_string), blob)
+
+    def clear(self, **kwargs: Any):
+        self.store.clear()
+
+    def stats(self) -> dict:
+        """
+        Returns hit/miss counters and the current size of the backing store.
+
+        Returns:
+            dict: ``hits``, ``misses``, ``hit_rate`` and ``entries``.
+        """
+        return self.store.stats()
+
+
+# --- Shared Stores ---
+_embedding_store = None
+_llm_cache = None
+_store_lock = threading.Lock()
+
+def get_embedding_store() -> SQLiteLRUStore:
+    """
+    Returns the process-wide embedding cache store, opening it on first use.
+
+    Returns:
+        SQLiteLRUStore: Store at ``EMBED_CACHE_PATH``.
+    """
+    global _embedding_store
+    if _embedding_store is None:
+        with _store_lock:
+            if _embedding_store is None:
+                _embedding_store = SQLiteLRUStore(
+                    EMBED_CACHE_PATH, "embeddings", EMBED_CACHE_MAX_ENTRIES
+                )
+    return _embedding_store
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Returns the process-wide LLM response cache, opening it on first use.
+
+    Returns:
+        LLMResponseCache or None: Cache on the LLM_CACHE_BACKEND store ('sqlite' or
+        'memory'), or None if the backend is 'none'.
+    """
+    global _llm_cache
+    if _llm_cache is None and LLM_CACHE_BACKEND != "none":
+        with _store_lock:
+            if _llm_cache is None:
+                ttl = LLM_CACHE_TTL or None
+                if LLM_CACHE_BACKEND == "sqlite":
+                    store = SQLiteLRUStore(LLM_CACHE_PATH, "llm_responses", LLM_CACHE_MAX_ENTRIES, ttl)
+                elif LLM_CACHE_BACKEND == "memory":
+                    store = MemoryLRUStore(LLM_CACHE_MAX_ENTRIES, ttl)
+                else:
+                    raise ValueError(f"Unknown LLM cache backend: {LLM_CACHE_BACKEND}")
+                _llm_cache = LLMResponseCache(store)
+    return _llm_cache
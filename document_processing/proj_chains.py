@@ -1,5 +1,6 @@
 import sys
 import os
+from typing import List
 
 # Add parent directory to sys.path for module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -16,17 +17,36 @@ from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain.chains import create_history_aware_retriever
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
+from document_processing.proj_cache import get_llm_cache
 from document_processing.proj_prompt import (
     contextualize_q_prompt,
     qa_prompt,
     re_write_prompt,
-    grade_prompt
+    grade_prompt,
+    batch_grade_prompt,
+    summarize_history_prompt
 )
 
 # Set environment variables
 os.environ['OPENAI_API_KEY'] = OPENAI_KEY
 os.environ['TAVILY_API_KEY'] = TAVILY_API_KEY
 
+def chat_model(**kwargs):
+    """
+    Creates the default chat model of the agents.
+
+    It runs at temperature 0 behind the shared LLM response cache, so repeated
+    prompts, such as the same chunk graded against the same question or the same
+    question rewritten again, are answered without a network round trip.
+
+    Args:
+        **kwargs: Extra ``ChatOpenAI`` settings.
+
+    Returns:
+        ChatOpenAI: The chat model.
+    """
+    return ChatOpenAI(model=MODEL_NAME, temperature=0, cache=get_llm_cache(), **kwargs)
+
 def context_qa_chain(chatgpt, final_retriever):
     """
     Creates a Retrieval-Augmented Generation (RAG) chain for context-based question answering.
@@ -45,35 +65,105 @@ def context_qa_chain(chatgpt, final_retriever):
     rag_chain = create_retrieval_chain(history_aware_retriever, question_answer_chain)
     return rag_chain
 
-def query_re_writer_agent():
+def question_contextualizer_agent(llm=None):
+    """
+    Creates an agent that turns a follow-up question into a standalone question.
+
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
+    Returns:
+        A pipeline that reformulates the question using the chat history.
+    """
+    llm = llm or chat_model()
+    contextualizer = contextualize_q_prompt | llm | StrOutputParser()
+    return contextualizer
+
+def answer_generator_agent(llm=None):
+    """
+    Creates an agent that answers a question from documents that were already retrieved.
+
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
+    Returns:
+        A stuff-documents chain taking ``context``, ``input`` and ``chat_history``.
+    """
+    llm = llm or chat_model()
+    answer_generator = create_stuff_documents_chain(llm, qa_prompt)
+    return answer_generator
+
+def history_summarizer_agent(llm=None):
+    """
+    Creates an agent that folds old conversation turns into a running summary.
+
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
+    Returns:
+        A pipeline taking ``summary`` and ``turns`` and returning the updated summary.
+    """
+    llm = llm or chat_model()
+    history_summarizer = summarize_history_prompt | llm | StrOutputParser()
+    return history_summarizer
+
+class GradeDocuments(BaseModel):
+    """Binary score for relevance check on retrieved documents."""
+    binary_score: str = Field(
+        description="Documents are relevant to the question, 'yes' or 'no'"
+    )
+
+def query_re_writer_agent(llm=None):
     """
     Creates a query rewriter agent using a language model.
 
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
     Returns:
         A query rewriter pipeline that refines user questions before retrieval.
     """
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0)
+    llm = llm or chat_model()
     question_rewriter = re_write_prompt | llm | StrOutputParser()
     return question_rewriter
 
-def document_grader_agent():
+def document_grader_agent(llm=None):
     """
     Creates a document grading agent to evaluate document relevance to a query.
 
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
     Returns:
         A document grading function that provides binary relevance scores.
     """
-    class GradeDocuments(BaseModel):
-        """Binary score for relevance check on retrieved documents."""
-        binary_score: str = Field(
-            description="Documents are relevant to the question, 'yes' or 'no'"
-        )
-    
-    llm = ChatOpenAI(model=MODEL_NAME, temperature=0)
+    llm = llm or chat_model()
     structured_llm_grader = llm.with_structured_output(GradeDocuments)
     doc_grader = grade_prompt | structured_llm_grader
     return doc_grader
 
+class GradeDocumentsBatch(BaseModel):
+    """Binary relevance scores for a list of retrieved documents, in input order."""
+    binary_scores: List[str] = Field(
+        description="One entry per document, in order: 'yes' if relevant to the question, otherwise 'no'"
+    )
+
+def batch_document_grader_agent(llm=None):
+    """
+    Creates a grading agent that scores all retrieved documents in one structured-output call.
+
+    Args:
+        llm (ChatOpenAI, optional): Shared chat model. A new one is created if omitted.
+
+    Returns:
+        A grading pipeline taking ``question``, ``documents`` and ``count`` and returning
+        one binary score per document.
+    """
+    llm = llm or chat_model()
+    structured_llm_grader = llm.with_structured_output(GradeDocumentsBatch)
+    batch_doc_grader = batch_grade_prompt | structured_llm_grader
+    return batch_doc_grader
+
 # query_writer =    query_re_writer_agent()
 # query = "cpitl bharat"
 # res = query_writer.invoke({"question": query})
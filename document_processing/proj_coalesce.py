@@ -0,0 +1,279 @@
+"""
+Request Coalescing
+
+Single-flight execution of identical concurrent questions. When several sessions ask
+the same question with the same conversation state while it is being answered, only
+the first request runs the graph; the others attach to that run and receive its final
+state or, when streaming, every progress and token event from the start. A run is
+shared only while it is in flight, so later requests start a fresh one; caching
+finished answers is left to the answer and LLM response caches.
+
+Requests are matched by ``coalesce_key``: the question, either exact or normalized
+for case and whitespace, together with a fingerprint of the chat history.
+"""
+
+import os
+import sys
+import asyncio
+import hashlib
+import threading
+from typing import Callable, Dict, Optional
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app_config.open_ai_cred import COALESCE_KEY, COALESCE_HISTORY, COALESCE_TIMEOUT
+from document_processing.proj_metrics import get_logger, log_event, metrics
+
+logger = get_logger("coalesce")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def history_fingerprint(chat_history: list) -> str:
+    """
+    Hashes the type and content of every history message, so only requests with the
+    same conversation state share a run.
+
+    Args:
+        chat_history (list): Messages passed to the graph.
+
+    Returns:
+        str: Hex digest, identical for equal histories.
+    """
+    digest = hashlib.sha256()
+    for message in chat_history or []:
+        content = getattr(message, "content", message)
+        digest.update(f"{getattr(message, 'type', '')}\0{content}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def coalesce_key(inputs: dict, key_mode: str = COALESCE_KEY, history_mode: str = COALESCE_HISTORY) -> str:
+    """
+    Builds the single-flight key of a graph request.
+
+    Args:
+        inputs (dict): Initial graph state with ``question`` and ``chat_history``.
+        key_mode (str): 'normalized' or 'exact' question matching.
+        history_mode (str): 'full' to require the same chat history, 'none' to ignore it.
+
+    Returns:
+        str: The key.
+    """
+    if key_mode not in ("normalized", "exact"):
+        raise ValueError(f"Unknown coalescing key mode: {key_mode}")
+    if history_mode not in ("full", "none"):
+        raise ValueError(f"Unknown coalescing history mode: {history_mode}")
+    question = inputs["question"]
+    if key_mode == "normalized":
+        question = normalize_question(question)
+    history = history_fingerprint(inputs.get("chat_history")) if history_mode == "full" else ""
+    return hashlib.sha256(f"{question}\0{history}".encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    """One in-progress execution and what it produced so far."""
+
+    def __init__(self):
+        self.events = []
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.subscribers = 1
+        self.cond = threading.Condition()
+        self.changed: Optional[asyncio.Event] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class RequestCoalescer:
+    """
+    Shares in-flight executions between callers with the same key.
+
+    ``do``/``ado`` share a result; ``stream``/``astream`` broadcast a stream of events
+    and replay the events a late subscriber missed. Followers receive ``share(value)``
+    of every result or event, which lets the caller mark them as coalesced. A follower
+    that waits longer than ``timeout`` seconds (for the result, or for the next event
+    of a stream) gets a ``TimeoutError``; the shared execution keeps running for the
+    others. Async executions run as tasks that are cancelled once every caller is gone.
+    """
+
+    def __init__(self, timeout: float = COALESCE_TIMEOUT, share: Callable = None):
+        """
+        Args:
+            timeout (float): Seconds a follower waits; 0 for no limit.
+            share (callable, optional): Applied to results and events delivered to followers.
+        """
+        self.timeout = timeout or None
+        self.share = share or (lambda value: value)
+        self._flights: Dict[tuple, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: tuple):
+        """Returns ``(flight, leader)``, creating the flight if none is in progress."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.subscribers += 1
+                metrics.inc("rag_coalesced_requests_total", mode=key[0])
+                log_event(logger, "request_coalesced", mode=key[0], subscribers=flight.subscribers)
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            return flight, True
+
+    def _leave(self, key: tuple, flight: _Flight) -> int:
+        with self._lock:
+            flight.subscribers -= 1
+            return flight.subscribers
+
+    def _finish(self, key: tuple, flight: _Flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def do(self, key: str, fn: Callable):
+        """
+        Runs ``fn()`` unless an identical call is in flight, then waits for its result.
+
+        Args:
+            key (str): Coalescing key.
+            fn (callable): The execution.
+
+        Returns:
+            The result of the shared execution.
+        """
+        key = ("invoke", key)
+        flight, leader = self._join(key)
+        if leader:
+            try:
+                flight.result = fn()
+            except BaseException as exc:
+                flight.error = exc
+                raise
+            finally:
+                self._finish(key, flight)
+                with flight.cond:
+                    flight.done = True
+                    flight.cond.notify_all()
+            return flight.result
+        with flight.cond:
+            if not flight.cond.wait_for(lambda: flight.done, self.timeout):
+                raise TimeoutError("Timed out waiting for a coalesced request")
+        if flight.error is not None:
+            raise flight.error
+        return self.share(flight.result)
+
+    async def ado(self, key: str, coro_fn: Callable):
+        """
+        Async counterpart of :meth:`do`; ``coro_fn()`` returns the coroutine to run.
+        """
+        key = ("ainvoke", id(asyncio.get_running_loop()), key)
+        flight, leader = self._join(key)
+        if leader:
+            flight.task = asyncio.ensure_future(coro_fn())
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+        try:
+            if leader:
+                return await asyncio.shield(flight.task)
+            result = await asyncio.wait_for(asyncio.shield(flight.task), self.timeout)
+            return self.share(result)
+        finally:
+            if self._leave(key, flight) == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    def stream(self, key: str, gen_fn: Callable):
+        """
+        Iterates the events of ``gen_fn()``, sharing one iteration between identical calls.
+
+        The generator is driven by a background thread that stops early once every
+        subscriber has gone.
+
+        Args:
+            key (str): Coalescing key.
+            gen_fn (callable): Returns the event generator.
+
+        Yields:
+            The events of the shared generator, from the first one.
+        """
+        key = ("stream", key)
+        flight, leader = self._join(key)
+        if leader:
+            threading.Thread(target=self._drive, args=(key, flight, gen_fn), daemon=True).start()
+        share = (lambda event: event) if leader else self.share
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    if not flight.cond.wait_for(lambda: position < len(flight.events) or flight.done, self.timeout):
+                        raise TimeoutError("Timed out waiting for a coalesced stream")
+                    pending = flight.events[position:]
+                    finished = flight.done
+                for event in pending:
+                    yield share(event)
+                position += len(pending)
+                if finished and position == len(flight.events):
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            self._leave(key, flight)
+
+    def _drive(self, key: tuple, flight: _Flight, gen_fn: Callable):
+        generator = gen_fn()
+        try:
+            for event in generator:
+                with flight.cond:
+                    flight.events.append(event)
+                    flight.cond.notify_all()
+                if flight.subscribers == 0:
+                    generator.close()
+                    break
+        except BaseException as exc:
+            flight.error = exc
+        finally:
+            self._finish(key, flight)
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    async def astream(self, key: str, agen_fn: Callable):
+        """
+        Async counterpart of :meth:`stream`; the async generator runs as a task.
+        """
+        key = ("astream", id(asyncio.get_running_loop()), key)
+        flight, leader = self._join(key)
+        if leader:
+            flight.changed = asyncio.Event()
+            flight.task = asyncio.ensure_future(self._adrive(key, flight, agen_fn))
+        share = (lambda event: event) if leader else self.share
+        position = 0
+        try:
+            while True:
+                while position < len(flight.events):
+                    position += 1
+                    yield share(flight.events[position - 1])
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await asyncio.wait_for(flight.changed.wait(), self.timeout)
+        finally:
+            if self._leave(key, flight) == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def _adrive(self, key: tuple, flight: _Flight, agen_fn: Callable):
+        try:
+            async for event in agen_fn():
+                flight.events.append(event)
+                flight.changed.set()
+                flight.changed = asyncio.Event()
+        except asyncio.CancelledError:
+            flight.error = asyncio.CancelledError()
+        except Exception as exc:
+            flight.error = exc
+        finally:
+            self._finish(key, flight)
+            flight.done = True
+            flight.changed.set()
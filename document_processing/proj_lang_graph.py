@@ -5,40 +5,100 @@
 Agentic RAG Flow Implementation
 
 This script implements a Retrieval-Augmented Generation (RAG) workflow using a state graph.
-It retrieves documents from a vector store, grades their relevance, optionally performs web search,
-and generates an answer using an LLM. The workflow is designed to handle contextual queries
-with chat history awareness.
+It reformulates the question against the chat history once, serves near-identical
+questions from a semantic answer cache, retrieves documents from a vector store, grades
+their relevance, optionally performs web search, and generates an answer from the graded
+documents using an LLM. The workflow is designed to handle contextual queries with chat
+history awareness.
 """
 
 # --- Imports ---
 import sys
 import os
-from typing import List
-from typing_extensions import TypedDict
-from langchain_core.output_parsers import StrOutputParser
-from operator import itemgetter
+import time
+import inspect
+import logging
+import operator
+import threading
+from typing import List, Optional
+from typing_extensions import Annotated, TypedDict
 from langchain.docstore.document import Document
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables import RunnablePassthrough, RunnableLambda
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain_core.runnables import RunnableLambda
 
 # Add parent directory to sys.path for module imports
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Custom module imports
 from app_config.open_ai_cred import OPENAI_KEY, TAVILY_API_KEY, WEATHER_API_KEY, MODEL_NAME, EMBED_MODEL
+from app_config.open_ai_cred import GRADING_MODE, GRADING_MAX_CONCURRENCY, RETRIEVAL_MODE
+from app_config.open_ai_cred import RERANKER, RERANKER_MODEL, RERANK_HIGH_THRESHOLD, RERANK_LOW_THRESHOLD
+from app_config.open_ai_cred import (
+    ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES
+)
+from app_config.open_ai_cred import (
+    RELEVANCE_THRESHOLD, MAX_CORRECTIVE_ITERATIONS, REQUEST_LATENCY_BUDGET, REQUEST_TOKEN_BUDGET
+)
+from app_config.open_ai_cred import COALESCE_ENABLED, VECTOR_BACKEND
 from document_processing.doc_indexer import VectorStore
-from document_processing.proj_chains import query_re_writer_agent, context_qa_chain, document_grader_agent
+from document_processing.secondary_retrieval import (
+    get_secondary_retriever, get_bm25_retriever, release_bm25_retriever, BM25_INDEX_FILE
+)
+from document_processing.hybrid_retrieval import HybridRetriever
+from document_processing.reranker import get_reranker
+from document_processing.proj_cache import SemanticAnswerCache
+from document_processing.proj_coalesce import RequestCoalescer, coalesce_key
+from document_processing.proj_metrics import get_logger, log_event, node_span, request_trace, trace_from_config
+from document_processing.proj_chains import (
+    query_re_writer_agent, context_qa_chain, document_grader_agent,
+    question_contextualizer_agent, answer_generator_agent, batch_document_grader_agent,
+    history_summarizer_agent, chat_model
+)
 
 # --- Environment Setup ---
 os.environ['OPENAI_API_KEY'] = OPENAI_KEY
 os.environ['TAVILY_API_KEY'] = TAVILY_API_KEY
 
+logger = get_logger("graph")
+
 # --- Vector Store Initialization ---
+# The Chroma handle and the compact index are opened on first use, not at import time,
+# and reopened when a new index snapshot is served.
 vector_store = VectorStore(MODEL_NAME, EMBED_MODEL)
-chroma_db = vector_store.vectord_db_loader()
+_vector_dbs = {}
+_chroma_lock = threading.Lock()
+
+def get_chroma_db():
+    """
+    Returns the process-wide Chroma handle of the served snapshot, opening it on first use.
+
+    Returns:
+        Chroma: Loaded Chroma vector database.
+    """
+    return get_vector_db("chroma")
+
+def get_vector_db(backend: str = VECTOR_BACKEND):
+    """
+    Returns the process-wide dense index of the served snapshot, which the retrievers search.
+
+    Args:
+        backend (str): 'chroma' for the Chroma collection, 'compact' for its read-only,
+            memory-mapped export.
+
+    Returns:
+        Chroma or CompactVectorStore: The opened index.
+    """
+    if backend not in ("chroma", "compact"):
+        raise ValueError(f"Unknown vector backend: {backend}")
+    directory = vector_store.persist_directory()
+    opened = _vector_dbs.get(backend)
+    if opened is None or opened[0] != directory:
+        with _chroma_lock:
+            opened = _vector_dbs.get(backend)
+            if opened is None or opened[0] != directory:
+                snapshot = VectorStore(vector_store.model_name, vector_store.embed_model_name, directory)
+                vector_db = snapshot.vectord_db_loader() if backend == "chroma" else snapshot.compact_db_loader()
+                opened = _vector_dbs[backend] = (directory, vector_db)
+    return opened[1]
 
 # --- State Definition ---
 class GraphState(TypedDict):
@@ -51,212 +111,1041 @@ class GraphState(TypedDict):
         web_search_needed (str): Flag indicating if web search is required ('Yes' or 'No').
         documents (List[str]): List of retrieved context documents.
         chat_history (List[str]): List of prior chat interactions for context.
+        standalone_question (str): The question after contextualization, before any rewrite.
+        question_embedding (List[float]): Embedding of the standalone question.
+        cache_hit (bool): Whether the answer was served from the semantic answer cache.
+        request_started (float): Wall-clock time the request entered the graph.
+        corrective_iterations (int): Rewrite-and-search passes done so far.
+        decisions (List[dict]): Every corrective routing decision with its inputs, in order.
     """
     question: str
     generation: str
     web_search_needed: str
     documents: List[str]
     chat_history: List[str]
+    standalone_question: str
+    question_embedding: List[float]
+    cache_hit: bool
+    request_started: float
+    corrective_iterations: int
+    decisions: Annotated[List[dict], operator.add]
 
 # --- Helper Functions ---
-def retriever_call():
+def retriever_call(mode: str = RETRIEVAL_MODE):
     """
-    Creates and returns a similarity threshold retriever from the vector store.
+    Creates and returns the primary retriever over the vector store selected by
+    VECTOR_BACKEND.
+
+    Args:
+        mode (str): 'dense' for the similarity threshold retriever, 'hybrid' for
+            dense + BM25 search merged with reciprocal rank fusion.
 
     Returns:
         Retriever: A configured retriever object for document retrieval.
     """
-    similarity_threshold_retriever = chroma_db.as_retriever(
+    if mode == "hybrid":
+        return HybridRetriever(
+            vectorstore=get_vector_db(),
+            keyword_retriever=get_bm25_retriever(vector_store.keyword_index_path()),
+            k=3
+        )
+    if mode != "dense":
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    similarity_threshold_retriever = get_vector_db().as_retriever(
         search_type="similarity_score_threshold",
         search_kwargs={"k": 3, "score_threshold": 0.3}
     )
     return similarity_threshold_retriever
 
-# --- Workflow Nodes ---
-def retrieve(state: GraphState) -> GraphState:
+def normalize_grade(grade) -> str:
     """
-    Retrieves documents from the vector store based on the input question.
+    Normalizes a grader verdict, so 'Yes', ' yes' and 'yes' all count as relevant.
 
     Args:
-        state (GraphState): Current state containing the question and chat history.
+        grade: Verdict returned by a grader, or a reranker decision.
 
     Returns:
-        GraphState: Updated state with retrieved documents.
+        str: 'yes' or 'no'.
     """
-    print("---RETRIEVAL FROM VECTOR DB---")
-    question = state["question"]
-    chat_history = state['chat_history']
-    retriever = retriever_call()
-    documents = retriever.invoke(question)
-    return {
-        "documents": documents,
-        "question": question,
-        "chat_history": chat_history
-    }
+    return "yes" if str(grade).strip().lower() == "yes" else "no"
 
-def grade_documents(state: GraphState) -> GraphState:
+def merge_documents(documents: List[Document], new_documents: List[Document]) -> List[Document]:
     """
-    Grades the relevance of retrieved documents to the question using an LLM grader.
-
-    If any document is irrelevant or no documents are retrieved, sets web_search_needed to 'Yes'.
-    Filters out irrelevant documents.
+    Appends new documents that are not already present, matching on chunk ID or content.
 
     Args:
-        state (GraphState): Current state with question and documents.
+        documents (List[Document]): Documents already in state.
+        new_documents (List[Document]): Documents from another retrieval path.
 
     Returns:
-        GraphState: Updated state with filtered documents and web search flag.
-    """
-    print("---CHECK DOCUMENT RELEVANCE TO QUESTION---")
-    question = state["question"]
-    documents = state["documents"]
-    doc_grader = document_grader_agent()
-    filtered_docs = []
-    web_search_needed = "No"
-
-    if documents:
-        for doc in documents:
-            score = doc_grader.invoke({"question": question, "document": doc.page_content})
-            grade = score.binary_score
-            if grade == "yes":
-                print("---GRADE: DOCUMENT RELEVANT---")
-                filtered_docs.append(doc)
-            else:
-                print("---GRADE: DOCUMENT NOT RELEVANT---")
-                web_search_needed = "Yes"
-    else:
-        print("---NO DOCUMENTS RETRIEVED---")
-        web_search_needed = "Yes"
+        List[Document]: ``documents`` followed by the unseen new documents.
+    """
+    def key(doc):
+        return doc.metadata.get("chunk_id") or doc.page_content.strip()
 
-    return {
-        "documents": filtered_docs,
-        "question": question,
-        "web_search_needed": web_search_needed,
-        "chat_history": state['chat_history']
-    }
+    seen = {key(doc) for doc in documents}
+    merged = list(documents)
+    for doc in new_documents:
+        if key(doc) not in seen:
+            seen.add(key(doc))
+            merged.append(doc)
+    return merged
 
-def rewrite_query(state: GraphState) -> GraphState:
+def record_decision(config: Optional[dict], decision: str, outcome: str):
     """
-    Rewrites the input question to improve its clarity or relevance using an LLM agent.
+    Records a routing decision in the request's trace and logs it.
 
     Args:
-        state (GraphState): Current state with the original question.
+        config (dict, optional): Run config of the edge function, carrying the trace.
+        decision (str): Name of the decision function.
+        outcome (str): Branch taken.
+    """
+    trace = trace_from_config(config)
+    if trace is not None:
+        trace.record_decision(decision, outcome)
+    log_event(logger, "decision", logging.DEBUG, decision=decision, outcome=outcome)
+
+def count_documents(config: Optional[dict], node: str, state: GraphState, update: GraphState):
+    """
+    Records how many documents a node retrieved or kept in the request's trace.
+
+    Args:
+        config (dict, optional): Run config of the node, carrying the trace.
+        node (str): Node name.
+        state (GraphState): State the node received.
+        update (GraphState): State update the node returned.
+    """
+    trace = trace_from_config(config)
+    documents = (update or {}).get("documents")
+    if trace is None or documents is None:
+        return
+    if node == "retrieve":
+        trace.record_documents(retrieved=len(documents))
+    elif node == "web_search":
+        trace.record_documents(retrieved=len(documents) - len(state.get("documents") or []))
+    elif node == "grade_documents":
+        trace.record_documents(kept=len(documents))
+
+# --- Workflow Nodes ---
+def decide_to_generate(state: GraphState, config: Optional[dict] = None) -> str:
+    """
+    Routes graded documents to generation or to another corrective pass.
+
+    The decision itself is taken by the grading node (see
+    ``AgenticRAGEngine.corrective_decision``) and recorded in ``state["decisions"]``.
+
+    Args:
+        state (GraphState): Current state with the latest decision.
+        config (dict, optional): Run config carrying the request trace.
 
     Returns:
-        GraphState: Updated state with a rewritten question.
+        str: Next node to execute ('rewrite_query' or 'generate_answer').
     """
-    print("---REWRITE QUERY---")
-    question = state["question"]
-    documents = state["documents"]
-    question_rewriter = query_re_writer_agent()
-    better_question = question_rewriter.invoke({"question": question})
-    return {
-        "documents": documents,
-        "question": better_question,
-        "chat_history": state['chat_history']
-    }
+    decision = state["decisions"][-1]["outcome"]
+    record_decision(config, "decide_to_generate", decision)
+    return decision
+
 
-def web_search(state: GraphState) -> GraphState:
+def decide_after_search(state: GraphState, config: Optional[dict] = None) -> str:
     """
-    Performs a web search using the rewritten question and appends results to documents.
+    Routes search results back to grading while corrective passes and budget remain.
 
     Args:
-        state (GraphState): Current state with question and existing documents.
+        state (GraphState): Current state with the latest decision.
+        config (dict, optional): Run config carrying the request trace.
 
     Returns:
-        GraphState: Updated state with web search results added to documents.
-    """
-    print("---WEB SEARCH---")
-    question = state["question"]
-    documents = state["documents"]
-    final_retriever = retriever_call()
-    docs = final_retriever.invoke(question)
-    web_results = "\n\n".join([d.page_content for d in docs])
-    web_results_doc = Document(page_content=web_results)
-    documents.append(web_results_doc)
-    return {
-        "documents": documents,
-        "question": question,
-        "chat_history": state['chat_history']
-    }
-
-def generate_answer(state: GraphState) -> GraphState:
-    """
-    Generates an answer from the context documents using an LLM-based RAG chain.
+        str: Next node to execute ('grade_documents' or 'generate_answer').
+    """
+    decision = state["decisions"][-1]["outcome"]
+    record_decision(config, "decide_after_search", decision)
+    return decision
+
+
+def decide_cache_hit(state: GraphState, config: Optional[dict] = None) -> str:
+    """
+    Ends the graph early when the answer cache already holds an answer.
 
     Args:
-        state (GraphState): Current state with question and documents.
+        state (GraphState): Current state with the cache_hit flag.
+        config (dict, optional): Run config carrying the request trace.
 
     Returns:
-        GraphState: Updated state with the generated answer.
-    """
-    print("---GENERATE ANSWER---")
-    question = state["question"]
-    documents = state["documents"]
-    chatgpt = ChatOpenAI(model_name=MODEL_NAME, temperature=0)
-    final_retriever = retriever_call()
-    rag_chain = context_qa_chain(chatgpt, final_retriever)
-    generation = rag_chain.invoke({"input": question, "chat_history": state['chat_history']})
-    return {
-        "documents": documents,
-        "question": question,
-        "generation": generation["answer"],
-        "chat_history": state['chat_history']
-    }
-
-def decide_to_generate(state: GraphState) -> str:
-    """
-    Decides whether to generate an answer or rewrite the query based on document relevance.
+        str: 'hit' or 'miss'.
+    """
+    decision = "hit" if state.get("cache_hit") else "miss"
+    record_decision(config, "decide_cache_hit", decision)
+    return decision
+
+
+class AgenticRAGEngine:
+    """
+    Long-lived owner of the compiled agentic RAG graph and every client its nodes use.
+
+    The chat model, the structured-output grader, the query rewriter, the QA chain,
+    the retriever and the compiled StateGraph are built once in the constructor.
+    None of them hold per-request state, so a single engine can serve many
+    concurrent ``invoke`` calls from threads or ``ainvoke`` calls from one event loop.
+    """
+
+    def __init__(self, llm=None, retriever=None, grading_mode: str = GRADING_MODE,
+                 grading_max_concurrency: int = GRADING_MAX_CONCURRENCY,
+                 embeddings=None, answer_cache=None, secondary_retriever=None, reranker=None,
+                 relevance_threshold: float = RELEVANCE_THRESHOLD,
+                 max_corrective_iterations: int = MAX_CORRECTIVE_ITERATIONS,
+                 latency_budget: float = REQUEST_LATENCY_BUDGET,
+                 token_budget: int = REQUEST_TOKEN_BUDGET,
+                 coalescer=None):
+        """
+        Builds the shared clients and compiles the graph.
+
+        Args:
+            llm (ChatOpenAI, optional): Chat model shared by all agents. Defaults to
+                ``chat_model()``, which sits behind the shared LLM response cache.
+            retriever (optional): Retriever shared by all nodes. Defaults to ``retriever_call()``,
+                which is rebuilt whenever a new index snapshot is served.
+            grading_mode (str): 'batch', 'single_call', 'sequential' or 'rerank'.
+            grading_max_concurrency (int): Upper bound on concurrent grader calls in 'batch' mode.
+            embeddings (Embeddings, optional): Embeds questions for the answer cache.
+                Defaults to the vector store's cached embedding model.
+            answer_cache (SemanticAnswerCache, optional): Answer cache. Defaults to one
+                built from the ANSWER_CACHE_* settings, or none if it is disabled. Pass
+                ``False`` to run without a cache regardless of the settings.
+            secondary_retriever (SecondaryRetriever, optional): Backend of the corrective
+                search branch. Defaults to the one selected by SECONDARY_RETRIEVER.
+            reranker (Reranker, optional): Scorer for the 'rerank' grading mode. Defaults
+                to the one selected by RERANKER.
+            relevance_threshold (float): Share of graded documents that must be relevant
+                to generate without a corrective pass.
+            max_corrective_iterations (int): Maximum rewrite-and-search passes per request.
+            latency_budget (float): Seconds per request after which no further corrective
+                pass starts; 0 for no limit.
+            token_budget (int): LLM tokens per request after which no further corrective
+                pass starts; 0 for no limit.
+            coalescer (RequestCoalescer, optional): Shares the run of identical concurrent
+                questions. Defaults to one built from the COALESCE_* settings, or none if
+                coalescing is disabled. Pass ``False`` to run every request on its own.
+        """
+        if grading_mode not in ("batch", "single_call", "sequential", "rerank"):
+            raise ValueError(f"Unknown grading mode: {grading_mode}")
+        self.grading_mode = grading_mode
+        self.grading_max_concurrency = grading_max_concurrency
+        self.llm = llm or chat_model(stream_usage=True)
+        self._default_retrievers = (retriever is None, secondary_retriever is None)
+        self._index_version = vector_store.index_version()
+        self._index_directory = vector_store.persist_directory()
+        self._index_lock = threading.Lock()
+        self.retriever = retriever or retriever_call()
+        self.doc_grader = document_grader_agent(self.llm)
+        self.batch_doc_grader = batch_document_grader_agent(self.llm)
+        self.question_rewriter = query_re_writer_agent(self.llm)
+        self.question_contextualizer = question_contextualizer_agent(self.llm)
+        self.answer_generator = answer_generator_agent(self.llm)
+        self.history_summarizer = history_summarizer_agent(self.llm)
+        self.rag_chain = context_qa_chain(self.llm, self.retriever)
+        self.embeddings = embeddings or vector_store.embedding_model()
+        if answer_cache is None and ANSWER_CACHE_ENABLED:
+            answer_cache = SemanticAnswerCache(
+                ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES,
+                version_fn=vector_store.index_version
+            )
+        self.answer_cache = None if answer_cache is False else answer_cache
+        self.secondary_retriever = secondary_retriever or get_secondary_retriever(self._index_directory)
+        if reranker is None and grading_mode == "rerank":
+            reranker = get_reranker(RERANKER, self.embeddings, RERANKER_MODEL)
+        self.reranker = reranker
+        self.relevance_threshold = relevance_threshold
+        self.max_corrective_iterations = max_corrective_iterations
+        self.latency_budget = latency_budget
+        self.token_budget = token_budget
+        if coalescer is None and COALESCE_ENABLED:
+            coalescer = RequestCoalescer(share=mark_coalesced)
+        self.coalescer = None if coalescer is False else coalescer
+        self.graph = self._build_graph()
+
+    def refresh_index(self) -> bool:
+        """
+        Switches the default retrievers to the served index snapshot if it changed.
+
+        A change is a new served snapshot directory (an activation or a rollback) or a
+        new version token in the same directory. Called at the start of every request,
+        so a snapshot activated by ingestion is picked up without a restart. Nodes read the retrievers from the engine when they
+        run, so a request already running uses the new snapshot from its next retrieval
+        on; a retrieval in progress completes on the old one, which stays on disk as a
+        rollback version. Answer caches see the same version change and drop their entries.
+
+        Returns:
+            bool: Whether the engine switched to a new snapshot.
+        """
+        directory = vector_store.persist_directory()
+        version = vector_store.index_version()
+        if (directory, version) == (self._index_directory, self._index_version):
+            return False
+        with self._index_lock:
+            if (directory, version) == (self._index_directory, self._index_version):
+                return False
+            previous_directory = self._index_directory
+            self._index_directory = directory
+            default_retriever, default_secondary = self._default_retrievers
+            if default_retriever:
+                self.retriever = retriever_call()
+                self.rag_chain = context_qa_chain(self.llm, self.retriever)
+            if default_secondary:
+                self.secondary_retriever = get_secondary_retriever(self._index_directory)
+            if previous_directory != self._index_directory:
+                release_bm25_retriever(os.path.join(previous_directory, BM25_INDEX_FILE))
+            log_event(logger, "index_swapped", previous=self._index_version, version=version)
+            self._index_version = version
+        return True
+
+    def contextualize_question(self, state: GraphState) -> GraphState:
+        """
+        Reformulates a follow-up question into a standalone question using the chat history.
+
+        This is the only history-aware LLM call in the graph; every later node works
+        on the standalone question. Without history the question is kept as is.
+
+        Args:
+            state (GraphState): Current state containing the question and chat history.
+
+        Returns:
+            GraphState: Updated state with the standalone question.
+        """
+        request_started = state.get("request_started") or time.time()
+        question = state["question"]
+        chat_history = state['chat_history']
+        if chat_history:
+            question = self.question_contextualizer.invoke(
+                {"input": question, "chat_history": chat_history}
+            )
+        return {
+            "question": question,
+            "standalone_question": question,
+            "chat_history": chat_history,
+            "request_started": request_started,
+            "corrective_iterations": 0
+        }
+
+    async def acontextualize_question(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`contextualize_question`."""
+        request_started = state.get("request_started") or time.time()
+        question = state["question"]
+        chat_history = state['chat_history']
+        if chat_history:
+            question = await self.question_contextualizer.ainvoke(
+                {"input": question, "chat_history": chat_history}
+            )
+        return {
+            "question": question,
+            "standalone_question": question,
+            "chat_history": chat_history,
+            "request_started": request_started,
+            "corrective_iterations": 0
+        }
+
+    def _cache_lookup(self, embedding: List[float]) -> GraphState:
+        """
+        Looks the standalone question's embedding up in the answer cache.
+
+        Args:
+            embedding (List[float]): Embedding of the standalone question.
+
+        Returns:
+            GraphState: State update with the cached answer on a hit.
+        """
+        hit = self.answer_cache.lookup(embedding)
+        if hit is None:
+            return {"question_embedding": embedding, "cache_hit": False}
+        log_event(logger, "answer_cache_hit", logging.DEBUG, similarity=round(hit["similarity"], 4))
+        return {
+            "question_embedding": embedding,
+            "cache_hit": True,
+            "generation": hit["generation"],
+            "documents": hit["documents"]
+        }
+
+    def check_cache(self, state: GraphState) -> GraphState:
+        """
+        Serves the answer of a near-identical earlier question from the semantic answer cache.
+
+        Args:
+            state (GraphState): Current state with the standalone question.
+
+        Returns:
+            GraphState: Updated state with the question embedding and, on a hit, the cached
+            generation and documents.
+        """
+        if self.answer_cache is None:
+            return {"cache_hit": False}
+        return self._cache_lookup(self.embeddings.embed_query(state["question"]))
+
+    async def acheck_cache(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`check_cache`."""
+        if self.answer_cache is None:
+            return {"cache_hit": False}
+        return self._cache_lookup(await self.embeddings.aembed_query(state["question"]))
+
+    def cache_answer(self, state: GraphState) -> GraphState:
+        """
+        Stores the generated answer under the standalone question's embedding.
+
+        Args:
+            state (GraphState): Final state with the generation and documents.
+
+        Returns:
+            GraphState: Unchanged cache flag.
+        """
+        if self.answer_cache is not None and state.get("question_embedding"):
+            self.answer_cache.store(
+                state["question_embedding"], state["standalone_question"],
+                state["generation"], state["documents"]
+            )
+        return {"cache_hit": False}
+
+    async def acache_answer(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`cache_answer`."""
+        return self.cache_answer(state)
+
+    def retrieve(self, state: GraphState) -> GraphState:
+        """
+        Retrieves documents from the vector store based on the input question.
+
+        Args:
+            state (GraphState): Current state containing the question and chat history.
+
+        Returns:
+            GraphState: Updated state with retrieved documents.
+        """
+        question = state["question"]
+        chat_history = state['chat_history']
+        documents = self.retriever.invoke(question)
+        return {
+            "documents": documents,
+            "question": question,
+            "chat_history": chat_history
+        }
+
+    async def aretrieve(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`retrieve`."""
+        question = state["question"]
+        chat_history = state['chat_history']
+        documents = await self.retriever.ainvoke(question)
+        return {
+            "documents": documents,
+            "question": question,
+            "chat_history": chat_history
+        }
+
+    def _grader_inputs(self, question: str, documents: List[Document]) -> dict:
+        """Builds the single-call grader input listing every document with its position."""
+        numbered_docs = "\n\n".join(
+            f"Document {i}:\n{doc.page_content}" for i, doc in enumerate(documents, 1)
+        )
+        return {"question": question, "documents": numbered_docs, "count": len(documents)}
+
+    def _grades_from_scores(self, scores: List[float]):
+        """
+        Turns reranker scores into grades, leaving borderline scores undecided.
+
+        Args:
+            scores (List[float]): One score per document.
+
+        Returns:
+            tuple: ``(grades, borderline)`` where undecided grades are None and
+            ``borderline`` lists their positions.
+        """
+        grades, borderline = [], []
+        for i, score in enumerate(scores):
+            if score >= RERANK_HIGH_THRESHOLD:
+                grades.append("yes")
+            elif score < RERANK_LOW_THRESHOLD:
+                grades.append("no")
+            else:
+                grades.append(None)
+                borderline.append(i)
+        if borderline:
+            log_event(logger, "grade_borderline", logging.DEBUG, documents=len(borderline))
+        return grades, borderline
+
+    def _grade(self, question: str, documents: List[Document], mode: str = None) -> List[str]:
+        """
+        Grades all documents against the question according to ``grading_mode``.
+
+        'batch' runs the per-document grader concurrently, bounded by
+        ``grading_max_concurrency``; 'single_call' asks for every verdict in one
+        structured call and falls back to 'batch' if the number of verdicts does not
+        match; 'sequential' grades one document after another; 'rerank' scores all
+        documents locally and sends only borderline ones to a single LLM call.
+
+        Args:
+            question (str): The question to grade against.
+            documents (List[Document]): Retrieved documents.
+            mode (str, optional): Overrides ``grading_mode``.
+
+        Returns:
+            List[str]: One 'yes'/'no' grade per document, in input order.
+        """
+        mode = mode or self.grading_mode
+        if mode == "rerank":
+            grades, borderline = self._grades_from_scores(self.reranker.score(question, documents))
+            if borderline:
+                llm_grades = self._grade(question, [documents[i] for i in borderline], "single_call")
+                for i, grade in zip(borderline, llm_grades):
+                    grades[i] = grade
+            return grades
+
+        if mode == "single_call":
+            verdict = self.batch_doc_grader.invoke(self._grader_inputs(question, documents))
+            if len(verdict.binary_scores) == len(documents):
+                return [normalize_grade(grade) for grade in verdict.binary_scores]
+            log_event(logger, "grade_verdict_mismatch", logging.WARNING,
+                      documents=len(documents), verdicts=len(verdict.binary_scores))
+
+        inputs = [{"question": question, "document": doc.page_content} for doc in documents]
+        if mode == "sequential":
+            scores = [self.doc_grader.invoke(grader_input) for grader_input in inputs]
+        else:
+            scores = self.doc_grader.batch(
+                inputs, config={"max_concurrency": self.grading_max_concurrency}
+            )
+        return [normalize_grade(score.binary_score) for score in scores]
+
+    async def _agrade(self, question: str, documents: List[Document], mode: str = None) -> List[str]:
+        """Async counterpart of :meth:`_grade`."""
+        mode = mode or self.grading_mode
+        if mode == "rerank":
+            grades, borderline = self._grades_from_scores(await self.reranker.ascore(question, documents))
+            if borderline:
+                llm_grades = await self._agrade(question, [documents[i] for i in borderline], "single_call")
+                for i, grade in zip(borderline, llm_grades):
+                    grades[i] = grade
+            return grades
+
+        if mode == "single_call":
+            verdict = await self.batch_doc_grader.ainvoke(self._grader_inputs(question, documents))
+            if len(verdict.binary_scores) == len(documents):
+                return [normalize_grade(grade) for grade in verdict.binary_scores]
+            log_event(logger, "grade_verdict_mismatch", logging.WARNING,
+                      documents=len(documents), verdicts=len(verdict.binary_scores))
+
+        inputs = [{"question": question, "document": doc.page_content} for doc in documents]
+        if mode == "sequential":
+            scores = [await self.doc_grader.ainvoke(grader_input) for grader_input in inputs]
+        else:
+            scores = await self.doc_grader.abatch(
+                inputs, config={"max_concurrency": self.grading_max_concurrency}
+            )
+        return [normalize_grade(score.binary_score) for score in scores]
+
+    @staticmethod
+    def _ungraded(documents: List[Document]) -> List[Document]:
+        """Documents not yet judged relevant by an earlier grading pass of this request."""
+        return [doc for doc in documents if doc.metadata.get("relevance") != "yes"]
+
+    def corrective_decision(self, state: GraphState, config: Optional[dict], stage: str,
+                            graded: int = 0, relevant: int = 0) -> dict:
+        """
+        Decides whether the request gets another corrective pass.
+
+        After grading ('grade' stage), the answer is generated once the relevant share
+        of the graded documents reaches ``relevance_threshold``. After a search
+        ('search' stage), the new results are graded again only while passes remain.
+        Either way, the request goes straight to generation with the context it has once
+        ``max_corrective_iterations`` passes were made or the latency or token budget
+        is spent.
+
+        Args:
+            state (GraphState): Current state.
+            config (dict, optional): Run config carrying the request trace and its token count.
+            stage (str): 'grade' or 'search'.
+            graded (int): Documents in the grading pass.
+            relevant (int): Of those, documents graded relevant.
+
+        Returns:
+            dict: The decision with its inputs; ``outcome`` is the next node.
+        """
+        iterations = state.get("corrective_iterations") or 0
+        elapsed = time.time() - (state.get("request_started") or time.time())
+        trace = trace_from_config(config)
+        tokens = trace.prompt_tokens + trace.completion_tokens if trace is not None else 0
+        ratio = relevant / graded if graded else 0.0
+
+        if stage == "grade" and graded and ratio >= self.relevance_threshold:
+            outcome, reason = "generate_answer", "relevant"
+        elif iterations >= self.max_corrective_iterations:
+            outcome, reason = "generate_answer", "max_iterations"
+        elif self.latency_budget and elapsed >= self.latency_budget:
+            outcome, reason = "generate_answer", "latency_budget"
+        elif self.token_budget and tokens >= self.token_budget:
+            outcome, reason = "generate_answer", "token_budget"
+        elif stage == "grade":
+            outcome, reason = "rewrite_query", "low_relevance" if graded else "no_documents"
+        else:
+            outcome, reason = "grade_documents", "grade_search_results"
+
+        decision = {
+            "stage": stage, "iteration": iterations, "graded": graded, "relevant": relevant,
+            "ratio": round(ratio, 4), "elapsed_s": round(elapsed, 4), "tokens": tokens,
+            "outcome": outcome, "reason": reason,
+        }
+        log_event(logger, "corrective_decision", logging.DEBUG, **decision)
+        return decision
+
+    def _apply_grades(self, state: GraphState, config: Optional[dict], grades: List[str]) -> GraphState:
+        """
+        Keeps the relevant documents and records the corrective decision.
+
+        Documents kept by an earlier pass are not graded again; the others are replaced
+        by copies carrying their grade in ``metadata["relevance"]``, leaving the
+        retrieved objects untouched.
+
+        Args:
+            state (GraphState): Current state with question and documents.
+            config (dict, optional): Run config carrying the request trace.
+            grades (List[str]): One grade per document returned by :meth:`_ungraded`.
+
+        Returns:
+            GraphState: Updated state with filtered documents, web search flag and decision.
+        """
+        filtered_docs = []
+        web_search_needed = "No"
+        grades = iter(grades)
+
+        for doc in state["documents"]:
+            if doc.metadata.get("relevance") != "yes":
+                # Retrieved documents may be shared with caches, so the grade goes on a copy
+                doc = Document(page_content=doc.page_content, metadata=dict(doc.metadata, relevance=next(grades)))
+                log_event(logger, "document_graded", logging.DEBUG,
+                          chunk_id=doc.metadata.get("chunk_id"), relevant=doc.metadata["relevance"] == "yes")
+            if doc.metadata["relevance"] == "yes":
+                filtered_docs.append(doc)
+            else:
+                web_search_needed = "Yes"
+        if not state["documents"]:
+            web_search_needed = "Yes"
+
+        decision = self.corrective_decision(
+            state, config, "grade", graded=len(state["documents"]), relevant=len(filtered_docs)
+        )
+        return {
+            "documents": filtered_docs,
+            "question": state["question"],
+            "web_search_needed": web_search_needed,
+            "chat_history": state['chat_history'],
+            "decisions": [decision]
+        }
+
+    def grade_documents(self, state: GraphState, config: Optional[dict] = None) -> GraphState:
+        """
+        Grades the relevance of retrieved documents to the question using an LLM grader.
+
+        If any document is irrelevant or no documents are retrieved, sets web_search_needed to 'Yes'.
+        Filters out irrelevant documents, keeping the retrieval order, and decides
+        whether a corrective pass follows.
+
+        Args:
+            state (GraphState): Current state with question and documents.
+            config (dict, optional): Run config carrying the request trace.
+
+        Returns:
+            GraphState: Updated state with filtered documents, web search flag and decision.
+        """
+        pending = self._ungraded(state["documents"])
+        grades = self._grade(state["question"], pending) if pending else []
+        return self._apply_grades(state, config, grades)
+
+    async def agrade_documents(self, state: GraphState, config: Optional[dict] = None) -> GraphState:
+        """Async counterpart of :meth:`grade_documents`."""
+        pending = self._ungraded(state["documents"])
+        grades = await self._agrade(state["question"], pending) if pending else []
+        return self._apply_grades(state, config, grades)
+
+    def rewrite_query(self, state: GraphState) -> GraphState:
+        """
+        Rewrites the input question to improve its clarity or relevance using an LLM agent.
+
+        Args:
+            state (GraphState): Current state with the original question.
+
+        Returns:
+            GraphState: Updated state with a rewritten question.
+        """
+        question = state["question"]
+        documents = state["documents"]
+        better_question = self.question_rewriter.invoke({"question": question})
+        return {
+            "documents": documents,
+            "question": better_question,
+            "chat_history": state['chat_history']
+        }
+
+    async def arewrite_query(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`rewrite_query`."""
+        question = state["question"]
+        documents = state["documents"]
+        better_question = await self.question_rewriter.ainvoke({"question": question})
+        return {
+            "documents": documents,
+            "question": better_question,
+            "chat_history": state['chat_history']
+        }
+
+    def web_search(self, state: GraphState, config: Optional[dict] = None) -> GraphState:
+        """
+        Searches the secondary retriever with the rewritten question and adds the results.
+
+        Results stay separate documents with their retrieval metadata; those already in
+        state are dropped. Completes one corrective pass and decides whether the results
+        are graded again.
+
+        Args:
+            state (GraphState): Current state with question and existing documents.
+            config (dict, optional): Run config carrying the request trace.
+
+        Returns:
+            GraphState: Updated state with web search results added to documents.
+        """
+        docs = self.secondary_retriever.search(state["question"])
+        return self._search_update(state, config, docs)
+
+    async def aweb_search(self, state: GraphState, config: Optional[dict] = None) -> GraphState:
+        """Async counterpart of :meth:`web_search`."""
+        docs = await self.secondary_retriever.asearch(state["question"])
+        return self._search_update(state, config, docs)
+
+    def _search_update(self, state: GraphState, config: Optional[dict], docs: List[Document]) -> GraphState:
+        """Merges search results into state and records the post-search decision."""
+        iterations = (state.get("corrective_iterations") or 0) + 1
+        decision = self.corrective_decision(dict(state, corrective_iterations=iterations), config, "search")
+        return {
+            "documents": merge_documents(state["documents"], docs),
+            "question": state["question"],
+            "chat_history": state['chat_history'],
+            "corrective_iterations": iterations,
+            "decisions": [decision]
+        }
+
+    def generate_answer(self, state: GraphState) -> GraphState:
+        """
+        Generates an answer from the graded documents already held in the graph state.
+
+        Args:
+            state (GraphState): Current state with question and documents.
+
+        Returns:
+            GraphState: Updated state with the generated answer.
+        """
+        question = state["question"]
+        documents = state["documents"]
+        generation = self.answer_generator.invoke({
+            "context": documents,
+            "input": question,
+            "chat_history": state['chat_history']
+        })
+        return {
+            "documents": documents,
+            "question": question,
+            "generation": generation,
+            "chat_history": state['chat_history']
+        }
+
+    async def agenerate_answer(self, state: GraphState) -> GraphState:
+        """Async counterpart of :meth:`generate_answer`."""
+        question = state["question"]
+        documents = state["documents"]
+        generation = await self.answer_generator.ainvoke({
+            "context": documents,
+            "input": question,
+            "chat_history": state['chat_history']
+        })
+        return {
+            "documents": documents,
+            "question": question,
+            "generation": generation,
+            "chat_history": state['chat_history']
+        }
+
+    @staticmethod
+    def _traced_node(name: str, func, afunc) -> RunnableLambda:
+        """
+        Wraps a node so its wall time and document counts land in the request trace.
+
+        Args:
+            name (str): Node name.
+            func: Sync implementation.
+            afunc: Async implementation.
+
+        Returns:
+            RunnableLambda: The node runnable serving both ``invoke`` and ``ainvoke``.
+        """
+        pass_config = "config" in inspect.signature(func).parameters
+
+        def run(state: GraphState, config: dict) -> GraphState:
+            with node_span(trace_from_config(config), name):
+                update = func(state, config) if pass_config else func(state)
+            count_documents(config, name, state, update)
+            return update
+
+        async def arun(state: GraphState, config: dict) -> GraphState:
+            with node_span(trace_from_config(config), name):
+                update = await (afunc(state, config) if pass_config else afunc(state))
+            count_documents(config, name, state, update)
+            return update
+
+        return RunnableLambda(run, afunc=arun, name=name)
+
+    def _build_graph(self):
+        """
+        Constructs and compiles the agentic RAG workflow as a state graph.
+
+        Each node is registered with both its sync and async implementation, so the
+        same compiled graph serves ``invoke`` and ``ainvoke``.
+
+        Returns:
+            Compiled StateGraph: The configured RAG workflow.
+        """
+        from langgraph.graph import END, StateGraph
+
+        # Initialize the state graph
+        agentic_rag = StateGraph(GraphState)
+
+        # Add nodes to the graph
+        nodes = {
+            "contextualize_question": (self.contextualize_question, self.acontextualize_question),
+            "check_cache": (self.check_cache, self.acheck_cache),
+            "retrieve": (self.retrieve, self.aretrieve),
+            "grade_documents": (self.grade_documents, self.agrade_documents),
+            "rewrite_query": (self.rewrite_query, self.arewrite_query),
+            "web_search": (self.web_search, self.aweb_search),
+            "generate_answer": (self.generate_answer, self.agenerate_answer),
+            "cache_answer": (self.cache_answer, self.acache_answer),
+        }
+        for name, (func, afunc) in nodes.items():
+            agentic_rag.add_node(name, self._traced_node(name, func, afunc))
+
+        # Define the workflow edges
+        agentic_rag.set_entry_point("contextualize_question")
+        agentic_rag.add_edge("contextualize_question", "check_cache")
+        agentic_rag.add_conditional_edges(
+            "check_cache",
+            decide_cache_hit,
+            {"hit": END, "miss": "retrieve"}
+        )
+        agentic_rag.add_edge("retrieve", "grade_documents")
+        agentic_rag.add_conditional_edges(
+            "grade_documents",
+            decide_to_generate,
+            {"rewrite_query": "rewrite_query", "generate_answer": "generate_answer"}
+        )
+        agentic_rag.add_edge("rewrite_query", "web_search")
+        agentic_rag.add_conditional_edges(
+            "web_search",
+            decide_after_search,
+            {"grade_documents": "grade_documents", "generate_answer": "generate_answer"}
+        )
+        agentic_rag.add_edge("generate_answer", "cache_answer")
+        agentic_rag.add_edge("cache_answer", END)
+
+        # Compile the graph
+        return agentic_rag.compile()
+
+    def invoke(self, inputs: dict) -> GraphState:
+        """
+        Runs one question through the compiled graph. Safe to call concurrently; an
+        identical question already in flight is joined instead of run again.
+
+        Args:
+            inputs (dict): Initial graph state, at least ``question`` and ``chat_history``.
+
+        Returns:
+            GraphState: Final graph state, plus the request's ``trace`` as a dict.
+        """
+        self.refresh_index()
+        if self.coalescer is None:
+            return self._invoke(inputs)
+        return self.coalescer.do(coalesce_key(inputs), lambda: self._invoke(inputs))
+
+    def _invoke(self, inputs: dict) -> GraphState:
+        with request_trace() as trace:
+            state = self.graph.invoke(inputs, config=trace.config())
+        return dict(state, trace=trace.to_dict())
+
+    async def ainvoke(self, inputs: dict) -> GraphState:
+        """
+        Runs one question through the compiled graph without blocking the event loop.
+
+        Args:
+            inputs (dict): Initial graph state, at least ``question`` and ``chat_history``.
+
+        Returns:
+            GraphState: Final graph state, plus the request's ``trace`` as a dict.
+        """
+        self.refresh_index()
+        if self.coalescer is None:
+            return await self._ainvoke(inputs)
+        return await self.coalescer.ado(coalesce_key(inputs), lambda: self._ainvoke(inputs))
+
+    async def _ainvoke(self, inputs: dict) -> GraphState:
+        with request_trace() as trace:
+            state = await self.graph.ainvoke(inputs, config=trace.config())
+        return dict(state, trace=trace.to_dict())
+
+    def _stream_event(self, mode: str, chunk, final_state: dict):
+        """
+        Translates one LangGraph stream chunk into a UI event, folding node updates into ``final_state``.
+
+        Args:
+            mode (str): Stream mode the chunk came from ('updates' or 'messages').
+            chunk: The chunk emitted by LangGraph for that mode.
+            final_state (dict): Running graph state, updated in place.
+
+        Returns:
+            dict or None: A 'progress' or 'token' event, or None if the chunk is not surfaced.
+        """
+        if mode == "updates":
+            node = None
+            for node, update in chunk.items():
+                for key, value in (update or {}).items():
+                    # 'decisions' is an append-only channel; updates carry only new entries
+                    final_state[key] = final_state.get(key, []) + value if key == "decisions" else value
+            return {"type": "progress", "node": node} if node else None
+        elif mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "generate_answer" and message.content:
+                return {"type": "token", "content": message.content}
+        return None
+
+    def stream(self, inputs: dict):
+        """
+        Runs one question through the graph, yielding events as they happen.
+
+        Yields ``{"type": "progress", "node": ...}`` when a node finishes,
+        ``{"type": "token", "content": ...}`` for every generated answer token and
+        finally ``{"type": "final", "state": ...}`` with the final graph state, which
+        includes the request's ``trace``. A request joining an identical one in flight
+        receives that request's events from the start.
+
+        Args:
+            inputs (dict): Initial graph state, at least ``question`` and ``chat_history``.
+        """
+        self.refresh_index()
+        if self.coalescer is None:
+            return self._stream(inputs)
+        return self.coalescer.stream(coalesce_key(inputs), lambda: self._stream(inputs))
+
+    def _stream(self, inputs: dict):
+        final_state = dict(inputs)
+        with request_trace() as trace:
+            for mode, chunk in self.graph.stream(inputs, config=trace.config(), stream_mode=["updates", "messages"]):
+                event = self._stream_event(mode, chunk, final_state)
+                if event:
+                    yield event
+        final_state["trace"] = trace.to_dict()
+        yield {"type": "final", "state": final_state}
+
+    def astream(self, inputs: dict):
+        """
+        Async counterpart of :meth:`stream`.
+
+        Args:
+            inputs (dict): Initial graph state, at least ``question`` and ``chat_history``.
+        """
+        self.refresh_index()
+        if self.coalescer is None:
+            return self._astream(inputs)
+        return self.coalescer.astream(coalesce_key(inputs), lambda: self._astream(inputs))
+
+    async def _astream(self, inputs: dict):
+        final_state = dict(inputs)
+        with request_trace() as trace:
+            async for mode, chunk in self.graph.astream(inputs, config=trace.config(), stream_mode=["updates", "messages"]):
+                event = self._stream_event(mode, chunk, final_state)
+                if event:
+                    yield event
+        final_state["trace"] = trace.to_dict()
+        yield {"type": "final", "state": final_state}
+
+
+def mark_coalesced(value: dict) -> dict:
+    """
+    Copies a final state, or a stream event carrying one, handed to a coalesced request
+    and flags its trace, so each request owns its state and shared runs are counted once.
+    """
+    if value.get("type") == "final":
+        return dict(value, state=mark_coalesced(value["state"]))
+    if "trace" in value:
+        return dict(value, trace=dict(value["trace"], coalesced=True))
+    return value
+
+
+# --- Engine Access ---
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_engine() -> AgenticRAGEngine:
+    """
+    Returns the process-wide engine, building it on first use.
+
+    Returns:
+        AgenticRAGEngine: The shared engine.
+    """
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AgenticRAGEngine()
+    return _engine
+
+def set_engine(engine: AgenticRAGEngine):
+    """
+    Installs an engine built elsewhere as the process-wide engine.
+
+    Lets servers and benchmarks run the shared entry points against an engine
+    configured with their own models, retrievers or caches.
 
     Args:
-        state (GraphState): Current state with web_search_needed flag.
+        engine (AgenticRAGEngine): The engine to serve.
+    """
+    global _engine
+    with _engine_lock:
+        _engine = engine
+
+def warm_up(sample_question: str = None) -> AgenticRAGEngine:
+    """
+    Builds everything a server needs before taking traffic.
+
+    Compiles the graph, opens the vector index (the Chroma collection or its compact
+    export, see VECTOR_BACKEND) and loads the keyword index. With a sample question,
+    one retrieval is also run so the embedding client and the vector index are
+    exercised end to end.
+
+    Args:
+        sample_question (str, optional): Question to retrieve for.
 
     Returns:
-        str: Next node to execute ('rewrite_query' or 'generate_answer').
+        AgenticRAGEngine: The shared, ready engine.
     """
-    print("---ASSESS GRADED DOCUMENTS---")
-    web_search_needed = state["web_search_needed"]
-    if web_search_needed == "Yes":
-        print("---DECISION: SOME or ALL DOCUMENTS ARE NOT RELEVANT TO QUESTION, REWRITE QUERY---")
-        return "rewrite_query"
+    engine = get_engine()
+    vector_db = get_vector_db()
+    if VECTOR_BACKEND == "compact":
+        len(vector_db)
     else:
-        print("---DECISION: GENERATE RESPONSE---")
-        return "generate_answer"
+        vector_db._collection.count()
+    len(get_bm25_retriever(vector_store.keyword_index_path()).index)
+    if sample_question:
+        engine.retriever.invoke(sample_question)
+    return engine
 
-# --- Graph Construction ---
 def agentic_rag_flow():
     """
-    Constructs and compiles the agentic RAG workflow as a state graph.
+    Returns the compiled agentic RAG workflow owned by the shared engine.
+
+    The graph is compiled once per process; repeated calls return the same object.
 
     Returns:
         Compiled StateGraph: The configured RAG workflow.
     """
-    from langgraph.graph import END, StateGraph
-    
-    # Initialize the state graph
-    agentic_rag = StateGraph(GraphState)
-
-    # Add nodes to the graph
-    agentic_rag.add_node("retrieve", retrieve)
-    agentic_rag.add_node("grade_documents", grade_documents)
-    agentic_rag.add_node("rewrite_query", rewrite_query)
-    agentic_rag.add_node("web_search", web_search)
-    agentic_rag.add_node("generate_answer", generate_answer)
-
-    # Define the workflow edges
-    agentic_rag.set_entry_point("retrieve")
-    agentic_rag.add_edge("retrieve", "grade_documents")
-    agentic_rag.add_conditional_edges(
-        "grade_documents",
-        decide_to_generate,
-        {"rewrite_query": "rewrite_query", "generate_answer": "generate_answer"}
-    )
-    agentic_rag.add_edge("rewrite_query", "web_search")
-    agentic_rag.add_edge("web_search", "generate_answer")
-    agentic_rag.add_edge("generate_answer", END)
-
-    # Compile the graph
-    return agentic_rag.compile()
+    return get_engine().graph
 
 # # --- Main Execution (if run as script) ---
 # if __name__ == "__main__":
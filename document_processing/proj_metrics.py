@@ -0,0 +1,471 @@
+"""
+Tracing, Metrics and Structured Logging
+
+Instrumentation for the agentic RAG graph. Every request gets a ``RequestTrace`` that
+records wall time per node, LLM calls with prompt and completion tokens, retrieved
+and kept document counts and every routing decision. Finished traces are folded into
+the process-wide ``metrics`` registry, which renders the Prometheus text format, and
+are logged as one structured line. With ``OTEL_ENABLED`` and the OpenTelemetry API
+installed, requests and nodes are also emitted as spans.
+
+The trace travels in the run config (``configurable["rag_trace"]``) rather than in a
+context variable, so it follows the graph across threads, tasks and streaming
+generators alike.
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain_core.callbacks import BaseCallbackHandler
+from app_config.open_ai_cred import LOG_ENABLED, LOG_LEVEL, LOG_FORMAT, OTEL_ENABLED
+
+TRACE_KEY = "rag_trace"
+# Response metadata flag of messages served by the LLM response cache
+CACHED_RESPONSE_KEY = "rag_cached"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# --- Structured Logging ---
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, or as ``event key=value ...`` text.
+    """
+
+    def __init__(self, fmt: str = "json"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, "fields", {})
+        if self.fmt == "json":
+            payload = {"ts": round(record.created, 3), "level": record.levelname,
+                       "logger": record.name, "event": record.getMessage()}
+            payload.update(fields)
+            return json.dumps(payload, default=str)
+        pairs = " ".join(f"{key}={value}" for key, value in fields.items())
+        return f"{record.levelname} {record.name} {record.getMessage()} {pairs}".rstrip()
+
+
+def configure_logging(enabled: bool = LOG_ENABLED, level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """
+    Configures the ``rag`` logger hierarchy; safe to call again to reconfigure.
+
+    Args:
+        enabled (bool): Emit logs at all.
+        level (str): Minimum level, e.g. 'INFO' or 'DEBUG'.
+        fmt (str): 'json' or 'text'.
+    """
+    root = logging.getLogger("rag")
+    root.propagate = False
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    if not enabled:
+        root.addHandler(logging.NullHandler())
+        root.setLevel(logging.CRITICAL + 1)
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter(fmt))
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns a logger below the ``rag`` hierarchy.
+
+    Args:
+        name (str): Component name.
+
+    Returns:
+        logging.Logger: The logger.
+    """
+    return logging.getLogger(f"rag.{name}")
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """
+    Logs an event with structured fields.
+
+    Args:
+        logger (logging.Logger): Target logger.
+        event (str): Event name.
+        level (int): Log level.
+        **fields: Event fields.
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={"fields": fields})
+
+
+configure_logging()
+logger = get_logger("metrics")
+
+
+# --- Metrics Registry ---
+class MetricsRegistry:
+    """
+    Thread-safe counters, gauges and histograms rendered in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets (tuple): Upper bounds of the histogram buckets in seconds.
+        """
+        self.buckets = buckets
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._gauges: Dict[tuple, float] = {}
+        self._histograms: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        """Registers the type ('counter', 'gauge' or 'histogram') and help text of a metric."""
+        self._meta[name] = (kind, help_text)
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @staticmethod
+    def _labels(labels: tuple, extra: Optional[tuple] = None) -> str:
+        items = list(labels) + ([extra] if extra else [])
+        if not items:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in items)
+        return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(items, escaped)) + "}"
+
+    def render(self) -> str:
+        """
+        Renders every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        with self._lock:
+            series: Dict[str, List[str]] = {}
+            for (name, labels), value in self._counters.items():
+                series.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), value in self._gauges.items():
+                series.setdefault(name, []).append(f"{name}{self._labels(labels)} {value}")
+            for (name, labels), histogram in self._histograms.items():
+                lines = series.setdefault(name, [])
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    lines.append(f"{name}_bucket{self._labels(labels, ('le', bound))} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels, ('le', '+Inf'))} {histogram['count']}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram['sum']}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+        output = []
+        for name in sorted(series):
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(series[name])
+        return "\n".join(output) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+metrics = MetricsRegistry()
+metrics.describe("rag_requests_total", "counter", "Answered requests by outcome.")
+metrics.describe("rag_request_duration_seconds", "histogram", "End-to-end request latency.")
+metrics.describe("rag_node_duration_seconds", "histogram", "Wall time per graph node.")
+metrics.describe("rag_llm_calls_total", "counter", "LLM calls.")
+metrics.describe("rag_llm_prompt_tokens_total", "counter", "Prompt tokens sent to the LLM.")
+metrics.describe("rag_llm_completion_tokens_total", "counter", "Completion tokens received from the LLM.")
+metrics.describe("rag_llm_cache_hits_total", "counter", "LLM responses served from the response cache.")
+metrics.describe("rag_llm_cache_misses_total", "counter", "LLM calls the response cache could not serve.")
+metrics.describe("rag_llm_cache_entries", "gauge", "Responses held by the LLM response cache.")
+metrics.describe("rag_coalesced_requests_total", "counter", "Requests that joined an identical in-flight request.")
+metrics.describe("rag_documents_retrieved_total", "counter", "Documents returned by retrieval and search.")
+metrics.describe("rag_documents_kept_total", "counter", "Documents graded relevant.")
+metrics.describe("rag_decisions_total", "counter", "Routing decisions taken by the graph.")
+metrics.describe("rag_server_in_flight", "gauge", "Requests being answered by the HTTP server.")
+metrics.describe("rag_server_waiting", "gauge", "Requests waiting for a slot in the HTTP server.")
+metrics.describe("rag_server_rejected", "gauge", "Requests the HTTP server rejected since start.")
+metrics.describe("rag_server_sessions", "gauge", "Live chat sessions in the HTTP server.")
+
+
+# --- OpenTelemetry ---
+_tracer = None
+
+def get_tracer():
+    """
+    Returns the OpenTelemetry tracer, or None when spans are disabled or the API is missing.
+    """
+    global _tracer
+    if _tracer is None and OTEL_ENABLED:
+        try:
+            from opentelemetry import trace as otel_trace
+            _tracer = otel_trace.get_tracer("rag-corrective")
+        except ImportError:
+            log_event(logger, "otel_unavailable", logging.WARNING,
+                      reason="OTEL_ENABLED is set but opentelemetry-api is not installed")
+            _tracer = False
+    return _tracer or None
+
+
+# --- Request Traces ---
+class RequestTrace:
+    """
+    Everything measured while answering one request.
+    """
+
+    def __init__(self, request_id: Optional[str] = None):
+        """
+        Args:
+            request_id (str, optional): Request ID. Defaults to a random one.
+        """
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.wall_s: Optional[float] = None
+        self.nodes: List[dict] = []
+        self.decisions: List[dict] = []
+        self.llm_calls = 0
+        self.llm_cache_hits = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.documents_retrieved = 0
+        self.documents_kept = 0
+        self.error: Optional[str] = None
+        self.span = None
+        self._lock = threading.Lock()
+
+    def record_node(self, node: str, wall_s: float):
+        with self._lock:
+            self.nodes.append({"node": node, "wall_s": round(wall_s, 6)})
+        metrics.observe("rag_node_duration_seconds", wall_s, node=node)
+
+    def record_llm(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def record_llm_cache_hit(self):
+        with self._lock:
+            self.llm_cache_hits += 1
+
+    def record_documents(self, retrieved: int = 0, kept: Optional[int] = None):
+        with self._lock:
+            self.documents_retrieved += retrieved
+            if kept is not None:
+                self.documents_kept = kept
+
+    def record_decision(self, decision: str, outcome: str):
+        with self._lock:
+            self.decisions.append({"decision": decision, "outcome": outcome})
+        metrics.inc("rag_decisions_total", decision=decision, outcome=outcome)
+
+    def config(self) -> dict:
+        """
+        Returns the run config that carries this trace and its LLM callback through the graph.
+        """
+        return {"callbacks": [TraceCallbackHandler(self)], "configurable": {TRACE_KEY: self}}
+
+    def finish(self, error: Optional[BaseException] = None, outcome: Optional[str] = None):
+        """
+        Closes the trace, folds it into the metrics registry and logs it.
+
+        Args:
+            error (BaseException, optional): The exception that ended the request.
+            outcome (str, optional): Outcome label. Defaults to 'error' with an error, else 'ok'.
+        """
+        self.wall_s = time.perf_counter() - self.started
+        self.error = repr(error) if error is not None else None
+        outcome = outcome or ("error" if error is not None else "ok")
+        metrics.inc("rag_requests_total", outcome=outcome)
+        metrics.observe("rag_request_duration_seconds", self.wall_s)
+        metrics.inc("rag_llm_calls_total", self.llm_calls)
+        metrics.inc("rag_llm_prompt_tokens_total", self.prompt_tokens)
+        metrics.inc("rag_llm_completion_tokens_total", self.completion_tokens)
+        metrics.inc("rag_documents_retrieved_total", self.documents_retrieved)
+        metrics.inc("rag_documents_kept_total", self.documents_kept)
+        if self.span is not None:
+            self.span.set_attributes({
+                "rag.llm_calls": self.llm_calls,
+                "rag.llm_cache_hits": self.llm_cache_hits,
+                "rag.prompt_tokens": self.prompt_tokens,
+                "rag.completion_tokens": self.completion_tokens,
+                "rag.documents_retrieved": self.documents_retrieved,
+                "rag.documents_kept": self.documents_kept,
+            })
+            self.span.end()
+        log_event(logger, "request_trace", logging.ERROR if error is not None else logging.INFO,
+                  **self.to_dict())
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "request_id": self.request_id,
+                "wall_s": round(self.wall_s, 6) if self.wall_s is not None else None,
+                "nodes": list(self.nodes),
+                "decisions": list(self.decisions),
+                "llm_calls": self.llm_calls,
+                "llm_cache_hits": self.llm_cache_hits,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "documents_retrieved": self.documents_retrieved,
+                "documents_kept": self.documents_kept,
+                "error": self.error,
+            }
+
+
+class TraceCallbackHandler(BaseCallbackHandler):
+    """
+    Counts LLM calls and token usage of one request into its trace.
+
+    LangChain reports responses served by the LLM response cache through the same
+    callback; those are counted as cache hits, not as LLM calls.
+    """
+
+    run_inline = True
+
+    def __init__(self, trace: RequestTrace):
+        self.trace = trace
+
+    @staticmethod
+    def _from_cache(response) -> bool:
+        messages = [getattr(generation, "message", None)
+                    for generations in response.generations for generation in generations]
+        return bool(messages) and all(
+            message is not None and (message.response_metadata or {}).get(CACHED_RESPONSE_KEY)
+            for message in messages
+        )
+
+    def on_llm_end(self, response, **kwargs):
+        if self._from_cache(response):
+            self.trace.record_llm_cache_hit()
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", 0)
+        if not usage:
+            # Streamed responses report usage on the message instead
+            for generations in response.generations:
+                for generation in generations:
+                    usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += usage_metadata.get("input_tokens", 0)
+                    completion_tokens += usage_metadata.get("output_tokens", 0)
+        self.trace.record_llm(prompt_tokens, completion_tokens)
+
+
+def trace_from_config(config: Optional[dict]) -> Optional[RequestTrace]:
+    """
+    Returns the trace carried by a run config, if any.
+
+    Args:
+        config (dict, optional): Run config passed to a node or edge function.
+
+    Returns:
+        RequestTrace or None: The request's trace.
+    """
+    return ((config or {}).get("configurable") or {}).get(TRACE_KEY)
+
+
+def start_trace(request_id: Optional[str] = None) -> RequestTrace:
+    """
+    Opens a request trace and, when enabled, its root span.
+
+    Args:
+        request_id (str, optional): Request ID.
+
+    Returns:
+        RequestTrace: The open trace; close it with :meth:`RequestTrace.finish`.
+    """
+    trace = RequestTrace(request_id)
+    tracer = get_tracer()
+    if tracer is not None:
+        trace.span = tracer.start_span("rag.request", attributes={"rag.request_id": trace.request_id})
+    return trace
+
+
+@contextmanager
+def request_trace(request_id: Optional[str] = None):
+    """
+    Opens a request trace for the duration of the block and finishes it on exit.
+
+    A request abandoned by its consumer (a closed stream or a cancelled task) is
+    recorded with the 'cancelled' outcome rather than as an error.
+
+    Args:
+        request_id (str, optional): Request ID.
+
+    Yields:
+        RequestTrace: The open trace.
+    """
+    trace = start_trace(request_id)
+    try:
+        yield trace
+    except (GeneratorExit, asyncio.CancelledError):
+        trace.finish(outcome="cancelled")
+        raise
+    except BaseException as exc:
+        trace.finish(exc)
+        raise
+    trace.finish()
+
+
+@contextmanager
+def node_span(trace: Optional[RequestTrace], node: str):
+    """
+    Times a graph node into the trace, inside a child span of the request when enabled.
+
+    Args:
+        trace (RequestTrace, optional): The request's trace; without one nothing is recorded.
+        node (str): Node name.
+    """
+    if trace is None:
+        yield
+        return
+    tracer = get_tracer()
+    start = time.perf_counter()
+    try:
+        if tracer is not None and trace.span is not None:
+            from opentelemetry import trace as otel_trace
+            context = otel_trace.set_span_in_context(trace.span)
+            with tracer.start_as_current_span(f"rag.node.{node}", context=context):
+                yield
+        else:
+            yield
+    finally:
+        wall_s = time.perf_counter() - start
+        trace.record_node(node, wall_s)
+        log_event(logger, "node_finished", logging.DEBUG,
+                  request_id=trace.request_id, node=node, wall_s=round(wall_s, 6))
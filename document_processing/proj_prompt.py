@@ -61,3 +61,39 @@ grade_prompt = ChatPromptTemplate.from_messages([
                  {question}
               """),
 ])
+
+# Batch Document Grading Prompt
+SYS_PROMPT_BATCH_GRADE = """You are an expert grader assessing relevance of several retrieved documents to a user question.
+Follow these instructions for grading:
+- Grade every document independently, in the order given.
+- If a document contains keyword(s) or semantic meaning related to the question, grade it as relevant.
+- Return exactly one grade per document, either 'yes' or 'no', to indicate whether it is relevant to the question or not."""
+
+batch_grade_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYS_PROMPT_BATCH_GRADE),
+    ("human", """Retrieved documents ({count} in total):
+                 {documents}
+                 
+                 User question:
+                 {question}
+              """),
+])
+
+# Chat History Summary Prompt
+SYS_PROMPT_SUMMARY = """You maintain a running summary of a conversation between a user and a question-answering assistant.
+Update the existing summary with the new turns:
+- Keep the topics, entities and facts the user may refer back to.
+- Drop greetings and repetition.
+- Keep the summary under 150 words."""
+
+summarize_history_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYS_PROMPT_SUMMARY),
+    ("human", """Existing summary:
+                 {summary}
+                 
+                 New turns:
+                 {turns}
+                 
+                 Write the updated summary.
+              """),
+])
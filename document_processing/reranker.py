@@ -0,0 +1,142 @@
+"""
+Document Rerankers
+
+Cheap CPU scorers for (question, chunk) pairs used by the 'rerank' grading mode in
+place of one LLM call per chunk. Every reranker scores all chunks of a question in
+one batch and returns scores in [0, 1]; the graph turns them into relevance grades
+with a pair of thresholds and only asks the LLM grader about borderline chunks.
+"""
+
+import os
+import sys
+import math
+import asyncio
+from abc import ABC, abstractmethod
+from typing import List
+
+import numpy as np
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from document_processing.secondary_retrieval import tokenize
+
+STOPWORDS = frozenset(
+    "a an and are as at be by does do for from how in is it of on or that the this to "
+    "was what when where which who why with".split()
+)
+
+
+class Reranker(ABC):
+    """
+    Scores how relevant each chunk is to a question.
+    """
+
+    @abstractmethod
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        """
+        Returns one relevance score in [0, 1] per document, in input order.
+        """
+
+    async def ascore(self, question: str, documents: List[Document]) -> List[float]:
+        """Async counterpart of :meth:`score`; runs it in a worker thread by default."""
+        return await asyncio.to_thread(self.score, question, documents)
+
+
+class LexicalReranker(Reranker):
+    """
+    Share of the question's content words that occur in the chunk.
+    """
+
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        terms = {token for token in tokenize(question) if token not in STOPWORDS}
+        if not terms:
+            return [0.0] * len(documents)
+        return [len(terms & set(tokenize(doc.page_content))) / len(terms) for doc in documents]
+
+
+class EmbeddingReranker(Reranker):
+    """
+    Cosine similarity between the question and chunk embeddings.
+
+    Uses the cached embedding model, so chunks that were embedded at ingestion and
+    repeated questions cost no embedding call.
+    """
+
+    def __init__(self, embeddings):
+        """
+        Args:
+            embeddings (Embeddings): Embedding model, ideally cache-backed.
+        """
+        self.embeddings = embeddings
+
+    @staticmethod
+    def _cosine(query: List[float], vectors: List[List[float]]) -> List[float]:
+        query = np.asarray(query, dtype=np.float32)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+        return np.clip(scores, 0.0, 1.0).tolist()
+
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        query = self.embeddings.embed_query(question)
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in documents])
+        return self._cosine(query, vectors)
+
+    async def ascore(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        query, vectors = await asyncio.gather(
+            self.embeddings.aembed_query(question),
+            self.embeddings.aembed_documents([doc.page_content for doc in documents]),
+        )
+        return self._cosine(query, vectors)
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Small local cross-encoder from ``sentence-transformers``, with logits squashed to [0, 1].
+    """
+
+    def __init__(self, model_name: str):
+        """
+        Args:
+            model_name (str): Cross-encoder model, e.g. 'cross-encoder/ms-marco-MiniLM-L-6-v2'.
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as exc:
+            raise ImportError(
+                "The cross_encoder reranker requires `pip install sentence-transformers`."
+            ) from exc
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, question: str, documents: List[Document]) -> List[float]:
+        if not documents:
+            return []
+        logits = self.model.predict([(question, doc.page_content) for doc in documents])
+        return [1.0 / (1.0 + math.exp(-float(logit))) for logit in logits]
+
+
+def get_reranker(name: str, embeddings=None, model_name: str = None) -> Reranker:
+    """
+    Builds a reranker by name.
+
+    Args:
+        name (str): 'lexical', 'embedding' or 'cross_encoder'.
+        embeddings (Embeddings, optional): Embedding model for the 'embedding' reranker.
+        model_name (str, optional): Model for the 'cross_encoder' reranker.
+
+    Returns:
+        Reranker: The reranker.
+    """
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "embedding":
+        return EmbeddingReranker(embeddings)
+    if name == "cross_encoder":
+        return CrossEncoderReranker(model_name)
+    raise ValueError(f"Unknown reranker: {name}")
@@ -0,0 +1,356 @@
+"""
+Secondary Retrieval
+
+Retrieval backends used by the corrective ``web_search`` branch of the agentic graph.
+``BM25Index`` is a keyword index built over the same chunks as the Chroma collection
+during ingestion and persisted next to it. ``SecondaryRetriever`` is the interface the
+graph depends on; ``BM25Retriever`` serves the local index and ``HTTPSearchRetriever``
+queries a search service over a small JSON protocol. ``serve_search`` exposes any
+secondary retriever over that protocol, which doubles as an offline stand-in for a
+real search backend.
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import asyncio
+import logging
+import threading
+import urllib.request
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+# Add parent directory to sys.path for module imports
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from langchain.docstore.document import Document
+from app_config.open_ai_cred import SECONDARY_RETRIEVER, SECONDARY_K, SEARCH_API_URL
+from document_processing.proj_metrics import get_logger, log_event
+
+logger = get_logger("secondary_retrieval")
+
+BM25_INDEX_FILE = "bm25_index.json"
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lowercase word tokens.
+
+    Args:
+        text (str): Text to tokenize.
+
+    Returns:
+        List[str]: Tokens.
+    """
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index over chunk texts, keyed by chunk ID.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.docs: Dict[str, dict] = {}
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.total_length = 0
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add(self, documents: List[Document], ids: List[str]):
+        """
+        Adds (or replaces) chunks.
+
+        Args:
+            documents (List[Document]): Chunks to index.
+            ids (List[str]): Their chunk IDs.
+        """
+        self.remove([doc_id for doc_id in ids if doc_id in self.docs])
+        for doc, doc_id in zip(documents, ids):
+            counts = Counter(tokenize(doc.page_content))
+            length = sum(counts.values())
+            self.docs[doc_id] = {"text": doc.page_content, "metadata": dict(doc.metadata), "length": length}
+            self.total_length += length
+            for term, tf in counts.items():
+                self.postings[term][doc_id] = tf
+
+    def remove(self, ids: List[str]):
+        """
+        Removes chunks by ID; unknown IDs are ignored.
+
+        Args:
+            ids (List[str]): Chunk IDs to remove.
+        """
+        for doc_id in ids:
+            entry = self.docs.pop(doc_id, None)
+            if entry is None:
+                continue
+            self.total_length -= entry["length"]
+            for term in set(tokenize(entry["text"])):
+                self.postings[term].pop(doc_id, None)
+                if not self.postings[term]:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        """
+        Scores chunks against the query.
+
+        Args:
+            query (str): Search query.
+            k (int): Number of results.
+
+        Returns:
+            List[Tuple[Document, float]]: Best chunks with their BM25 scores, highest first.
+        """
+        if not self.docs:
+            return []
+        n_docs = len(self.docs)
+        avg_length = self.total_length / n_docs
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                length_norm = 1 - self.b + self.b * self.docs[doc_id]["length"] / avg_length
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        results = []
+        for doc_id, score in best:
+            entry = self.docs[doc_id]
+            metadata = dict(entry["metadata"], chunk_id=doc_id)
+            results.append((Document(page_content=entry["text"], metadata=metadata), score))
+        return results
+
+    def save(self, path: str):
+        """
+        Persists the index as JSON, replacing the file atomically.
+
+        Args:
+            path (str): Target file.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {"k1": self.k1, "b": self.b, "docs": self.docs}
+        with open(path + ".tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """
+        Loads a persisted index; a missing file yields an empty index.
+
+        Args:
+            path (str): Index file.
+
+        Returns:
+            BM25Index: The loaded index.
+        """
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        ids = list(data["docs"])
+        docs = [Document(page_content=data["docs"][doc_id]["text"],
+                         metadata=data["docs"][doc_id]["metadata"]) for doc_id in ids]
+        index.add(docs, ids)
+        return index
+
+
+class SecondaryRetriever(ABC):
+    """
+    Retrieval backend for the corrective branch of the graph.
+    """
+
+    name = "secondary"
+
+    @abstractmethod
+    def search(self, query: str, k: int = SECONDARY_K) -> List[Document]:
+        """
+        Returns up to ``k`` documents for the query, each tagged with its source backend.
+        """
+
+    async def asearch(self, query: str, k: int = SECONDARY_K) -> List[Document]:
+        """Async counterpart of :meth:`search`; runs it in a worker thread by default."""
+        return await asyncio.to_thread(self.search, query, k)
+
+
+class BM25Retriever(SecondaryRetriever):
+    """
+    Keyword search over the persisted ``BM25Index``, reloaded when the file changes.
+    """
+
+    name = "bm25"
+
+    def __init__(self, index_path: str):
+        """
+        Args:
+            index_path (str): Path of the persisted index.
+        """
+        self.index_path = index_path
+        self._index = BM25Index()
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> BM25Index:
+        """The current index, reloaded if the file on disk was rewritten."""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._index = BM25Index.load(self.index_path)
+                    self._mtime = mtime
+        return self._index
+
+    def search(self, query: str, k: int = SECONDARY_K) -> List[Document]:
+        results = []
+        for doc, score in self.index.search(query, k):
+            doc.metadata.update(retrieval=self.name, score=score)
+            results.append(doc)
+        return results
+
+
+class HTTPSearchRetriever(SecondaryRetriever):
+    """
+    Client for a search service speaking the JSON protocol of :func:`serve_search`.
+
+    The service receives ``{"query": ..., "k": ...}`` as a POST body and answers with
+    ``{"results": [{"content": ..., "metadata": {...}}, ...]}``. The search backs the
+    corrective branch, so an unreachable, slow or misbehaving service is logged and
+    yields no documents instead of failing the request.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        """
+        Args:
+            url (str): Search endpoint.
+            timeout (float): Request timeout in seconds.
+        """
+        self.url = url
+        self.timeout = timeout
+
+    def search(self, query: str, k: int = SECONDARY_K) -> List[Document]:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"query": query, "k": k}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.load(response)
+            return [
+                Document(
+                    page_content=result["content"],
+                    metadata=dict(result.get("metadata") or {}, retrieval=self.name),
+                )
+                for result in payload.get("results", [])[:k]
+            ]
+        # URLError and timeouts are OSErrors; malformed JSON or results raise the others
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as exc:
+            log_event(logger, "secondary_search_failed", logging.WARNING, url=self.url, error=repr(exc))
+            return []
+
+
+def serve_search(retriever: SecondaryRetriever, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    Serves a secondary retriever over the JSON protocol used by ``HTTPSearchRetriever``.
+
+    The server runs in a daemon thread; call ``shutdown()`` on the returned server to stop it.
+    With ``port=0`` a free port is picked and can be read from ``server.server_address``.
+
+    Args:
+        retriever (SecondaryRetriever): Backend answering the queries.
+        host (str): Interface to bind.
+        port (int): Port to bind.
+
+    Returns:
+        ThreadingHTTPServer: The running server.
+    """
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            docs = retriever.search(body["query"], int(body.get("k", SECONDARY_K)))
+            payload = json.dumps({
+                "results": [{"content": doc.page_content, "metadata": doc.metadata} for doc in docs]
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), SearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+_bm25_retrievers: Dict[str, BM25Retriever] = {}
+_bm25_lock = threading.Lock()
+
+def get_bm25_retriever(index_path: str) -> BM25Retriever:
+    """
+    Returns the process-wide BM25 retriever for an index file, so the index is held in memory once.
+
+    Args:
+        index_path (str): Path of the persisted index.
+
+    Returns:
+        BM25Retriever: Shared retriever.
+    """
+    with _bm25_lock:
+        if index_path not in _bm25_retrievers:
+            _bm25_retrievers[index_path] = BM25Retriever(index_path)
+        return _bm25_retrievers[index_path]
+
+def release_bm25_retriever(index_path: str):
+    """
+    Drops the process-wide BM25 retriever of an index file that is no longer served.
+
+    Args:
+        index_path (str): Path of the persisted index.
+    """
+    with _bm25_lock:
+        _bm25_retrievers.pop(index_path, None)
+
+
+def get_secondary_retriever(persist_directory: str) -> SecondaryRetriever:
+    """
+    Builds the secondary retriever selected by ``SECONDARY_RETRIEVER``.
+
+    Args:
+        persist_directory (str): Vector store directory holding the BM25 index.
+
+    Returns:
+        SecondaryRetriever: 'bm25' (default) or 'http' backend.
+    """
+    if SECONDARY_RETRIEVER == "http":
+        return HTTPSearchRetriever(SEARCH_API_URL)
+    if SECONDARY_RETRIEVER == "bm25":
+        return get_bm25_retriever(os.path.join(persist_directory, BM25_INDEX_FILE))
+    raise ValueError(f"Unknown secondary retriever: {SECONDARY_RETRIEVER}")
@@ -1,29 +1,98 @@
 import sys
 import os
+import json
+import uuid
+import urllib.error
+import urllib.request
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import streamlit as st
-from document_processing.doc_qa import agentic_qa
+from document_processing.doc_qa import agentic_qa_stream
+from document_processing.chat_history import ChatHistoryManager
+from app_config.open_ai_cred import RAG_SERVER_URL
+
+# Status labels shown as graph nodes finish
+NODE_LABELS = {
+    "contextualize_question": "Understood the question, checking answer cache...",
+    "check_cache": "Checked answer cache...",
+    "retrieve": "Retrieved documents, grading relevance...",
+    "grade_documents": "Graded documents...",
+    "rewrite_query": "Rewrote the query, searching for more context...",
+    "web_search": "Found more context, generating answer...",
+    "generate_answer": "Answer generated",
+    "cache_answer": "Answer generated",
+}
 
 # Initialize session state variables
 def initialize_session():
     if "chat_history" not in st.session_state:
         st.session_state.chat_history = []
     if "conv_history" not in st.session_state:
-        st.session_state.conv_history = []
+        st.session_state.conv_history = ChatHistoryManager()
+    if "pending_question" not in st.session_state:
+        st.session_state.pending_question = None
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
+
+def remote_events(user_input):
+    """
+    Streams answer events from the API server configured in RAG_SERVER_URL.
+
+    A busy or warming-up server (429/503) and other HTTP or connection failures are
+    turned into an 'error' event, so the UI shows a message instead of crashing.
+    """
+    request = urllib.request.Request(
+        RAG_SERVER_URL.rstrip("/") + "/v1/questions",
+        data=json.dumps({"question": user_input, "session_id": st.session_state.session_id}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+    except urllib.error.HTTPError as exc:
+        if exc.code in (429, 503):
+            retry_after = exc.headers.get("Retry-After")
+            wait = f" in {retry_after} seconds" if retry_after else " in a moment"
+            yield {"type": "error", "message": f"The server is busy, please retry{wait}."}
+        else:
+            yield {"type": "error", "message": f"The server failed to answer (HTTP {exc.code})."}
+    except urllib.error.URLError as exc:
+        yield {"type": "error", "message": f"The server could not be reached: {exc.reason}"}
+
+def answer_events(user_input):
+    """Answer events from the API server if one is configured, else from the local engine."""
+    if RAG_SERVER_URL:
+        return remote_events(user_input)
+    return agentic_qa_stream(user_input, st.session_state.conv_history)
 
-def chatbot_response(user_input):
-    """Generates chatbot response using agentic_qa."""
-    answer, conv = agentic_qa(user_input, st.session_state.conv_history)
+def stream_response(user_input):
+    """Renders node progress and answer tokens as they arrive, returning the full answer."""
+    st.markdown(f"<p><strong>You:</strong> {user_input}</p>", unsafe_allow_html=True)
+    status = st.status("Contextualizing the question...")
+    answer_box = st.empty()
+    answer = ""
+    for event in answer_events(user_input):
+        if event["type"] == "progress":
+            status.update(label=NODE_LABELS.get(event["node"], event["node"]))
+        elif event["type"] == "token":
+            answer += event["content"]
+            answer_box.markdown(f"Bot: {answer}")
+        elif event["type"] == "final":
+            answer = event["generation"]
+        elif event["type"] == "error":
+            status.update(label="Failed", state="error")
+            return event["message"]
+    status.update(label="Done", state="complete")
     return answer
 
 def submit_chat():
-    """Handles user input, updates chat history, and clears input field."""
+    """Queues user input for streaming and clears input field."""
     user_input = st.session_state.user_input.strip()
     if user_input:
-        bot_response = chatbot_response(user_input)
-        st.session_state.chat_history.append(("You", user_input))
-        st.session_state.chat_history.append(("Bot", bot_response))
+        st.session_state.pending_question = user_input
         st.session_state.user_input = ""  # Clear input field
 
 def display_chat():
@@ -37,12 +106,30 @@ def display_chat():
     )
     st.markdown(chat_box_style + chat_box_content + "</div>", unsafe_allow_html=True)
 
+def display_history_metrics():
+    """Shows the session's history size and prompt tokens in the sidebar."""
+    if RAG_SERVER_URL:
+        return
+    metrics = st.session_state.conv_history.metrics()
+    st.sidebar.caption(
+        f"History: {metrics['turns']} turns ({metrics['summarized_turns']} summarized), "
+        f"{metrics['memory_bytes']} bytes, {metrics['last_prompt_tokens']} prompt tokens"
+    )
+
 def main():
     """Main function to run the Streamlit chatbot application."""
     st.title("Chatbot with Streamlit")
     initialize_session()
     display_chat()
+    display_history_metrics()
+    if st.session_state.pending_question:
+        user_input = st.session_state.pending_question
+        st.session_state.pending_question = None
+        bot_response = stream_response(user_input)
+        st.session_state.chat_history.append(("You", user_input))
+        st.session_state.chat_history.append(("Bot", bot_response))
+        st.rerun()
     st.text_input("Ask a question:", "", key="user_input", on_change=submit_chat, placeholder="Type your message and press Enter...")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
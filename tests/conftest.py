@@ -0,0 +1,64 @@
+"""
+Shared Test Fixtures
+
+The tests run offline against the deterministic fake models of ``benchmarks/fakes.py``.
+The environment is set before any project module is imported, so no API key, LLM
+response cache or structured log output is needed, and extracted PDF text is cached
+in a temporary directory.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Make the project packages importable from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("OPENAI_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+os.environ.setdefault("LLM_CACHE_BACKEND", "none")
+os.environ.setdefault("LOG_ENABLED", "false")
+os.environ.setdefault("PDF_TEXT_CACHE_DIR", tempfile.mkdtemp(prefix="pdf_text_"))
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, FakeRetriever, synthetic_corpus
+from document_processing.secondary_retrieval import BM25Index, BM25Retriever, BM25_INDEX_FILE
+
+
+@pytest.fixture
+def corpus():
+    """Small synthetic corpus with ``chunk_id`` metadata."""
+    return synthetic_corpus(60, words_per_doc=60, n_topics=6)
+
+
+@pytest.fixture
+def bm25_path(tmp_path, corpus):
+    """Path of a persisted BM25 index over :func:`corpus`."""
+    index = BM25Index()
+    index.add(corpus, [doc.metadata["chunk_id"] for doc in corpus])
+    path = str(tmp_path / BM25_INDEX_FILE)
+    index.save(path)
+    return path
+
+
+@pytest.fixture
+def make_engine(bm25_path):
+    """
+    Factory of engines running on fake models, without answer cache or coalescing.
+
+    Keyword arguments are passed to ``AgenticRAGEngine``; ``llm`` defaults to a
+    zero-latency ``FakeChatModel`` and ``retriever`` to a ``FakeRetriever``.
+    """
+    from document_processing.proj_lang_graph import AgenticRAGEngine
+
+    def build(**kwargs):
+        kwargs.setdefault("llm", FakeChatModel(latency=0.0))
+        kwargs.setdefault("retriever", FakeRetriever(index=BM25Index.load(bm25_path)))
+        kwargs.setdefault("secondary_retriever", BM25Retriever(bm25_path))
+        kwargs.setdefault("embeddings", FakeEmbeddings(latency=0.0))
+        kwargs.setdefault("answer_cache", False)
+        kwargs.setdefault("coalescer", False)
+        return AgenticRAGEngine(**kwargs)
+
+    return build
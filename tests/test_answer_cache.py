@@ -0,0 +1,35 @@
+"""
+Tests of the semantic answer cache: hits above the threshold and documents that are
+never shared between the cache and its callers.
+"""
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_corpus
+from document_processing.proj_cache import SemanticAnswerCache
+
+QUESTION = "What does the corpus say about topic1term3?"
+
+
+def test_lookup_returns_copies_of_stored_documents():
+    embeddings = FakeEmbeddings(latency=0.0)
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=8)
+    documents = synthetic_corpus(3, n_topics=2)
+    embedding = embeddings.embed_query(QUESTION)
+
+    cache.store(embedding, QUESTION, "answer", documents)
+    documents[0].metadata["relevance"] = "no"
+    first = cache.lookup(embedding)
+    first["documents"][1].metadata["relevance"] = "no"
+    second = cache.lookup(embedding)
+
+    assert first["generation"] == "answer"
+    assert [doc.page_content for doc in second["documents"]] == [doc.page_content for doc in documents]
+    assert all("relevance" not in doc.metadata for doc in second["documents"])
+
+
+def test_dissimilar_question_misses():
+    embeddings = FakeEmbeddings(latency=0.0)
+    cache = SemanticAnswerCache(threshold=0.95, ttl_seconds=60, max_entries=8)
+    cache.store(embeddings.embed_query(QUESTION), QUESTION, "answer", [])
+
+    assert cache.lookup(embeddings.embed_query("topic5term0 topic5term9 unrelated words")) is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,190 @@
+"""
+Tests of the HTTP serving layer on an engine running fake models: warm-up, admission
+control, bounded per-session queues and both reply formats.
+"""
+
+import json
+import time
+import asyncio
+import threading
+from contextlib import ExitStack
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api_server import GuardedStreamingResponse, create_app
+
+QUESTION = "What does the corpus say about topic1term3?"
+
+
+@pytest.fixture
+def engine(make_engine):
+    from document_processing.proj_lang_graph import set_engine
+
+    engine = make_engine()
+    yield engine
+    set_engine(None)
+
+
+def wait_ready(client, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while client.get("/readyz").status_code != 200:
+        assert time.monotonic() < deadline, "warm-up did not finish"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def serve(engine):
+    """Factory of started test clients; keyword arguments are passed to ``create_app``."""
+    with ExitStack() as stack:
+
+        def start(**kwargs):
+            app = create_app(engine=engine, **kwargs)
+            client = stack.enter_context(TestClient(app))
+            wait_ready(client)
+            return app, client
+
+        yield start
+
+
+def test_warming_up_returns_503(engine):
+    # Without entering the client the lifespan, and with it the warm-up, never runs
+    client = TestClient(create_app(engine=engine))
+
+    response = client.post("/v1/questions", json={"question": QUESTION})
+
+    assert response.status_code == 503
+    assert client.get("/readyz").status_code == 503
+
+
+def test_full_queue_returns_429(serve):
+    app, client = serve(max_concurrency=1, max_queue=0)
+    admission = app.state.admission
+    client.portal.call(admission.acquire)
+
+    response = client.post("/v1/questions", json={"question": QUESTION, "session_id": "s1"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert not app.state.sessions.get("s1").lock.locked()
+
+    client.portal.call(admission.release)
+    response = client.post("/v1/questions", json={"question": QUESTION, "session_id": "s1", "stream": False})
+    assert response.status_code == 200
+
+
+def test_non_streaming_reply(serve):
+    app, client = serve()
+
+    response = client.post("/v1/questions", json={"question": QUESTION, "stream": False})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["generation"]
+    assert body["trace"]["nodes"]
+    assert client.get(f"/v1/sessions/{body['session_id']}").status_code == 200
+    assert app.state.admission.in_flight == 0
+
+
+def test_streaming_reply_is_ndjson(serve):
+    app, client = serve()
+
+    response = client.post("/v1/questions", json={"question": QUESTION, "session_id": "s1"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["X-Session-Id"] == "s1"
+    events = [json.loads(line) for line in response.text.splitlines() if line]
+    assert events[-1]["type"] == "final"
+    assert events[-1]["session_id"] == "s1"
+    assert events[-1]["generation"]
+    assert all(event["type"] != "error" for event in events)
+    assert app.state.admission.in_flight == 0
+    assert not app.state.sessions.get("s1").lock.locked()
+
+
+def ask_in_thread(client, session_id: str, replies: dict) -> threading.Thread:
+    """Posts a question for the session from a thread; the reply lands in ``replies``."""
+
+    def ask():
+        replies.setdefault(session_id, []).append(client.post(
+            "/v1/questions", json={"question": QUESTION, "session_id": session_id, "stream": False}
+        ))
+
+    thread = threading.Thread(target=ask)
+    thread.start()
+    return thread
+
+
+def test_waiting_on_a_session_holds_no_slot(serve):
+    app, client = serve(max_concurrency=1, max_queue=1)
+    lock = app.state.sessions.get("busy").lock
+    client.portal.call(lock.acquire)
+    replies = {}
+
+    thread = ask_in_thread(client, "busy", replies)
+    time.sleep(0.2)
+    assert app.state.admission.in_flight == 0
+    assert app.state.admission.waiting == 1
+
+    other = client.post("/v1/questions", json={"question": QUESTION, "session_id": "other", "stream": False})
+    assert other.status_code == 200
+
+    client.portal.call(lock.release)
+    thread.join(timeout=5.0)
+    assert replies["busy"][0].status_code == 200
+
+
+def test_session_queue_is_bounded(serve):
+    app, client = serve(max_session_queue=1)
+    lock = app.state.sessions.get("busy").lock
+    client.portal.call(lock.acquire)
+    replies = {}
+
+    thread = ask_in_thread(client, "busy", replies)
+    time.sleep(0.2)
+    response = client.post("/v1/questions", json={"question": QUESTION, "session_id": "busy"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    client.portal.call(lock.release)
+    thread.join(timeout=5.0)
+    assert replies["busy"][0].status_code == 200
+
+
+def test_session_wait_times_out(serve):
+    app, client = serve(queue_timeout=0.2)
+    lock = app.state.sessions.get("busy").lock
+    client.portal.call(lock.acquire)
+
+    response = client.post("/v1/questions", json={"question": QUESTION, "session_id": "busy"})
+
+    assert response.status_code == 503
+    assert app.state.admission.waiting == 0
+    assert app.state.sessions.get("busy").waiting == 0
+    client.portal.call(lock.release)
+
+
+def test_stream_is_released_when_client_leaves_before_body():
+    released = []
+    started = []
+
+    async def body():
+        started.append(True)
+        yield "never sent\n"
+
+    async def receive():
+        await asyncio.sleep(10)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    response = GuardedStreamingResponse(body(), on_close=lambda: released.append(True))
+    try:
+        asyncio.run(response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send))
+    except Exception:
+        pass
+
+    assert not started
+    assert released == [True]
@@ -0,0 +1,56 @@
+"""
+Load test of the async graph path: many concurrent ``ainvoke`` calls on one event loop
+must overlap and return the same answers as the sync path.
+"""
+
+import time
+import asyncio
+
+from benchmarks.fakes import FakeChatModel, FakeRetriever, synthetic_questions
+from document_processing.secondary_retrieval import BM25Index
+
+LATENCY = 0.05
+REQUESTS = 32
+
+
+class TrackingRetriever(FakeRetriever):
+    """FakeRetriever recording the highest number of queries in flight at once."""
+
+    in_flight: int = 0
+    peak: int = 0
+
+    async def _aget_relevant_documents(self, query, *, run_manager=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super()._aget_relevant_documents(query, run_manager=run_manager)
+        finally:
+            self.in_flight -= 1
+
+
+def test_concurrent_ainvoke_overlaps_and_matches_invoke(make_engine, bm25_path):
+    retriever = TrackingRetriever(index=BM25Index.load(bm25_path), latency=LATENCY)
+    engine = make_engine(llm=FakeChatModel(latency=LATENCY), retriever=retriever)
+    questions = synthetic_questions(REQUESTS, n_topics=6, seed=3)
+
+    start = time.perf_counter()
+    engine.invoke({"question": questions[0], "chat_history": []})
+    single_s = time.perf_counter() - start
+
+    async def run_all():
+        return await asyncio.gather(*(
+            engine.ainvoke({"question": question, "chat_history": []}) for question in questions
+        ))
+
+    start = time.perf_counter()
+    results = asyncio.run(run_all())
+    concurrent_s = time.perf_counter() - start
+
+    assert retriever.peak > 1
+    # Serial execution would take REQUESTS times as long as one request
+    assert concurrent_s < REQUESTS * single_s / 4
+    for question, result in zip(questions, results):
+        expected = engine.invoke({"question": question, "chat_history": []})
+        assert result["generation"]
+        assert result["generation"] == expected["generation"]
+        assert result["trace"]["nodes"]
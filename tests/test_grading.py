@@ -0,0 +1,77 @@
+"""
+Tests of document grading: wall time independent of the number of documents in the
+concurrent modes, and verdict normalization across all modes.
+"""
+
+import time
+import asyncio
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel
+
+LATENCY = 0.2
+QUESTION = "What does the corpus say about topic1term3?"
+
+
+def grading_time(engine, documents, asynchronous=False) -> float:
+    start = time.perf_counter()
+    if asynchronous:
+        grades = asyncio.run(engine._agrade(QUESTION, documents))
+    else:
+        grades = engine._grade(QUESTION, documents)
+    elapsed = time.perf_counter() - start
+    assert len(grades) == len(documents)
+    assert set(grades) <= {"yes", "no"}
+    return elapsed
+
+
+@pytest.mark.parametrize("grading_mode", ["batch", "single_call"])
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_grading_time_flat_in_k(make_engine, corpus, grading_mode, asynchronous):
+    llm = FakeChatModel(latency=LATENCY)
+    engine = make_engine(llm=llm, grading_mode=grading_mode, grading_max_concurrency=32)
+
+    times = {k: grading_time(engine, corpus[:k], asynchronous) for k in (1, 4, 16)}
+
+    assert times[1] >= LATENCY
+    # Sequential grading of 16 documents would take 16 latencies
+    assert times[16] < times[1] + 2 * LATENCY
+    calls = llm.stats.snapshot()["calls"]
+    assert calls == (3 if grading_mode == "single_call" else 1 + 4 + 16)
+
+
+def test_sequential_grading_grows_with_k(make_engine, corpus):
+    engine = make_engine(llm=FakeChatModel(latency=0.05), grading_mode="sequential")
+
+    assert grading_time(engine, corpus[:4]) >= 4 * 0.05
+
+
+class ShoutingGrader(FakeChatModel):
+    """Grader answering 'Yes' with odd case and whitespace."""
+
+    def _structured_reply(self, schema, prompt: str):
+        fields = getattr(schema, "__fields__", None) or getattr(schema, "model_fields", {})
+        if "binary_scores" in fields:
+            count = int(prompt.split(" in total)")[0].rsplit("(", 1)[-1])
+            return schema(binary_scores=[" Yes "] * count)
+        return schema(binary_score="Yes")
+
+
+@pytest.mark.parametrize("grading_mode", ["batch", "single_call", "sequential"])
+def test_grades_are_normalized(make_engine, corpus, grading_mode):
+    engine = make_engine(llm=ShoutingGrader(latency=0.0), grading_mode=grading_mode)
+
+    assert engine._grade(QUESTION, corpus[:3]) == ["yes"] * 3
+    assert asyncio.run(engine._agrade(QUESTION, corpus[:3])) == ["yes"] * 3
+
+
+def test_grading_leaves_retrieved_documents_untouched(make_engine, corpus):
+    engine = make_engine(llm=FakeChatModel(latency=0.0, relevance_rate=0.5))
+    documents = corpus[:8]
+
+    update = engine.grade_documents({"question": QUESTION, "documents": documents, "chat_history": []})
+
+    assert all("relevance" not in doc.metadata for doc in documents)
+    assert update["documents"]
+    assert all(doc.metadata["relevance"] == "yes" for doc in update["documents"])
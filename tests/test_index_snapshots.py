@@ -0,0 +1,117 @@
+"""
+Tests of versioned index snapshots: resuming and discarding unfinished builds, and
+engines following activations and rollbacks. The migration of a legacy store is
+tested in ``test_ingestion.py``.
+"""
+
+import os
+
+import pytest
+
+from document_processing.index_snapshots import SnapshotStore, SnapshotValidationError
+
+
+class Interrupted(Exception):
+    pass
+
+
+def build(store, files, fail=False, **kwargs):
+    """Writes files into a new build, then raises ``fail`` if it is an exception class."""
+    with store.building(**kwargs) as (version, path):
+        for name in files:
+            with open(os.path.join(path, name), "w") as f:
+                f.write(name)
+        if fail:
+            raise (Interrupted if fail is True else fail)()
+    return version
+
+
+def test_interrupted_build_is_resumed(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    first = build(store, ["a"])
+    store.activate(first)
+
+    with pytest.raises(Interrupted):
+        build(store, ["b"], fail=True)
+    unfinished = store.unfinished_builds()
+    assert len(unfinished) == 1
+    assert store.versions() == [first]
+
+    second = build(store, ["c"])
+
+    assert second == unfinished[0]
+    assert not store.unfinished_builds()
+    assert sorted(os.listdir(store.version_path(second))) == ["a", "b", "c"]
+
+
+def test_build_failing_validation_is_not_resumed(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    first = build(store, ["a"])
+    store.activate(first)
+
+    with pytest.raises(SnapshotValidationError):
+        build(store, ["b"], fail=SnapshotValidationError)
+    assert not store.unfinished_builds()
+
+    second = build(store, ["c"])
+
+    assert sorted(os.listdir(store.version_path(second))) == ["a", "c"]
+
+
+def test_fresh_build_discards_unfinished_ones(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    with pytest.raises(Interrupted):
+        build(store, ["b"], fail=True)
+
+    version = build(store, ["c"], resume=False)
+
+    assert not store.unfinished_builds()
+    assert os.listdir(store.version_path(version)) == ["c"]
+
+
+def test_incomplete_copy_is_not_resumed(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    # A crash while copying the served snapshot leaves no build source marker
+    os.makedirs(store.version_path("20240101T000000000000-abcdef") + ".tmp")
+
+    version = build(store, ["c"])
+
+    assert version != "20240101T000000000000-abcdef"
+    assert not store.unfinished_builds()
+
+
+def test_prune_discards_builds_of_other_snapshots(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    first = build(store, ["a"])
+    store.activate(first)
+    second = build(store, ["b"])
+    store.activate(second)
+    with pytest.raises(Interrupted):
+        build(store, ["c"], fail=True)
+
+    store.rollback()
+
+    assert store.current() == first
+    assert not store.unfinished_builds()
+
+
+def test_engine_follows_activation_and_rollback(tmp_path, monkeypatch, make_engine):
+    from document_processing import doc_indexer
+
+    store = SnapshotStore(str(tmp_path / "proj_db"))
+    monkeypatch.setattr(doc_indexer, "snapshots", store)
+    # Both snapshots carry the same version token
+    first = build(store, [doc_indexer.INDEX_VERSION_FILE])
+    store.activate(first)
+    engine = make_engine()
+    second = build(store, [])
+    store.activate(second)
+
+    assert engine.refresh_index()
+    assert engine._index_directory == store.version_path(second)
+
+    store.rollback()
+
+    assert engine.refresh_index()
+    assert engine._index_directory == store.version_path(first)
+    assert not engine.refresh_index()
@@ -0,0 +1,116 @@
+"""
+Tests of the batched index writer: backoff on rate-limit errors, skipping chunks
+already in the collection and resuming an interrupted write.
+"""
+
+import uuid
+
+import pytest
+from langchain_chroma import Chroma
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_corpus
+from document_processing.doc_index_writer import IndexWriter
+
+
+class RateLimitError(Exception):
+    """Stand-in for the OpenAI client's 429 error."""
+
+    status_code = 429
+
+
+class FlakyEmbeddings(FakeEmbeddings):
+    """
+    FakeEmbeddings failing chosen calls (numbered from 1) with a given error.
+    """
+
+    def __init__(self, fail_calls=(), error=RateLimitError):
+        super().__init__(latency=0.0)
+        self.fail_calls = set(fail_calls)
+        self.error = error
+        self.attempts = 0
+
+    def embed_documents(self, texts):
+        self.attempts += 1
+        if self.attempts in self.fail_calls:
+            raise self.error("injected failure")
+        return super().embed_documents(texts)
+
+
+def collection(embeddings) -> Chroma:
+    return Chroma(collection_name=f"test_{uuid.uuid4().hex[:8]}", embedding_function=embeddings,
+                  collection_metadata={"hnsw:space": "cosine"})
+
+
+def stored_ids(chroma_db) -> set:
+    return set(chroma_db.get(include=[])["ids"])
+
+
+def writer(chroma_db, embeddings, **kwargs) -> IndexWriter:
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("max_concurrency", 1)
+    return IndexWriter(chroma_db, embedding=embeddings, base_delay=0.001, max_delay=0.01, **kwargs)
+
+
+def test_backs_off_on_rate_limits_and_succeeds():
+    docs = synthetic_corpus(20, n_topics=4)
+    embeddings = FlakyEmbeddings(fail_calls={1, 2})
+    chroma_db = collection(embeddings)
+
+    stats = writer(chroma_db, embeddings, max_retries=3).write(docs)
+
+    assert stats == {"written": 20, "skipped": 0, "batches": 2}
+    assert embeddings.attempts == 4
+    assert stored_ids(chroma_db) == {doc.metadata["chunk_id"] for doc in docs}
+
+
+def test_gives_up_after_max_retries():
+    docs = synthetic_corpus(10, n_topics=2)
+    embeddings = FlakyEmbeddings(fail_calls={1, 2, 3})
+    chroma_db = collection(embeddings)
+
+    with pytest.raises(RateLimitError):
+        writer(chroma_db, embeddings, max_retries=2).write(docs)
+    assert embeddings.attempts == 3
+    assert not stored_ids(chroma_db)
+
+
+def test_other_errors_are_not_retried():
+    docs = synthetic_corpus(10, n_topics=2)
+    embeddings = FlakyEmbeddings(fail_calls={1}, error=ValueError)
+
+    with pytest.raises(ValueError):
+        writer(collection(embeddings), embeddings, max_retries=3).write(docs)
+    assert embeddings.attempts == 1
+
+
+def test_skips_already_indexed_ids():
+    docs = synthetic_corpus(30, n_topics=3)
+    embeddings = FlakyEmbeddings()
+    chroma_db = collection(embeddings)
+    writer(chroma_db, embeddings).write(docs[:20])
+    calls = embeddings.stats.snapshot()["calls"]
+
+    stats = writer(chroma_db, embeddings).write(docs)
+
+    assert stats == {"written": 10, "skipped": 20, "batches": 3}
+    assert embeddings.stats.snapshot()["calls"] == calls + 1
+    assert len(stored_ids(chroma_db)) == 30
+
+
+def test_resumes_after_interruption():
+    docs = synthetic_corpus(50, n_topics=5)
+    embeddings = FlakyEmbeddings(fail_calls={3}, error=RuntimeError)
+    chroma_db = collection(embeddings)
+
+    with pytest.raises(RuntimeError):
+        writer(chroma_db, embeddings).write(docs)
+    # Batches queued behind the failed one may or may not have run
+    stored = len(stored_ids(chroma_db))
+    assert 20 <= stored <= 40 and stored % 10 == 0
+
+    calls = embeddings.stats.snapshot()["calls"]
+    stats = writer(chroma_db, embeddings).write(docs)
+
+    assert stats["written"] == 50 - stored and stats["skipped"] == stored
+    assert embeddings.stats.snapshot()["calls"] == calls + (50 - stored) // 10
+    assert stored_ids(chroma_db) == {doc.metadata["chunk_id"] for doc in docs}
@@ -0,0 +1,149 @@
+"""
+Tests of incremental ingestion over small generated PDFs, with fake embeddings, and
+of migrating a legacy store into snapshots.
+"""
+
+import os
+import json
+import uuid
+
+import pytest
+
+from benchmarks.fakes import FakeEmbeddings, synthetic_corpus
+from document_processing.doc_indexer import VectorStore
+from document_processing.doc_ingestion import IngestionPipeline
+from document_processing.index_snapshots import SnapshotStore
+from document_processing.secondary_retrieval import BM25Index
+
+
+def write_pdf(path: str, text: str):
+    """Writes a one-page PDF showing ``text`` in Helvetica."""
+    stream = f"BT /F1 10 Tf 40 750 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(pdf)
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    """Folder of three one-page PDFs about different topics."""
+    directory = tmp_path / "pdfs"
+    directory.mkdir()
+    for i, doc in enumerate(synthetic_corpus(3, words_per_doc=40, n_topics=3)):
+        write_pdf(str(directory / f"paper{i}.pdf"), doc.page_content)
+    return str(directory)
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings(monkeypatch):
+    monkeypatch.setattr(VectorStore, "embedding_model", lambda self: FakeEmbeddings(latency=0.0))
+
+
+@pytest.fixture
+def snapshot_store(tmp_path, monkeypatch):
+    """Snapshot store served instead of the project's ``proj_db``."""
+    from document_processing import doc_indexer, doc_ingestion
+
+    store = SnapshotStore(str(tmp_path / "proj_db"))
+    monkeypatch.setattr(doc_indexer, "snapshots", store)
+    monkeypatch.setattr(doc_ingestion, "snapshots", store)
+    return store
+
+
+def pipeline(store, pdf_dir) -> IngestionPipeline:
+    return IngestionPipeline(store, data_dir=pdf_dir, max_workers=1, dedup=False)
+
+
+def collection_ids(store) -> set:
+    return set(store.vectord_db_loader().get(include=[])["ids"])
+
+
+def manifest_ids(pipeline_) -> set:
+    return {chunk for entry in pipeline_.load_manifest().values() for chunk in entry["chunk_ids"]}
+
+
+def add_legacy_chunks(store, count: int = 5):
+    """Adds chunks the way the original indexer did: random IDs, no chunk_id metadata."""
+    texts = [doc.page_content for doc in synthetic_corpus(count, n_topics=2, seed=9)]
+    store.vectord_db_loader().add_texts(texts, metadatas=[{"source": "old.pdf"}] * count,
+                                        ids=[str(uuid.uuid4()) for _ in texts])
+
+
+def test_first_run_replaces_chunks_without_manifest(tmp_path, pdf_dir):
+    store = VectorStore("fake", "fake-embed", str(tmp_path / "db"))
+    add_legacy_chunks(store)
+    ingestion = pipeline(store, pdf_dir)
+
+    stats = ingestion.run()
+
+    assert stats["indexed"] == 3
+    assert stats["unlisted_removed"] == 5
+    assert collection_ids(store) == manifest_ids(ingestion)
+
+
+def test_later_runs_keep_the_collection(tmp_path, pdf_dir):
+    store = VectorStore("fake", "fake-embed", str(tmp_path / "db"))
+    ingestion = pipeline(store, pdf_dir)
+    ingestion.run()
+    os.remove(os.path.join(pdf_dir, "paper0.pdf"))
+
+    stats = ingestion.run()
+
+    assert stats["removed"] == 1 and stats["unlisted_removed"] == 0
+    assert collection_ids(store) == manifest_ids(ingestion)
+
+
+def test_ingestion_migrates_legacy_store(snapshot_store, pdf_dir):
+    add_legacy_chunks(VectorStore("fake", "fake-embed", snapshot_store.root))
+    store = VectorStore("fake", "fake-embed")
+    ingestion = pipeline(store, pdf_dir)
+
+    stats = ingestion.run()
+
+    assert stats["version"] and stats["version"] == snapshot_store.current()
+    assert store.persist_directory() == snapshot_store.version_path(stats["version"])
+    ids = collection_ids(store)
+    assert ids == manifest_ids(ingestion)
+    assert len(BM25Index.load(store.keyword_index_path())) == len(ids)
+
+
+def test_document_indexer_migrates_legacy_store(snapshot_store):
+    add_legacy_chunks(VectorStore("fake", "fake-embed", snapshot_store.root))
+    store = VectorStore("fake", "fake-embed")
+
+    stats = store.document_indexer(synthetic_corpus(10, n_topics=5, seed=4))
+
+    assert snapshot_store.current()
+    # Legacy chunks keep their random IDs and are validated and keyword-indexed too
+    assert len(collection_ids(store)) == 5 + stats["written"]
+    assert len(BM25Index.load(store.keyword_index_path())) == 5 + stats["written"]
+
+
+def test_compact_export_follows_new_chunks(snapshot_store):
+    store = VectorStore("fake", "fake-embed")
+    store.document_indexer(synthetic_corpus(10, n_topics=5, seed=4))
+    VectorStore("fake", "fake-embed", store.persist_directory()).export_compact_index()
+
+    store.document_indexer(synthetic_corpus(20, n_topics=5, seed=5))
+
+    with open(os.path.join(store.compact_index_path(), "manifest.json")) as f:
+        manifest = json.load(f)
+    assert manifest["count"] == len(collection_ids(store))
+    assert manifest["index_version"] == store.index_version()
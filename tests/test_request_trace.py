@@ -0,0 +1,38 @@
+"""
+Tests of per-request traces: responses served by the LLM response cache are counted
+as cache hits, not as LLM calls.
+"""
+
+import asyncio
+
+from benchmarks.fakes import FakeChatModel
+from document_processing.proj_cache import LLMResponseCache, MemoryLRUStore
+from document_processing.proj_metrics import RequestTrace
+
+
+def test_cache_hits_are_not_llm_calls():
+    llm = FakeChatModel(latency=0.0, cache=LLMResponseCache(MemoryLRUStore(max_entries=16)))
+    trace = RequestTrace()
+
+    first = llm.invoke("What is topic1term3?", config=trace.config())
+    second = llm.invoke("What is topic1term3?", config=trace.config())
+    asyncio.run(llm.ainvoke("What is topic1term3?", config=trace.config()))
+
+    assert second.content == first.content
+    assert llm.stats.snapshot()["calls"] == 1
+    summary = trace.to_dict()
+    assert summary["llm_calls"] == 1
+    assert summary["llm_cache_hits"] == 2
+    # Hits cost no tokens
+    assert summary["prompt_tokens"] == first.usage_metadata["input_tokens"]
+
+
+def test_llm_calls_without_cache():
+    llm = FakeChatModel(latency=0.0)
+    trace = RequestTrace()
+
+    llm.invoke("What is topic1term3?", config=trace.config())
+    llm.invoke("What is topic1term3?", config=trace.config())
+
+    assert trace.to_dict()["llm_calls"] == 2
+    assert trace.to_dict()["llm_cache_hits"] == 0
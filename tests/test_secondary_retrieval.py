@@ -0,0 +1,91 @@
+"""
+Offline test of the HTTP secondary retriever: ``serve_search`` exposes a BM25 index on
+an ephemeral port and ``HTTPSearchRetriever`` queries it. Failing services yield no
+documents.
+"""
+
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from document_processing.secondary_retrieval import BM25Retriever, HTTPSearchRetriever, serve_search
+
+
+@pytest.fixture
+def search_url(bm25_path):
+    server = serve_search(BM25Retriever(bm25_path))
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}/search"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_retriever_matches_local_bm25(search_url, bm25_path):
+    query = "topic2term1 topic2term5"
+    local = BM25Retriever(bm25_path).search(query, k=3)
+
+    remote = HTTPSearchRetriever(search_url, timeout=5.0).search(query, k=3)
+
+    assert [doc.page_content for doc in remote] == [doc.page_content for doc in local]
+    assert [doc.metadata["chunk_id"] for doc in remote] == [doc.metadata["chunk_id"] for doc in local]
+    assert all(doc.metadata["retrieval"] == "http" for doc in remote)
+    assert all(doc.metadata["topic"] == 2 for doc in remote)
+
+
+def test_http_retriever_async_and_k(search_url):
+    retriever = HTTPSearchRetriever(search_url, timeout=5.0)
+
+    docs = asyncio.run(retriever.asearch("topic4term0", k=2))
+
+    assert len(docs) == 2
+    assert retriever.search("no such words anywhere", k=3) == []
+
+
+class BrokenSearchHandler(BaseHTTPRequestHandler):
+    """Search service misbehaving in the way named by the request path."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/slow":
+            time.sleep(1.0)
+        if self.path == "/error":
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = {"/malformed": b"{not json", "/wrong_shape": b'{"results": [{"text": "x"}]}'}.get(self.path, b"{}")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def broken_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BrokenSearchHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("path", ["/slow", "/error", "/malformed", "/wrong_shape"])
+def test_failing_service_yields_no_documents(broken_url, path):
+    retriever = HTTPSearchRetriever(broken_url + path, timeout=0.2)
+
+    assert retriever.search("topic1term1", k=3) == []
+    assert asyncio.run(retriever.asearch("topic1term1", k=3)) == []
+
+
+def test_unreachable_service_yields_no_documents():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BrokenSearchHandler)
+    host, port = server.server_address[:2]
+    server.server_close()
+
+    assert HTTPSearchRetriever(f"http://{host}:{port}/search", timeout=0.2).search("topic1term1") == []
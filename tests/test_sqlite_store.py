@@ -0,0 +1,35 @@
+"""
+Tests of the SQLite LRU store: buffered access times still decide what is evicted, and
+the running entry count follows puts, overwrites, evictions and clears.
+"""
+
+from document_processing.proj_cache import SQLiteLRUStore
+
+
+def test_buffered_access_keeps_entry_on_eviction(tmp_path):
+    store = SQLiteLRUStore(str(tmp_path / "cache.sqlite"), "entries", max_entries=3, evict_batch=0,
+                           access_flush_size=100, access_flush_seconds=60)
+    for key in "abc":
+        store.put(key, key.encode())
+
+    assert store.get("a") == b"a"
+    store.put("d", b"d")
+
+    assert store.get("b") is None
+    assert store.get("a") == b"a"
+    assert store.stats()["entries"] == 3
+
+
+def test_running_count(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    store = SQLiteLRUStore(path, "entries", max_entries=10, evict_batch=2)
+    store.put_many({str(i): b"x" for i in range(8)})
+    store.put_many({str(i): b"y" for i in range(4)})
+    assert store.stats()["entries"] == 8
+
+    store.put_many({str(i): b"z" for i in range(8, 12)})
+    assert store.stats()["entries"] == 8
+    assert SQLiteLRUStore(path, "entries", max_entries=10).stats()["entries"] == 8
+
+    store.clear()
+    assert store.stats()["entries"] == 0